@@ -3,6 +3,7 @@ import os
 import sys
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import botocore.session
 
@@ -12,6 +13,7 @@ from data_mesh_util.lib.constants import *
 import data_mesh_util.lib.utils as utils
 from data_mesh_util.lib.SubscriberTracker import SubscriberTracker
 from data_mesh_util.lib.ApiAutomator import ApiAutomator
+from data_mesh_util.lib.DagExecutor import DagExecutor
 
 
 class DataMeshAdmin:
@@ -58,7 +60,7 @@ class DataMeshAdmin:
         self._dynamo_resource = self._session.client('dynamodb')
         self._lf_client = self._session.client('lakeformation')
 
-        self._current_identity = self._sts_client.get_caller_identity()
+        self._current_identity = utils.get_caller_identity(session=self._session)
 
         self._logger.setLevel(log_level)
         self._log_level = log_level
@@ -93,7 +95,7 @@ class DataMeshAdmin:
 
         self._create_template_config(self._config)
 
-        current_identity = self._sts_client.get_caller_identity()
+        current_identity = utils.get_caller_identity(session=self._session)
 
         ro_tuple = self._automator.configure_iam(
             policy_name='DataMeshReadOnlyPolicy',
@@ -117,7 +119,7 @@ class DataMeshAdmin:
 
         self._create_template_config(self._config)
 
-        current_identity = self._sts_client.get_caller_identity()
+        current_identity = utils.get_caller_identity(session=self._session)
 
         mgr_tuple = self._automator.configure_iam(
             policy_name='DataMeshManagerPolicy',
@@ -140,8 +142,7 @@ class DataMeshAdmin:
             executing_user_role = current_identity.get('Arn')
 
         # grant the data mesh manager and current caller Data Lake Admin rights
-        self._automator.add_datalake_admin(principal=data_mesh_mgr_role_arn)
-        self._automator.add_datalake_admin(principal=executing_user_role)
+        self._automator.add_datalake_admins(principals=[data_mesh_mgr_role_arn, executing_user_role])
 
         # force the creation of the lakeformation service linked role if it isn't there already
         svc_role = self._automator.get_or_create_lf_svc_linked_role(aws_region=self._region)
@@ -154,9 +155,12 @@ class DataMeshAdmin:
 
         return mgr_tuple
 
-    def _create_producer_role(self, account_id: str):
+    def _create_producer_role(self, account_id: str, grant_data_lake_admin: bool = True):
         '''
         Private method to create objects needed for a Producer account to connect to the Data Mesh and create data products
+        :param account_id:
+        :param grant_data_lake_admin: make the producer role a Data Lake Admin. Callers enabling many accounts set this
+        to False and update the Data Lake Admins once
         :return:
         '''
         self._create_template_config(self._config)
@@ -177,8 +181,9 @@ class DataMeshAdmin:
         self._automator.lf_grant_create_db(iam_role_arn=producer_iam_role_arn)
 
         # make the iam role a data lake admin
-        self._automator.add_datalake_admin(principal=producer_iam_role_arn)
-        self._logger.info(f"Granted {producer_iam_role_arn} Data Lake Admin")
+        if grant_data_lake_admin is True:
+            self._automator.add_datalake_admin(principal=producer_iam_role_arn)
+            self._logger.info(f"Granted {producer_iam_role_arn} Data Lake Admin")
 
         return producer_tuple
 
@@ -213,23 +218,27 @@ class DataMeshAdmin:
         of the Data Mesh Account. Creates IAM Roles & Policies for the DataMeshManager, DataProducer, and DataConsumer
         :return:
         '''
-        self._data_mesh_account_id = self._sts_client.get_caller_identity().get('Account')
+        self._data_mesh_account_id = utils.get_caller_identity(session=self._session).get('Account')
 
         self._current_credentials = boto3.session.Session().get_credentials()
         self._subscription_tracker = SubscriberTracker(data_mesh_account_id=self._data_mesh_account_id,
                                                        credentials=self._current_credentials,
                                                        region_name=self._region,
-                                                       log_level=self._log_level)
+                                                       log_level=self._log_level,
+                                                       create_missing_indexes=True)
 
-        # create the read-only consumer role for metadata descriptions
-        ro_tuple = self._create_data_mesh_ro_role()
+        self._create_template_config(self._config)
 
-        # create a new IAM role in the Data Mesh Account to be used for future grants
-        mgr_tuple = self._create_data_mesh_manager_role()
+        # create the read-only consumer role for metadata descriptions, and a new IAM role in the Data Mesh Account to
+        # be used for future grants. These are independent so are created concurrently
+        dag = DagExecutor(max_workers=2, log_level=self._log_level)
+        dag.add_step('ReadOnly', lambda results: self._create_data_mesh_ro_role())
+        dag.add_step('Manager', lambda results: self._create_data_mesh_manager_role())
+        roles = dag.run()
 
         return {
-            "Manager": self._api_tuple(mgr_tuple),
-            "ReadOnly": self._api_tuple(ro_tuple),
+            "Manager": self._api_tuple(roles.get('Manager')),
+            "ReadOnly": self._api_tuple(roles.get('ReadOnly')),
             "SubscriptionTracker": self._subscription_tracker.get_endpoints()
         }
 
@@ -262,20 +271,7 @@ class DataMeshAdmin:
         if account_id is None:
             raise Exception("Must Provide Account ID")
 
-        self._create_producer_role(account_id=account_id)
-
-        self._add_trust_relationship(
-            account_id=account_id,
-            trust_role=DATA_MESH_PRODUCER_ROLENAME,
-            update_role=utils.get_central_role_name(account_id=account_id, type=PRODUCER)
-        )
-
-        # add trust to the read only role
-        self._add_trust_relationship(
-            account_id=account_id,
-            trust_role=DATA_MESH_PRODUCER_ROLENAME,
-            update_role=DATA_MESH_READONLY_ROLENAME
-        )
+        self._raise_enable_error(self.enable_accounts(accounts=[{'AccountId': account_id, 'AccountType': PRODUCER}]))
 
     def enable_account_as_consumer(self, account_id: str):
         '''
@@ -285,20 +281,105 @@ class DataMeshAdmin:
         if account_id is None:
             raise Exception("Must Provide Account ID")
 
-        self._create_consumer_role(account_id=account_id)
+        self._raise_enable_error(self.enable_accounts(accounts=[{'AccountId': account_id, 'AccountType': CONSUMER}]))
 
-        self._add_trust_relationship(
-            account_id=account_id,
-            trust_role=DATA_MESH_CONSUMER_ROLENAME,
-            update_role=utils.get_central_role_name(account_id=account_id, type=CONSUMER)
-        )
+    def _raise_enable_error(self, results: dict) -> None:
+        for account_results in results.values():
+            for error in account_results.values():
+                if error is not None:
+                    raise Exception(error)
 
-        # add trust to the read only role
-        self._add_trust_relationship(
-            account_id=account_id,
-            trust_role=DATA_MESH_CONSUMER_ROLENAME,
-            update_role=DATA_MESH_READONLY_ROLENAME
-        )
+    def enable_accounts(self, accounts: list, max_workers: int = 4) -> dict:
+        '''
+        Enables a set of remote accounts to act as data producers or consumers. The central roles for each account are
+        created concurrently, and then the producer roles are made Data Lake Admins in a single settings update, and
+        the trust policy updates are made serially, with a single trust policy update for each role
+        :param accounts: list of dicts with AccountId and AccountType of Producer or Consumer
+        :param max_workers:
+        :return: dict of account ID to a dict of account type to error, which is None if the account was enabled
+        '''
+        utils.validate_correct_account(self._session.get_credentials(), self._data_mesh_account_id)
+
+        items = []
+        for a in accounts:
+            if a.get('AccountId') is None:
+                raise Exception("Must Provide Account ID")
+            if a.get('AccountType') not in [PRODUCER, CONSUMER]:
+                raise Exception(f"Invalid Account Type {a.get('AccountType')}")
+            items.append((a.get('AccountId'), a.get('AccountType')))
+        items = list(dict.fromkeys(items))
+
+        results = {}
+        if len(items) == 0:
+            return results
+
+        def _create_role(item: tuple) -> tuple:
+            account_id, account_type = item
+            try:
+                if account_type == PRODUCER:
+                    role_arn = self._create_producer_role(account_id=account_id, grant_data_lake_admin=False)[0]
+                else:
+                    role_arn = self._create_consumer_role(account_id=account_id)[0]
+                return role_arn, None
+            except Exception as e:
+                self._logger.error(f"Unable to create central {account_type} Role for {account_id}: {e}")
+                return None, str(e)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+            created = dict(zip(items, executor.map(_create_role, items)))
+
+        for (account_id, account_type), (_, error) in created.items():
+            results.setdefault(account_id, {})[account_type] = error
+
+        def _run_serial(item: tuple, update) -> None:
+            account_id, account_type = item
+            if results.get(account_id).get(account_type) is not None:
+                return
+            try:
+                update()
+            except Exception as e:
+                self._logger.error(f"Unable to enable {account_id} as {account_type}: {e}")
+                results.get(account_id)[account_type] = str(e)
+
+        # make the producer roles data lake admins with a single settings update
+        new_admins = {item: role_arn for item, (role_arn, error) in created.items() if
+                      item[1] == PRODUCER and error is None}
+        if len(new_admins) > 0:
+            try:
+                self._automator.add_datalake_admins(principals=list(new_admins.values()))
+            except Exception as e:
+                self._logger.error(f"Unable to add Data Lake Admins {list(new_admins.values())}: {e}")
+                for account_id, account_type in new_admins.keys():
+                    results.get(account_id)[account_type] = str(e)
+
+        # let each account's local role assume its central role
+        for item in created.keys():
+            account_id, account_type = item
+            local_role_name = DATA_MESH_PRODUCER_ROLENAME if account_type == PRODUCER else DATA_MESH_CONSUMER_ROLENAME
+            _run_serial(item, lambda: self._add_trust_relationship(
+                account_id=account_id,
+                trust_role=local_role_name,
+                update_role=utils.get_central_role_name(account_id=account_id, type=account_type)
+            ))
+
+        # add trust to the read only role for all enabled accounts at once
+        read_only_trusts = {}
+        for account_id, account_type in created.keys():
+            if results.get(account_id).get(account_type) is None:
+                local_role_name = DATA_MESH_PRODUCER_ROLENAME if account_type == PRODUCER else DATA_MESH_CONSUMER_ROLENAME
+                read_only_trusts[(account_id, account_type)] = utils.get_role_arn(account_id=account_id,
+                                                                                  role_name=local_role_name)
+
+        if len(read_only_trusts) > 0:
+            try:
+                self._automator.add_aws_trusts_to_role(trust_role_arns=list(read_only_trusts.values()),
+                                                       update_role_name=DATA_MESH_READONLY_ROLENAME)
+            except Exception as e:
+                self._logger.error(f"Unable to update trust policy for {DATA_MESH_READONLY_ROLENAME}: {e}")
+                for account_id, account_type in read_only_trusts.keys():
+                    results.get(account_id)[account_type] = str(e)
+
+        return results
 
     def _initialize_account_as(self, type: str, crawler_role_arn: str = None):
         '''
@@ -310,7 +391,7 @@ class DataMeshAdmin:
         utils.validate_correct_account(self._session.get_credentials(), self._data_mesh_account_id,
                                        should_match=False)
 
-        source_account = self._sts_client.get_caller_identity().get('Account')
+        source_account = utils.get_caller_identity(session=self._session).get('Account')
 
         local_role_name = None
         remote_role_name = None
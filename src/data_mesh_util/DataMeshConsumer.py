@@ -4,6 +4,7 @@ import boto3
 import os
 import sys
 import json
+import threading
 
 import botocore.session
 import shortuuid
@@ -32,8 +33,24 @@ class DataMeshConsumer:
     _subscription_tracker = None
     _consumer_automator = None
     _ro_session = None
+    _data_mesh_credentials = None
+    _consumer_credentials = None
+    _auto_refresh_credentials = None
+    _mesh_init_lock = None
 
-    def __init__(self, data_mesh_account_id: str, region_name: str, log_level: str = "INFO", use_credentials=None):
+    def __init__(self, data_mesh_account_id: str, region_name: str, log_level: str = "INFO", use_credentials=None,
+                 auto_refresh_credentials: bool = False, lazy: bool = False):
+        '''
+        Creates a Data Mesh Consumer. With auto_refresh_credentials, each role in the credential chain is assumed with
+        refreshable credentials which re-assume the role in the background before expiry, for long lived objects. With
+        lazy, the data mesh credentials, subscription tracker and read-only session are only created when first needed.
+        :param data_mesh_account_id:
+        :param region_name:
+        :param log_level:
+        :param use_credentials:
+        :param auto_refresh_credentials:
+        :param lazy:
+        '''
         if region_name is None:
             raise Exception("Cannot initialize a Data Mesh Consumer without an AWS Region")
         else:
@@ -44,44 +61,73 @@ class DataMeshConsumer:
         # Assume the consumer account DataMeshConsumer role, unless we have been supplied temporary credentials for that role
         self._session, _consumer_credentials = utils.assume_iam_role(role_name=DATA_MESH_CONSUMER_ROLENAME,
                                                                      region_name=self._current_region,
-                                                                     use_credentials=use_credentials)
+                                                                     use_credentials=use_credentials,
+                                                                     auto_refresh=auto_refresh_credentials)
 
         self._sts_client = self._session.client('sts')
 
         self._log_level = log_level
         self._logger.setLevel(log_level)
 
-        self._current_account = self._sts_client.get_caller_identity()
+        self._current_account = utils.get_caller_identity(session=self._session)
         self._data_consumer_account_id = self._current_account.get('Account')
 
         self._consumer_automator = ApiAutomator(target_account=self._data_consumer_account_id,
                                                 session=self._session, log_level=self._log_level)
 
-        # assume the DataMeshConsumer-<account-id> role in the mesh
-        _data_mesh_session, _data_mesh_credentials = utils.assume_iam_role(
-            role_name=utils.get_central_role_name(self._data_consumer_account_id, CONSUMER),
-            region_name=self._current_region,
-            use_credentials=_consumer_credentials,
-            target_account=self._data_mesh_account_id
-        )
-        self._logger.debug("Created new STS Session for Data Mesh Admin Consumer")
-
-        utils.validate_correct_account(_data_mesh_credentials, data_mesh_account_id)
-
-        # create the subscription tracker
-        self._subscription_tracker = SubscriberTracker(credentials=_data_mesh_credentials,
-                                                       data_mesh_account_id=data_mesh_account_id,
-                                                       region_name=self._current_region,
-                                                       log_level=self._log_level)
-
-        # finally, generate a read-only set of credentials in the mesh
-        self._ro_session = utils.assume_iam_role(
-            role_name=DATA_MESH_READONLY_ROLENAME,
-            region_name=self._current_region,
-            use_credentials=_data_mesh_credentials,
-            target_account=self._data_mesh_account_id
-        )
-        self._logger.debug("Created new STS Session for Data Mesh Read Only")
+        self._consumer_credentials = _consumer_credentials
+        self._auto_refresh_credentials = auto_refresh_credentials
+        self._mesh_init_lock = threading.RLock()
+
+        # in lazy mode, the mesh credentials, subscription tracker and read-only session are created on first use
+        if lazy is False:
+            self._get_subscription_tracker()
+            self._get_ro_session()
+
+    def _get_data_mesh_credentials(self):
+        with self._mesh_init_lock:
+            if self._data_mesh_credentials is None:
+                # assume the DataMeshConsumer-<account-id> role in the mesh
+                _data_mesh_session, _data_mesh_credentials = utils.assume_iam_role(
+                    role_name=utils.get_central_role_name(self._data_consumer_account_id, CONSUMER),
+                    region_name=self._current_region,
+                    use_credentials=self._consumer_credentials,
+                    target_account=self._data_mesh_account_id,
+                    auto_refresh=self._auto_refresh_credentials
+                )
+                self._logger.debug("Created new STS Session for Data Mesh Admin Consumer")
+
+                utils.validate_correct_account(_data_mesh_credentials, self._data_mesh_account_id)
+
+                self._data_mesh_credentials = _data_mesh_credentials
+
+        return self._data_mesh_credentials
+
+    def _get_subscription_tracker(self) -> SubscriberTracker:
+        with self._mesh_init_lock:
+            if self._subscription_tracker is None:
+                # create the subscription tracker
+                self._subscription_tracker = SubscriberTracker(credentials=self._get_data_mesh_credentials(),
+                                                               data_mesh_account_id=self._data_mesh_account_id,
+                                                               region_name=self._current_region,
+                                                               log_level=self._log_level)
+
+        return self._subscription_tracker
+
+    def _get_ro_session(self):
+        with self._mesh_init_lock:
+            if self._ro_session is None:
+                # generate a read-only set of credentials in the mesh
+                self._ro_session, _ = utils.assume_iam_role(
+                    role_name=DATA_MESH_READONLY_ROLENAME,
+                    region_name=self._current_region,
+                    use_credentials=self._get_data_mesh_credentials(),
+                    target_account=self._data_mesh_account_id,
+                    auto_refresh=self._auto_refresh_credentials
+                )
+                self._logger.debug("Created new STS Session for Data Mesh Read Only")
+
+        return self._ro_session
 
     def request_access_to_product(self, owner_account_id: str, database_name: str,
                                   request_permissions: list, tables: list = None) -> dict:
@@ -95,7 +141,7 @@ class DataMeshConsumer:
         :param request_permissions:
         :return:
         '''
-        return self._subscription_tracker.create_subscription_request(
+        return self._get_subscription_tracker().create_subscription_request(
             owner_account_id=owner_account_id,
             database_name=database_name,
             tables=tables,
@@ -111,7 +157,7 @@ class DataMeshConsumer:
         :return:
         '''
         # grab the subscription
-        subscription = self._subscription_tracker.get_subscription(subscription_id=subscription_id)
+        subscription = self._get_subscription_tracker().get_subscription(subscription_id=subscription_id)
         data_mesh_database_name = subscription.get(DATABASE_NAME)
 
         # create a shared database reference
@@ -121,12 +167,15 @@ class DataMeshConsumer:
             source_account=self._data_mesh_account_id
         )
 
-        self._consumer_automator.accept_pending_lf_resource_shares(
-            sender_account=self._data_mesh_account_id
+        # accept all the shares for the subscription together, waiting until the ones recorded at approval are active
+        ram_shares = subscription.get(RAM_SHARES) if subscription.get(RAM_SHARES) is not None else {}
+        self._consumer_automator.accept_lf_resource_shares(
+            sender_account=self._data_mesh_account_id,
+            expected_share_arns=[share.get('arn') for share in ram_shares.values()]
         )
 
     def get_subscription(self, request_id: str) -> dict:
-        return self._subscription_tracker.get_subscription(subscription_id=request_id)
+        return self._get_subscription_tracker().get_subscription(subscription_id=request_id)
 
     def get_table_info(self, database_name: str, table_name: str):
         return self._consumer_automator.describe_table(database_name, table_name)
@@ -136,8 +185,8 @@ class DataMeshConsumer:
         Lists active and pending product access grants.
         :return:
         '''
-        me = self._sts_client.get_caller_identity().get('Account')
-        return self._subscription_tracker.list_subscriptions(principal_id=me, request_status=STATUS_ACTIVE)
+        me = utils.get_caller_identity(session=self._session).get('Account')
+        return self._get_subscription_tracker().list_subscriptions(principal_id=me, request_status=STATUS_ACTIVE)
 
     def delete_subscription(self, subscription_id: str, reason: str):
         '''
@@ -146,7 +195,7 @@ class DataMeshConsumer:
         :param reason:
         :return:
         '''
-        subscription = self._subscription_tracker.get_subscription(subscription_id=subscription_id)
+        subscription = self._get_subscription_tracker().get_subscription(subscription_id=subscription_id)
 
         # confirm that we are calling from the same account as the subscriber principal
         if subscription.get(SUBSCRIBER_PRINCIPAL) != self._current_account.get('Account'):
@@ -156,4 +205,4 @@ class DataMeshConsumer:
             self._consumer_automator.leave_ram_shares(principal=subscription.get(SUBSCRIBER_PRINCIPAL),
                                                       ram_shares=subscription.get(RAM_SHARES))
 
-            return self._subscription_tracker.delete_subscription(subscription_id=subscription_id, reason=reason)
+            return self._get_subscription_tracker().delete_subscription(subscription_id=subscription_id, reason=reason)
@@ -1,3 +1,10 @@
+import os
+import sys
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 from data_mesh_util.lib.constants import *
 from data_mesh_util import DataMeshAdmin as data_mesh_admin
 
@@ -7,32 +14,167 @@ class DataMeshMacros:
     _region = None
     _log_level = None
     _BOTH = 'Both'
+    _STAGE_ACCOUNT_INITIALIZED = 'AccountInitialized'
+    _STAGE_COMPLETED = 'Completed'
+    _STAGE_FAILED = 'Failed'
+    _logger = logging.getLogger("DataMeshMacros")
+    # make sure we always log to standard out
+    _logger.addHandler(logging.StreamHandler(sys.stdout))
 
     def __init__(self, data_mesh_account_id: str, region_name: str, log_level: str):
         self._data_mesh_account_id = data_mesh_account_id
         self._region = region_name
         self._log_level = log_level
+        self._logger.setLevel(log_level)
+
+    def _get_account_types(self, account_type: str) -> list:
+        if account_type.lower() == self._BOTH.lower():
+            return [PRODUCER, CONSUMER]
+        elif account_type in [PRODUCER, CONSUMER]:
+            return [account_type]
+        else:
+            raise Exception(f"Invalid Account Type {account_type}")
 
     def bootstrap_account(self, account_type: str, mesh_credentials, account_credentials, crawler_role_arn: str = None):
-        # create a data mesh admin for the mesh account
-        mesh_admin = data_mesh_admin.DataMeshAdmin(
-            data_mesh_account_id=self._data_mesh_account_id,
-            region_name=self._region,
-            log_level=self._log_level,
-            use_creds=mesh_credentials
+        results = self.bootstrap_accounts(
+            accounts=[{
+                'AccountType': account_type,
+                'Credentials': account_credentials,
+                'CrawlerRoleArn': crawler_role_arn
+            }],
+            mesh_credentials=mesh_credentials,
+            max_workers=1
         )
 
-        # create a data mesh admin for the target account
-        account_admin = data_mesh_admin.DataMeshAdmin(
-            data_mesh_account_id=self._data_mesh_account_id,
-            region_name=self._region,
-            log_level=self._log_level,
-            use_creds=account_credentials
-        )
+        for account_results in results.values():
+            for r in account_results.values():
+                if r.get('Status') != self._STAGE_COMPLETED:
+                    raise Exception(r.get('Error'))
+
+    def _load_state(self, state_file: str) -> dict:
+        if state_file is not None and os.path.exists(state_file):
+            with open(state_file, 'r') as f:
+                return json.load(f)
+        else:
+            return {}
+
+    def _save_state(self, state_file: str, state: dict) -> None:
+        if state_file is not None:
+            # write to a temporary file and then replace, so an interrupted run never leaves a partial state file
+            tmp_file = f"{state_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(state, f, indent=4)
+            os.replace(tmp_file, state_file)
+
+    def bootstrap_accounts(self, accounts: list, mesh_credentials, max_workers: int = 4, progress_callback=None,
+                           state_file: str = None) -> dict:
+        '''
+        Bootstraps many accounts as producers, consumers or both. Each account is initialized concurrently using its
+        own credentials, and then a single mesh admin enables all of the initialized accounts in the mesh account,
+        where trust policy and Data Lake Admin updates are serialized and batched.
+        :param accounts: list of dicts with AccountType of Producer, Consumer or Both, Credentials for an administrator
+        of the account including its AccountId, and an optional CrawlerRoleArn
+        :param mesh_credentials:
+        :param max_workers: number of accounts initialized concurrently
+        :param progress_callback: callable invoked with account ID, account type, stage and error as each account
+        progresses
+        :param state_file: path to a JSON file recording the stage reached by each account. Accounts which have already
+        completed a stage are not processed again when the same state file is used, so a failed or interrupted run can
+        be resumed
+        :return: dict of account ID to a dict of account type to Status and Error
+        '''
+        state = self._load_state(state_file)
+        state_lock = threading.Lock()
+
+        def _set_stage(account_id: str, account_type: str, stage: str, error: str = None) -> None:
+            with state_lock:
+                entry = {'Status': stage}
+                if error is not None:
+                    entry['Error'] = error
+                state.setdefault(account_id, {})[account_type] = entry
+                self._save_state(state_file, state)
+
+            self._logger.info(f"Account {account_id} {account_type}: {stage}")
+            if progress_callback is not None:
+                progress_callback(account_id, account_type, stage, error)
+
+        def _get_stage(account_id: str, account_type: str) -> str:
+            return state.get(account_id, {}).get(account_type, {}).get('Status')
+
+        # determine the work still to do for each account
+        pending_init = {}
+        for a in accounts:
+            account_id = a.get('Credentials').get('AccountId')
+            for account_type in self._get_account_types(a.get('AccountType')):
+                stage = _get_stage(account_id, account_type)
+                if stage is None or stage == self._STAGE_FAILED:
+                    pending_init.setdefault(account_id, (a, []))[1].append(account_type)
+
+        def _initialize_account(account_id: str) -> None:
+            a, account_types = pending_init.get(account_id)
+
+            try:
+                # create a data mesh admin for the target account
+                account_admin = data_mesh_admin.DataMeshAdmin(
+                    data_mesh_account_id=self._data_mesh_account_id,
+                    region_name=self._region,
+                    log_level=self._log_level,
+                    use_creds=a.get('Credentials')
+                )
+            except Exception as e:
+                for account_type in account_types:
+                    _set_stage(account_id, account_type, self._STAGE_FAILED, str(e))
+                return
+
+            for account_type in account_types:
+                try:
+                    if account_type == PRODUCER:
+                        account_admin.initialize_producer_account(crawler_role_arn=a.get('CrawlerRoleArn'))
+                    else:
+                        account_admin.initialize_consumer_account(crawler_role_arn=a.get('CrawlerRoleArn'))
+
+                    _set_stage(account_id, account_type, self._STAGE_ACCOUNT_INITIALIZED)
+                except Exception as e:
+                    _set_stage(account_id, account_type, self._STAGE_FAILED, str(e))
+
+        if len(pending_init) > 0:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending_init)))) as executor:
+                list(executor.map(_initialize_account, pending_init.keys()))
+
+        # enable every initialized account in the mesh account with a single mesh admin
+        to_enable = []
+        for a in accounts:
+            account_id = a.get('Credentials').get('AccountId')
+            for account_type in self._get_account_types(a.get('AccountType')):
+                if _get_stage(account_id, account_type) == self._STAGE_ACCOUNT_INITIALIZED:
+                    to_enable.append({'AccountId': account_id, 'AccountType': account_type})
+
+        if len(to_enable) > 0:
+            try:
+                mesh_admin = data_mesh_admin.DataMeshAdmin(
+                    data_mesh_account_id=self._data_mesh_account_id,
+                    region_name=self._region,
+                    log_level=self._log_level,
+                    use_creds=mesh_credentials
+                )
+                enabled = mesh_admin.enable_accounts(accounts=to_enable, max_workers=max_workers)
+            except Exception as e:
+                enabled = {}
+                for a in to_enable:
+                    enabled.setdefault(a.get('AccountId'), {})[a.get('AccountType')] = str(e)
+
+            for account_id, account_results in enabled.items():
+                for account_type, error in account_results.items():
+                    if error is None:
+                        _set_stage(account_id, account_type, self._STAGE_COMPLETED)
+                    else:
+                        # the account side is already set up, so a resumed run only retries the mesh side
+                        _set_stage(account_id, account_type, self._STAGE_ACCOUNT_INITIALIZED, error)
+
+        results = {}
+        for a in accounts:
+            account_id = a.get('Credentials').get('AccountId')
+            for account_type in self._get_account_types(a.get('AccountType')):
+                results.setdefault(account_id, {})[account_type] = dict(state.get(account_id).get(account_type))
 
-        if account_type == PRODUCER or account_type.lower() == self._BOTH.lower():
-            account_admin.initialize_producer_account()
-            mesh_admin.enable_account_as_producer(account_id=account_credentials.get('AccountId'))
-        elif account_type == CONSUMER or account_type.lower() == self._BOTH.lower():
-            account_admin.initialize_consumer_account()
-            mesh_admin.enable_account_as_consumer(account_id=account_credentials.get('AccountId'))
+        return results
@@ -1,9 +1,15 @@
 import time
 import boto3
+import botocore.exceptions
 import os
 import sys
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from data_mesh_util.lib.ApiAutomator import ApiAutomator
+from data_mesh_util.lib.GrantAccumulator import GrantAccumulator
+from data_mesh_util.lib.BucketPolicyBatch import BucketPolicyBatch
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "resource"))
 sys.path.append(os.path.join(os.path.dirname(__file__), "lib"))
@@ -28,12 +34,28 @@ class DataMeshProducer:
     _data_producer_role_arn = None
     _data_mesh_credentials = None
     _data_mesh_boto_session = None
+    _data_mesh_session = None
     _subscription_tracker = None
     _data_producer_identity = None
     _producer_automator = None
     _mesh_automator = None
+    _producer_credentials = None
+    _auto_refresh_credentials = None
+    _mesh_init_lock = None
 
-    def __init__(self, data_mesh_account_id: str, region_name: str, log_level: str = "INFO", use_credentials=None):
+    def __init__(self, data_mesh_account_id: str, region_name: str, log_level: str = "INFO", use_credentials=None,
+                 auto_refresh_credentials: bool = False, lazy: bool = False):
+        '''
+        Creates a Data Mesh Producer. With auto_refresh_credentials, each role in the credential chain is assumed with
+        refreshable credentials which re-assume the role in the background before expiry, for long lived objects. With
+        lazy, the data mesh session and subscription tracker are only created when first needed.
+        :param data_mesh_account_id:
+        :param region_name:
+        :param log_level:
+        :param use_credentials:
+        :param auto_refresh_credentials:
+        :param lazy:
+        '''
         self._data_mesh_account_id = data_mesh_account_id
 
         if region_name is None:
@@ -44,7 +66,8 @@ class DataMeshProducer:
         # Assume the producer account DataMeshProducer role, unless we have been supplied temporary credentials for that role
         self._session, _producer_credentials = utils.assume_iam_role(role_name=DATA_MESH_PRODUCER_ROLENAME,
                                                                      region_name=self._current_region,
-                                                                     use_credentials=use_credentials)
+                                                                     use_credentials=use_credentials,
+                                                                     auto_refresh=auto_refresh_credentials)
 
         self._iam_client = self._session.client('iam')
         self._sts_client = self._session.client('sts')
@@ -52,42 +75,113 @@ class DataMeshProducer:
         self._log_level = log_level
         self._logger.setLevel(log_level)
 
-        self._data_producer_identity = self._sts_client.get_caller_identity()
+        self._data_producer_identity = utils.get_caller_identity(session=self._session)
         self._data_producer_account_id = self._data_producer_identity.get('Account')
 
         self._producer_automator = ApiAutomator(target_account=self._data_producer_account_id,
                                                 session=self._session, log_level=self._log_level)
 
-        # now assume the DataMeshProducer-<account-id> Role in the Mesh Account
-        self._data_mesh_session, self._data_mesh_credentials = utils.assume_iam_role(
-            role_name=utils.get_central_role_name(self._data_producer_account_id, PRODUCER),
-            region_name=self._current_region,
-            use_credentials=_producer_credentials,
-            target_account=self._data_mesh_account_id
-        )
+        self._producer_credentials = _producer_credentials
+        self._auto_refresh_credentials = auto_refresh_credentials
+        self._mesh_init_lock = threading.RLock()
+
+        # in lazy mode, the mesh session and subscription tracker are created on first use
+        if lazy is False:
+            self._get_subscription_tracker()
+
+    def _get_data_mesh_session(self):
+        with self._mesh_init_lock:
+            if self._data_mesh_session is None:
+                # now assume the DataMeshProducer-<account-id> Role in the Mesh Account
+                data_mesh_session, data_mesh_credentials = utils.assume_iam_role(
+                    role_name=utils.get_central_role_name(self._data_producer_account_id, PRODUCER),
+                    region_name=self._current_region,
+                    use_credentials=self._producer_credentials,
+                    target_account=self._data_mesh_account_id,
+                    auto_refresh=self._auto_refresh_credentials
+                )
+
+                # validate that we are running in the data mesh account
+                utils.validate_correct_account(data_mesh_credentials, self._data_mesh_account_id)
+
+                self._logger.debug("Created new STS Session for Data Mesh Admin Producer")
+                self._logger.debug(data_mesh_credentials)
+
+                self._data_mesh_credentials = data_mesh_credentials
+                self._data_mesh_session = data_mesh_session
+
+        return self._data_mesh_session
+
+    def _get_data_mesh_credentials(self):
+        self._get_data_mesh_session()
+        return self._data_mesh_credentials
+
+    def _get_mesh_automator(self) -> ApiAutomator:
+        with self._mesh_init_lock:
+            if self._mesh_automator is None:
+                # generate an API Automator in the mesh
+                self._mesh_automator = ApiAutomator(target_account=self._data_mesh_account_id,
+                                                    session=self._get_data_mesh_session(), log_level=self._log_level)
+
+        return self._mesh_automator
+
+    def _get_subscription_tracker(self) -> SubscriberTracker:
+        with self._mesh_init_lock:
+            if self._subscription_tracker is None:
+                self._subscription_tracker = SubscriberTracker(credentials=self._get_data_mesh_credentials(),
+                                                               data_mesh_account_id=self._data_mesh_account_id,
+                                                               region_name=self._current_region,
+                                                               log_level=self._log_level)
+
+        return self._subscription_tracker
+
+    def _make_mesh_table_input(self, table_def: dict, producer_account_id: str) -> dict:
+        # cleanup the TableInfo object to be usable as a TableInput
+        # remove properties from a TableInfo object returned from get_table to be compatible with put_table
+        t = utils.remove_dict_keys(input_dict=table_def, remove_keys=GLUE_TABLE_READ_ONLY_KEYS)
+        t['Owner'] = producer_account_id
+
+        # record the fingerprint of the published definition on the mesh table, so that republishing can skip it
+        t['Parameters'] = dict(t.get('Parameters', {}))
+        t['Parameters'][TABLE_FINGERPRINT_PARAMETER] = utils.generate_table_fingerprint(t)
 
-        # validate that we are running in the data mesh account
-        utils.validate_correct_account(self._data_mesh_credentials, self._data_mesh_account_id)
+        return t
 
-        # generate an API Automator in the mesh
-        self._mesh_automator = ApiAutomator(target_account=self._data_mesh_account_id,
-                                            session=self._data_mesh_session, log_level=self._log_level)
+    def _update_mesh_table(self, data_mesh_glue_client, data_mesh_database_name: str, table_input: dict,
+                           mesh_table: dict) -> None:
+        '''
+        Replaces the definition of an existing mesh table with the producer definition, keeping the parameters which the
+        data mesh maintains on the mesh table, such as the partition watermark
+        '''
+        parameters = dict(table_input.get('Parameters', {}))
+        for k in DATA_MESH_TABLE_PARAMETERS:
+            if k != TABLE_FINGERPRINT_PARAMETER and k in mesh_table.get('Parameters', {}):
+                parameters[k] = mesh_table.get('Parameters').get(k)
 
-        self._logger.debug("Created new STS Session for Data Mesh Admin Producer")
-        self._logger.debug(self._data_mesh_credentials)
+        update_input = dict(table_input)
+        update_input['Parameters'] = parameters
 
-        self._subscription_tracker = SubscriberTracker(credentials=self._data_mesh_credentials,
-                                                       data_mesh_account_id=data_mesh_account_id,
-                                                       region_name=self._current_region,
-                                                       log_level=log_level)
+        data_mesh_glue_client.update_table(
+            DatabaseName=data_mesh_database_name,
+            TableInput=update_input
+        )
+        self._logger.info(f"Updated Glue Table {table_input.get('Name')} with the changed Producer definition")
 
     def _create_mesh_table(self, table_def: dict, data_mesh_glue_client, source_database_name: str,
                            data_mesh_database_name: str,
                            producer_account_id: str,
                            data_mesh_account_id: str, create_public_metadata: bool = True,
-                           expose_table_references_with_suffix: str = "_link"):
+                           expose_table_references_with_suffix: str = "_link",
+                           incremental_partition_sync: bool = False,
+                           remove_missing_partitions: bool = False,
+                           actions: list = None,
+                           partition_diff: dict = None,
+                           mesh_table: dict = None,
+                           sync_table_definitions: bool = False,
+                           grants: GrantAccumulator = None):
         '''
-        API to create a table as a data product in the data mesh
+        API to create a table as a data product in the data mesh. The table grants are added to the grant accumulator
+        for the run, which the caller flushes once every table has been created
         :param table_def:
         :param data_mesh_glue_client:
         :param data_mesh_lf_client:
@@ -96,90 +190,702 @@ class DataMeshProducer:
         :param data_mesh_database_name:
         :param producer_account_id:
         :param data_mesh_account_id:
-        :return:
+        :param actions: the planned actions for the table, or None to run every step
+        :param partition_diff: the planned partition changes, or None to compare the partitions while copying them
+        :param mesh_table: the existing mesh table, if there is one
+        :param sync_table_definitions: update the mesh table and its partitions if their definitions have drifted from
+        the producer
+        :param grants: the grant accumulator for the run
+        :return: tuple of the table name, the resource link name, the IDs of the table grants, and whether the plan
+        found the resource link to be missing
         '''
-        # cleanup the TableInfo object to be usable as a TableInput
-        # remove properties from a TableInfo object returned from get_table to be compatible with put_table
-        keys = [
-            'DatabaseName', 'CreateTime', 'UpdateTime', 'CreatedBy', 'IsRegisteredWithLakeFormation', 'CatalogId',
-            'Tags'
-        ]
-        t = utils.remove_dict_keys(input_dict=table_def, remove_keys=keys)
-        t['Owner'] = producer_account_id
+        def _planned(action: str) -> bool:
+            return actions is None or action in actions
+
+        t = self._make_mesh_table_input(table_def=table_def, producer_account_id=producer_account_id)
 
         self._logger.debug("Existing Table Definition")
         self._logger.debug(t)
 
         table_name = t.get('Name')
+        fingerprint = t.get('Parameters').get(TABLE_FINGERPRINT_PARAMETER)
+
+        # create the glue catalog entry, or update it if the producer definition has changed
+        if mesh_table is not None and mesh_table.get('Parameters', {}).get(TABLE_FINGERPRINT_PARAMETER) == fingerprint:
+            self._logger.debug(f"Glue Table {table_name} is unchanged")
+        elif mesh_table is not None and sync_table_definitions is True:
+            if _planned(PLAN_ACTION_UPDATE_TABLE):
+                self._update_mesh_table(data_mesh_glue_client, data_mesh_database_name, t, mesh_table)
+        elif _planned(PLAN_ACTION_CREATE_TABLE):
+            try:
+                data_mesh_glue_client.create_table(
+                    DatabaseName=data_mesh_database_name,
+                    TableInput=t
+                )
+                self._logger.info(f"Created new Glue Table {table_name}")
+            except data_mesh_glue_client.exceptions.from_code('AlreadyExistsException'):
+                self._logger.info(f"Glue Table {table_name} Already Exists")
+
+        if _planned(PLAN_ACTION_SYNC_PARTITIONS):
+            if partition_diff is not None:
+                self._apply_partition_diff(
+                    source_database_name=source_database_name,
+                    data_mesh_database_name=data_mesh_database_name,
+                    table_name=table_name,
+                    partition_diff=partition_diff,
+                    incremental=incremental_partition_sync
+                )
+            else:
+                self._sync_mesh_partitions(
+                    source_database_name=source_database_name,
+                    data_mesh_database_name=data_mesh_database_name,
+                    table_name=table_name,
+                    incremental=incremental_partition_sync,
+                    remove_missing_partitions=remove_missing_partitions,
+                    update_changed_partitions=sync_table_definitions and mesh_table is not None
+                )
+
+        link_table_name = f"{table_name}_link"
+        if expose_table_references_with_suffix is not None:
+            link_table_name = f"{table_name}{expose_table_references_with_suffix}"
+
+        link_planned = actions is not None and PLAN_ACTION_CREATE_LINK in actions
+        grant_ids = []
+
+        # grant access to the producer account, and if create public metadata is True, then grant describe to the
+        # general data mesh consumer role. Grants which are already in place are not planned
+        if _planned(PLAN_ACTION_GRANT_TABLE):
+            perms = ['INSERT', 'SELECT', 'ALTER', 'DELETE', 'DESCRIBE']
+            grant_ids.append(grants.add_grant(
+                principal=producer_account_id,
+                database_name=data_mesh_database_name,
+                table_name=table_name,
+                permissions=perms,
+                grantable_permissions=perms
+            ))
+
+            if create_public_metadata is True:
+                grant_ids.append(grants.add_grant(
+                    principal=utils.get_role_arn(self._data_mesh_account_id, DATA_MESH_READONLY_ROLENAME),
+                    database_name=data_mesh_database_name,
+                    table_name=table_name,
+                    permissions=['DESCRIBE'],
+                    grantable_permissions=None
+                ))
+
+        return table_name, link_table_name, grant_ids, link_planned
+
+    def _create_resource_links(self, data_mesh_database_name: str, link_tables: dict, max_workers: int = 1) -> dict:
+        '''
+        Accepts the RAM shares for a set of newly shared mesh tables in a single deferred stage, then creates their
+        resource links in the producer account. Returns a dict of table name to error for links which failed
+        :param data_mesh_database_name:
+        :param link_tables: dict of mesh table name to resource link name
+        :param max_workers:
+        :return:
+        '''
+        if len(link_tables) == 0:
+            return {}
+
+        self._producer_automator.accept_lf_resource_shares(
+            sender_account=self._data_mesh_account_id,
+            expected_tables=[(data_mesh_database_name, t) for t in link_tables.keys()],
+            max_workers=max_workers
+        )
+
+        def _create_link(table_name: str):
+            # create a resource link for the data mesh table in producer account
+            self._producer_automator.create_remote_table(
+                data_mesh_account_id=self._data_mesh_account_id,
+                database_name=data_mesh_database_name,
+                local_table_name=link_tables.get(table_name),
+                remote_table_name=table_name
+            )
+
+        failures = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {executor.submit(_create_link, t): t for t in link_tables.keys()}
 
-        # create the glue catalog entry
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    self._logger.error(f"Failed to create Resource Link for Table {futures[future]}: {e}")
+                    failures[futures[future]] = str(e)
+
+        return failures
+
+    def _get_partition_watermark(self, data_mesh_database_name: str, table_name: str):
         try:
-            data_mesh_glue_client.create_table(
-                DatabaseName=data_mesh_database_name,
-                TableInput=t
+            table = self._get_mesh_automator().describe_table(data_mesh_database_name, table_name)
+        except botocore.exceptions.ClientError as ce:
+            if 'EntityNotFoundException' in str(ce):
+                return None
+            else:
+                raise ce
+
+        watermark = table.get('Parameters', {}).get(PARTITION_WATERMARK_PARAMETER)
+        return None if watermark is None else datetime.fromisoformat(watermark)
+
+    def _sync_mesh_partitions(self, source_database_name: str, data_mesh_database_name: str, table_name: str,
+                              incremental: bool = False, remove_missing_partitions: bool = False,
+                              update_changed_partitions: bool = False) -> dict:
+        '''
+        Copies the partitions of a producer table into its mesh copy. In incremental mode, only partitions created at or
+        after the watermark recorded on the mesh table at the last sync are written, and the watermark is advanced to the
+        latest partition CreationTime seen. Optionally removes mesh partitions which no longer exist in the producer.
+        Glue can only filter partitions on their key values, so every producer partition is still listed. Unless
+        partition definitions are being compared, the listing excludes column schemas, and only the partitions to copy
+        are then read in full.
+        :param source_database_name:
+        :param data_mesh_database_name:
+        :param table_name:
+        :param incremental:
+        :param remove_missing_partitions:
+        :param update_changed_partitions: update mesh partitions whose definition differs from the producer partition
+        :return:
+        '''
+        watermark = None
+        if incremental is True:
+            watermark = self._get_partition_watermark(data_mesh_database_name, table_name)
+
+        latest_creation_time = watermark
+        producer_partition_values = set()
+
+        # when only the partitions after the watermark are copied, the producer is listed without column schemas, and
+        # the definitions of the partitions to copy are read afterwards. Comparing definitions needs every partition
+        list_values_only = update_changed_partitions is False and watermark is not None
+
+        # fingerprints of the mesh partitions, to find the producer partitions whose definition has changed
+        mesh_partition_fingerprints = {}
+        changed_partitions = []
+        if update_changed_partitions is True:
+            mesh_partition_fingerprints = {
+                tuple(p.get('Values')): utils.generate_partition_fingerprint(p) for p in
+                self._get_mesh_automator().iter_table_partitions(database_name=data_mesh_database_name,
+                                                                 table_name=table_name)
+            }
+
+        def _partitions_to_copy():
+            nonlocal latest_creation_time
+            for p in self._producer_automator.iter_table_partitions(database_name=source_database_name,
+                                                                    table_name=table_name,
+                                                                    exclude_column_schema=list_values_only):
+                values = tuple(p.get('Values'))
+                if remove_missing_partitions is True:
+                    producer_partition_values.add(values)
+
+                created = p.get('CreationTime')
+                if created is not None and (latest_creation_time is None or created > latest_creation_time):
+                    latest_creation_time = created
+
+                if values in mesh_partition_fingerprints:
+                    # the partition exists in the mesh, so it is updated rather than copied if it has changed
+                    if mesh_partition_fingerprints.get(values) != utils.generate_partition_fingerprint(p):
+                        changed_partitions.append(p)
+                # partitions created exactly at the watermark are resubmitted, and skipped by the writer if they exist
+                elif watermark is None or created is None or created >= watermark:
+                    yield p
+
+        partitions_to_copy = _partitions_to_copy()
+        if list_values_only is True:
+            partitions_to_copy = self._producer_automator.iter_partitions_by_values(
+                database_name=source_database_name,
+                table_name=table_name,
+                partition_values=(p.get('Values') for p in partitions_to_copy)
             )
-            self._logger.info(f"Created new Glue Table {table_name}")
-        except data_mesh_glue_client.exceptions.from_code('AlreadyExistsException'):
-            self._logger.info(f"Glue Table {table_name} Already Exists")
 
-        table_partitions = self._producer_automator.get_table_partitions(
-            database_name=source_database_name,
-            table_name=table_name
+        # stream partitions from the producer straight into the mesh, so memory use is independent of partition count
+        result = self._get_mesh_automator().create_table_partition_metadata(
+            database_name=data_mesh_database_name,
+            table_name=table_name,
+            partition_input_list=partitions_to_copy
         )
 
-        if table_partitions is not None and len(table_partitions) > 0:
-            self._mesh_automator.create_table_partition_metadata(
+        if len(changed_partitions) > 0:
+            update_result = self._get_mesh_automator().update_table_partitions(
                 database_name=data_mesh_database_name,
                 table_name=table_name,
-                partition_input_list=table_partitions
+                partitions=changed_partitions
             )
+            result['Updated'] = update_result.get('Updated')
+            result['Failed'] = result.get('Failed') + update_result.get('Failed')
+
+        if remove_missing_partitions is True:
+            if update_changed_partitions is True:
+                mesh_partition_values = set(mesh_partition_fingerprints.keys())
+            else:
+                mesh_partition_values = set(
+                    tuple(p.get('Values')) for p in self._get_mesh_automator().iter_table_partitions(
+                        database_name=data_mesh_database_name, table_name=table_name, exclude_column_schema=True)
+                )
+            removed_values = mesh_partition_values - producer_partition_values
+            result['Deleted'] = 0
+            if len(removed_values) > 0:
+                result['Deleted'] = self._get_mesh_automator().delete_table_partitions(
+                    database_name=data_mesh_database_name,
+                    table_name=table_name,
+                    partition_values=list(removed_values)
+                )
 
-        # grant access to the producer account
-        perms = ['INSERT', 'SELECT', 'ALTER', 'DELETE', 'DESCRIBE']
-        created_object = self._mesh_automator.lf_grant_permissions(
-            data_mesh_account_id=self._data_mesh_account_id,
-            principal=producer_account_id,
+        # only advance the watermark when every partition up to it has been copied
+        if incremental is True and len(result.get('Failed')) == 0 and latest_creation_time is not None and \
+                latest_creation_time != watermark:
+            self._get_mesh_automator().set_table_parameters(
+                database_name=data_mesh_database_name,
+                table_name=table_name,
+                parameters={PARTITION_WATERMARK_PARAMETER: latest_creation_time.isoformat()}
+            )
+            self._logger.debug(f"Advanced partition watermark on {data_mesh_database_name}.{table_name} to "
+                               f"{latest_creation_time.isoformat()}")
+
+        return result
+
+    def _apply_partition_diff(self, source_database_name: str, data_mesh_database_name: str, table_name: str,
+                              partition_diff: dict, incremental: bool = False) -> dict:
+        '''
+        Applies the partition changes computed by _plan_data_products, without listing the partitions again. Only the
+        partitions being created or updated are read in full from the producer, except for a new table, whose
+        partitions are all streamed into the mesh
+        :param source_database_name:
+        :param data_mesh_database_name:
+        :param table_name:
+        :param partition_diff: the partition changes for the table from the plan
+        :param incremental: record the latest partition CreationTime seen by the plan as the watermark
+        :return:
+        '''
+        mesh_automator = self._get_mesh_automator()
+
+        if partition_diff.get('Create') is None:
+            partitions_to_copy = self._producer_automator.iter_table_partitions(database_name=source_database_name,
+                                                                                table_name=table_name)
+        else:
+            partitions_to_copy = self._producer_automator.iter_partitions_by_values(
+                database_name=source_database_name,
+                table_name=table_name,
+                partition_values=partition_diff.get('Create')
+            )
+
+        result = mesh_automator.create_table_partition_metadata(
             database_name=data_mesh_database_name,
             table_name=table_name,
-            permissions=perms,
-            grantable_permissions=perms
+            partition_input_list=partitions_to_copy
         )
 
-        # if create public metadata is True, then grant describe to the general data mesh consumer role
-        if create_public_metadata is True:
-            created_object = self._mesh_automator.lf_grant_permissions(
-                data_mesh_account_id=self._data_mesh_account_id,
-                principal=utils.get_role_arn(self._data_mesh_account_id, DATA_MESH_READONLY_ROLENAME),
+        if len(partition_diff.get('Update')) > 0:
+            update_result = mesh_automator.update_table_partitions(
                 database_name=data_mesh_database_name,
                 table_name=table_name,
-                permissions=['DESCRIBE'],
-                grantable_permissions=None
+                partitions=self._producer_automator.iter_partitions_by_values(
+                    database_name=source_database_name,
+                    table_name=table_name,
+                    partition_values=partition_diff.get('Update')
+                )
             )
+            result['Updated'] = update_result.get('Updated')
+            result['Failed'] = result.get('Failed') + update_result.get('Failed')
+
+        if partition_diff.get('Delete') is not None:
+            result['Deleted'] = 0
+            if len(partition_diff.get('Delete')) > 0:
+                result['Deleted'] = mesh_automator.delete_table_partitions(
+                    database_name=data_mesh_database_name,
+                    table_name=table_name,
+                    partition_values=list(partition_diff.get('Delete'))
+                )
 
-        # in the producer account, accept the RAM share after 1 second - seems to be an async delay
-        if created_object is not None:
-            time.sleep(1)
-            self._producer_automator.accept_pending_lf_resource_shares(
-                sender_account=data_mesh_account_id
+        latest_creation_time = partition_diff.get('LatestCreationTime')
+        if incremental is True and len(result.get('Failed')) == 0 and latest_creation_time is not None and \
+                latest_creation_time.isoformat() != partition_diff.get('Watermark'):
+            mesh_automator.set_table_parameters(
+                database_name=data_mesh_database_name,
+                table_name=table_name,
+                parameters={PARTITION_WATERMARK_PARAMETER: latest_creation_time.isoformat()}
             )
 
-            # create a resource link for the data mesh table in producer account
-            link_table_name = f"{table_name}_link"
-            if expose_table_references_with_suffix is not None:
-                link_table_name = f"{table_name}{expose_table_references_with_suffix}"
+        return result
 
-            self._producer_automator.create_remote_table(
-                data_mesh_account_id=self._data_mesh_account_id,
-                database_name=data_mesh_database_name,
-                local_table_name=link_table_name,
-                remote_table_name=table_name
+    def sync_data_product_partitions(self, source_database_name: str, table_name_regex: str = None,
+                                     expose_data_mesh_db_name: str = None, remove_missing_partitions: bool = False,
+                                     max_workers: int = 1, sync_table_definitions: bool = False) -> list:
+        '''
+        Incrementally copies partitions which have been added to the source tables since the last sync into the
+        data mesh, optionally removing mesh partitions which have been dropped from the source. Tables must already have
+        been published with create_data_products.
+        :param source_database_name:
+        :param table_name_regex:
+        :param expose_data_mesh_db_name:
+        :param remove_missing_partitions:
+        :param max_workers:
+        :param sync_table_definitions: update mesh tables and partitions whose definitions have drifted from the producer
+        :return:
+        '''
+        data_mesh_database_name = self._make_database_name(source_database_name)
+        if expose_data_mesh_db_name is not None:
+            data_mesh_database_name = expose_data_mesh_db_name
+
+        all_tables = self._producer_automator.load_glue_tables(
+            catalog_id=self._data_producer_account_id,
+            source_db_name=source_database_name,
+            table_name_regex=table_name_regex,
+            load_lf_tags=False
+        )
+
+        mesh_tables = {}
+        data_mesh_glue_client = None
+        if sync_table_definitions is True:
+            mesh_tables = {t.get('Name'): t for t in self._get_mesh_automator().load_glue_tables(
+                catalog_id=self._data_mesh_account_id,
+                source_db_name=data_mesh_database_name,
+                table_name_regex=table_name_regex,
+                load_lf_tags=False,
+                allow_empty=True
+            )}
+            data_mesh_glue_client = utils.generate_client(service='glue', region=self._current_region,
+                                                          credentials=self._get_data_mesh_credentials())
+
+        def _sync_table(table: dict) -> tuple:
+            table_updated = False
+            mesh_table = mesh_tables.get(table.get('Name'))
+            if mesh_table is not None:
+                table_input = self._make_mesh_table_input(table_def=table,
+                                                          producer_account_id=self._data_producer_account_id)
+                if mesh_table.get('Parameters', {}).get(TABLE_FINGERPRINT_PARAMETER) != table_input.get(
+                        'Parameters').get(TABLE_FINGERPRINT_PARAMETER):
+                    self._update_mesh_table(data_mesh_glue_client, data_mesh_database_name, table_input, mesh_table)
+                    table_updated = True
+
+            sync_result = self._sync_mesh_partitions(
+                source_database_name=source_database_name,
+                data_mesh_database_name=data_mesh_database_name,
+                table_name=table.get('Name'),
+                incremental=True,
+                remove_missing_partitions=remove_missing_partitions,
+                update_changed_partitions=mesh_table is not None
             )
 
-            return table_name, link_table_name
+            return table_updated, sync_result
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {executor.submit(_sync_table, t): t.get('Name') for t in all_tables}
+
+            for future in as_completed(futures):
+                table_name = futures[future]
+                try:
+                    table_updated, sync_result = future.result()
+                    results[table_name] = {
+                        "Table": table_name,
+                        "Status": PUBLISH_STATUS_SUCCESS if len(
+                            sync_result.get('Failed')) == 0 else PUBLISH_STATUS_FAILED,
+                        "Partitions": sync_result
+                    }
+                    if sync_table_definitions is True:
+                        results[table_name]['TableUpdated'] = table_updated
+                except Exception as e:
+                    self._logger.error(f"Failed to sync Partitions for Table {table_name}: {e}")
+                    results[table_name] = {
+                        "Table": table_name,
+                        "Status": PUBLISH_STATUS_FAILED,
+                        "Error": str(e)
+                    }
+
+        return [results.get(t.get('Name')) for t in all_tables]
 
     def _make_database_name(self, database_name: str):
         return "%s-%s" % (database_name, self._data_producer_identity.get('Account'))
 
+    def _get_producer_central_role_arn(self) -> str:
+        return utils.get_role_arn(account_id=self._data_mesh_account_id,
+                                  role_name=utils.get_central_role_name(account_id=self._data_producer_account_id,
+                                                                        type=PRODUCER))
+
+    def _get_table_tags(self, table: dict, domain: str, data_product_name: str) -> dict:
+        # the lakeformation tags of the source table, and the domain and data product tags
+        tags = dict(table.get('Tags', {}))
+
+        if domain is not None:
+            tags[DOMAIN_TAG_KEY] = {'TagValues': [domain], 'ValidValues': [domain]}
+
+        if data_product_name is not None:
+            tags[DATA_PRODUCT_TAG_KEY] = {'TagValues': [data_product_name], 'ValidValues': [data_product_name]}
+
+        return tags
+
+    def _plan_data_products(self, source_database_name: str, data_mesh_database_name: str, all_tables: list,
+                            create_public_metadata: bool, domain: str, data_product_name: str,
+                            sync_mesh_catalog_schedule: str, expose_table_references_with_suffix: str,
+                            remove_missing_partitions: bool, max_workers: int,
+                            sync_table_definitions: bool = False) -> tuple:
+        '''
+        Loads the current state of the mesh with bulk reads, and determines the actions needed to publish each table.
+        Returns the plan, a dict of table name to the partition changes to apply, and a dict of the existing mesh tables
+        '''
+        mesh_automator = self._get_mesh_automator()
+        producer_central_role_arn = self._get_producer_central_role_arn()
+        use_workers = max(1, max_workers)
+
+        plan = {
+            'Database': data_mesh_database_name,
+            'Actions': [],
+            'Tables': []
+        }
+
+        mesh_tables = {}
+        producer_table_permissions = {}
+        read_only_table_permissions = {}
+        database_exists = mesh_automator.database_exists(data_mesh_database_name)
+        if database_exists is False:
+            plan['Actions'].append(PLAN_ACTION_CREATE_DATABASE)
+        else:
+            # load the mesh tables, with their tags if any tags will be attached
+            load_tags = domain is not None or data_product_name is not None or any('Tags' in t for t in all_tables)
+            mesh_tables = {t.get('Name'): t for t in mesh_automator.load_glue_tables(
+                catalog_id=self._data_mesh_account_id,
+                source_db_name=data_mesh_database_name,
+                table_name_regex=None,
+                load_lf_tags=load_tags,
+                max_workers=use_workers,
+                allow_empty=True
+            )}
+
+            def _table_permissions(principal: str) -> dict:
+                permissions = {}
+                for p in mesh_automator.list_principal_permissions(principal=principal, resource_type='TABLE',
+                                                                   catalog_id=self._data_mesh_account_id):
+                    table_resource = p.get('Resource').get('Table', {})
+                    if table_resource.get('DatabaseName') == data_mesh_database_name and 'Name' in table_resource:
+                        permissions.setdefault(table_resource.get('Name'), set()).update(p.get('Permissions'))
+                return permissions
+
+            producer_table_permissions = _table_permissions(self._data_producer_account_id)
+            if create_public_metadata is True:
+                read_only_table_permissions = _table_permissions(
+                    utils.get_role_arn(self._data_mesh_account_id, DATA_MESH_READONLY_ROLENAME))
+
+        # the producer needs CREATE_TABLE on the mesh database
+        database_permissions = set()
+        if database_exists is True:
+            for p in mesh_automator.list_principal_permissions(principal=self._data_producer_account_id,
+                                                               resource_type='DATABASE',
+                                                               catalog_id=self._data_mesh_account_id):
+                if p.get('Resource').get('Database', {}).get('Name') == data_mesh_database_name:
+                    database_permissions.update(p.get('Permissions'))
+        if 'ALL' not in database_permissions and not {'CREATE_TABLE', 'DESCRIBE'}.issubset(database_permissions):
+            plan['Actions'].append(PLAN_ACTION_GRANT_DATABASE)
+
+        # the shared database and resource links in the producer account
+        producer_links = set()
+        if self._producer_automator.database_exists(data_mesh_database_name) is False:
+            plan['Actions'].append(PLAN_ACTION_CREATE_PRODUCER_DATABASE)
+        else:
+            producer_links = set(t.get('Name') for t in self._producer_automator.load_glue_tables(
+                catalog_id=self._data_producer_account_id,
+                source_db_name=data_mesh_database_name,
+                table_name_regex=None,
+                load_lf_tags=False,
+                allow_empty=True
+            ))
+
+        registered_locations = mesh_automator.list_registered_locations()
+        granted_locations = set(
+            p.get('Resource').get('DataLocation', {}).get('ResourceArn') for p in
+            mesh_automator.list_principal_permissions(principal=producer_central_role_arn,
+                                                      resource_type='DATA_LOCATION',
+                                                      catalog_id=self._data_mesh_account_id))
+        crawlers = self._producer_automator.list_crawler_names() if sync_mesh_catalog_schedule is not None else set()
+
+        # read each bucket policy once to determine whether it needs the mesh account added
+        buckets = set(t.get('StorageDescriptor').get('Location').split("/")[2] for t in all_tables)
+        with ThreadPoolExecutor(max_workers=max(1, min(use_workers, len(buckets) or 1))) as executor:
+            bucket_updates = dict(zip(buckets, executor.map(
+                lambda b: self._producer_automator.bucket_policy_requires_update(
+                    principal_accounts=[self._data_mesh_account_id], access_path=b), buckets)))
+
+        # compare the partitions of existing mesh tables with the producer, holding only their values, and their
+        # fingerprints when definitions are compared. The partitions of new tables are all copied, so are only counted
+        def _partition_diff(table: dict) -> dict:
+            table_name = table.get('Name')
+            mesh_table = mesh_tables.get(table_name)
+            compare_definitions = sync_table_definitions is True and mesh_table is not None
+            diff = {
+                'Create': None if mesh_table is None else set(),
+                'CreateCount': 0,
+                'Update': set(),
+                'Delete': None,
+                'LatestCreationTime': None,
+                'Watermark': None if mesh_table is None else mesh_table.get('Parameters', {}).get(
+                    PARTITION_WATERMARK_PARAMETER)
+            }
+
+            mesh_values = set()
+            mesh_fingerprints = {}
+            if mesh_table is not None:
+                for p in mesh_automator.iter_table_partitions(database_name=data_mesh_database_name,
+                                                              table_name=table_name,
+                                                              exclude_column_schema=not compare_definitions):
+                    if compare_definitions is True:
+                        mesh_fingerprints[tuple(p.get('Values'))] = utils.generate_partition_fingerprint(p)
+                    else:
+                        mesh_values.add(tuple(p.get('Values')))
+
+            # mesh partitions are removed from the comparison as they are matched, leaving those missing in the producer
+            for p in self._producer_automator.iter_table_partitions(database_name=source_database_name,
+                                                                    table_name=table_name,
+                                                                    exclude_column_schema=not compare_definitions):
+                values = tuple(p.get('Values'))
+                created = p.get('CreationTime')
+                if created is not None and (diff['LatestCreationTime'] is None or created > diff['LatestCreationTime']):
+                    diff['LatestCreationTime'] = created
+
+                if mesh_table is None:
+                    diff['CreateCount'] += 1
+                elif compare_definitions is True:
+                    mesh_fingerprint = mesh_fingerprints.pop(values, None)
+                    if mesh_fingerprint is None:
+                        diff['Create'].add(values)
+                    elif mesh_fingerprint != utils.generate_partition_fingerprint(p):
+                        diff['Update'].add(values)
+                elif values in mesh_values:
+                    mesh_values.discard(values)
+                else:
+                    diff['Create'].add(values)
+
+            if mesh_table is not None:
+                diff['CreateCount'] = len(diff['Create'])
+                if remove_missing_partitions is True:
+                    diff['Delete'] = mesh_values | set(mesh_fingerprints.keys())
+
+            return diff
+
+        partitioned_tables = [t for t in all_tables if len(t.get('PartitionKeys', [])) > 0]
+        with ThreadPoolExecutor(max_workers=use_workers) as executor:
+            partition_diffs = dict(zip([t.get('Name') for t in partitioned_tables],
+                                       executor.map(_partition_diff, partitioned_tables)))
+
+        producer_perms = {'INSERT', 'SELECT', 'ALTER', 'DELETE', 'DESCRIBE'}
+        planned_partition_diffs = {}
+        for t in all_tables:
+            table_name = t.get('Name')
+            mesh_table = mesh_tables.get(table_name)
+            table_s3_path = t.get('StorageDescriptor').get('Location')
+            table_s3_arn = utils.convert_s3_path_to_arn(table_s3_path)
+            actions = []
+
+            if table_s3_arn not in registered_locations:
+                actions.append(PLAN_ACTION_REGISTER_LOCATION)
+
+            if table_s3_arn not in granted_locations:
+                actions.append(PLAN_ACTION_GRANT_LOCATION)
+
+            if mesh_table is None:
+                actions.append(PLAN_ACTION_CREATE_TABLE)
+            elif sync_table_definitions is True and mesh_table.get('Parameters', {}).get(
+                    TABLE_FINGERPRINT_PARAMETER) != self._make_mesh_table_input(
+                    table_def=t, producer_account_id=self._data_producer_account_id).get('Parameters').get(
+                    TABLE_FINGERPRINT_PARAMETER):
+                actions.append(PLAN_ACTION_UPDATE_TABLE)
+
+            table_plan = {
+                'Table': table_name
+            }
+
+            partition_diff = partition_diffs.get(table_name)
+            if partition_diff is not None:
+                removed_partitions = partition_diff.get('Delete') or set()
+                if partition_diff.get('CreateCount') > 0 or len(removed_partitions) > 0 or len(
+                        partition_diff.get('Update')) > 0:
+                    actions.append(PLAN_ACTION_SYNC_PARTITIONS)
+                    table_plan['PartitionsToCreate'] = partition_diff.get('CreateCount')
+                    table_plan['PartitionsToDelete'] = len(removed_partitions)
+                    if sync_table_definitions is True:
+                        table_plan['PartitionsToUpdate'] = len(partition_diff.get('Update'))
+                    planned_partition_diffs[table_name] = partition_diff
+
+            granted = producer_table_permissions.get(table_name, set())
+            read_only_granted = read_only_table_permissions.get(table_name, set())
+            if ('ALL' not in granted and not producer_perms.issubset(granted)) or (
+                    create_public_metadata is True and 'ALL' not in read_only_granted and
+                    'DESCRIBE' not in read_only_granted):
+                actions.append(PLAN_ACTION_GRANT_TABLE)
+
+            current_tags = mesh_table.get('Tags', {}) if mesh_table is not None else {}
+            tags_to_attach = {}
+            for tag_key, tag_body in self._get_table_tags(table=t, domain=domain,
+                                                          data_product_name=data_product_name).items():
+                if sorted(current_tags.get(tag_key, {}).get('TagValues', [])) != sorted(tag_body.get('TagValues')):
+                    tags_to_attach[tag_key] = tag_body.get('TagValues')
+            if len(tags_to_attach) > 0:
+                actions.append(PLAN_ACTION_ATTACH_TAGS)
+                table_plan['TagsToAttach'] = tags_to_attach
+
+            if bucket_updates.get(table_s3_path.split("/")[2]) is True:
+                actions.append(PLAN_ACTION_UPDATE_BUCKET_POLICY)
+
+            link_table_name = f"{table_name}_link"
+            if expose_table_references_with_suffix is not None:
+                link_table_name = f"{table_name}{expose_table_references_with_suffix}"
+            if link_table_name not in producer_links:
+                actions.append(PLAN_ACTION_CREATE_LINK)
+
+            if sync_mesh_catalog_schedule is not None and f"{data_mesh_database_name}-{table_name}" not in crawlers:
+                actions.append(PLAN_ACTION_CREATE_CRAWLER)
+
+            table_plan['Actions'] = actions
+            plan['Tables'].append(table_plan)
+
+        return plan, planned_partition_diffs, mesh_tables
+
+    def plan_data_products(self, source_database_name: str,
+                           create_public_metadata: bool = True,
+                           table_name_regex: str = None,
+                           domain: str = None,
+                           data_product_name: str = None,
+                           sync_mesh_catalog_schedule: str = None,
+                           expose_data_mesh_db_name: str = None,
+                           expose_table_references_with_suffix: str = "_link",
+                           remove_missing_partitions: bool = False,
+                           max_workers: int = 1,
+                           sync_table_definitions: bool = False) -> dict:
+        '''
+        Dry run of create_data_products. Loads the current state of the mesh with bulk reads and returns the actions which
+        would be needed to publish the database and each table, without making any changes
+        :param source_database_name:
+        :param table_name_regex:
+        :param max_workers:
+        :param sync_table_definitions: include updates to mesh tables and partitions which differ from the producer
+        :return: dict of the Database, its Actions, and the Actions for each of its Tables
+        '''
+        data_mesh_database_name = self._make_database_name(source_database_name)
+        if expose_data_mesh_db_name is not None:
+            data_mesh_database_name = expose_data_mesh_db_name
+
+        all_tables = self._producer_automator.load_glue_tables(
+            catalog_id=self._data_producer_account_id,
+            source_db_name=source_database_name,
+            table_name_regex=table_name_regex
+        )
+
+        plan, _, _ = self._plan_data_products(
+            source_database_name=source_database_name,
+            data_mesh_database_name=data_mesh_database_name,
+            all_tables=all_tables,
+            create_public_metadata=create_public_metadata,
+            domain=domain,
+            data_product_name=data_product_name,
+            sync_mesh_catalog_schedule=sync_mesh_catalog_schedule,
+            expose_table_references_with_suffix=expose_table_references_with_suffix,
+            remove_missing_partitions=remove_missing_partitions,
+            max_workers=max_workers,
+            sync_table_definitions=sync_table_definitions
+        )
+
+        self._logger.info(f"Database {data_mesh_database_name}: {plan.get('Actions')}")
+        for table_plan in plan.get('Tables'):
+            self._logger.info(f"Table {table_plan.get('Table')}: {table_plan.get('Actions')}")
+
+        return plan
+
     def create_data_products(self, source_database_name: str,
                              create_public_metadata: bool = True,
                              table_name_regex: str = None,
@@ -188,19 +894,37 @@ class DataMeshProducer:
                              sync_mesh_catalog_schedule: str = None,
                              sync_mesh_crawler_role_arn: str = None,
                              expose_data_mesh_db_name: str = None,
-                             expose_table_references_with_suffix: str = "_link"):
+                             expose_table_references_with_suffix: str = "_link",
+                             max_workers: int = 1,
+                             incremental_partition_sync: bool = False,
+                             remove_missing_partitions: bool = False,
+                             diff_only: bool = False,
+                             sync_table_definitions: bool = False) -> list:
+        '''
+        Creates data products in the mesh for all tables in the source database that match the table name regex.
+        Tables are published concurrently by up to max_workers threads, and a per-table report of success or failure
+        is returned rather than aborting on the first error.
+        :param source_database_name:
+        :param table_name_regex:
+        :param max_workers:
+        :param incremental_partition_sync: only copy partitions created since the last sync of each table
+        :param remove_missing_partitions: remove mesh partitions which no longer exist in the source table
+        :param diff_only: plan the publish as plan_data_products does, and only make the changes in the plan. Tables
+        which are already up to date are not modified
+        :param sync_table_definitions: update existing mesh tables and partitions whose definitions have changed in the
+        producer, such as after a schema change, so that a crawler is not needed to keep the mesh metadata current
+        :return:
+        '''
         # generate the target database name for the mesh
         data_mesh_database_name = self._make_database_name(source_database_name)
         if expose_data_mesh_db_name is not None:
             data_mesh_database_name = expose_data_mesh_db_name
 
-        # create clients for the current account and with the new credentials in the data mesh account
-        producer_glue_client = self._session.client('glue', region_name=self._current_region)
-        producer_lf_client = self._session.client('lakeformation', region_name=self._current_region)
+        # get pooled clients with the credentials in the data mesh account
         data_mesh_glue_client = utils.generate_client(service='glue', region=self._current_region,
-                                                      credentials=self._data_mesh_credentials)
+                                                      credentials=self._get_data_mesh_credentials())
         data_mesh_lf_client = utils.generate_client(service='lakeformation', region=self._current_region,
-                                                    credentials=self._data_mesh_credentials)
+                                                    credentials=self._get_data_mesh_credentials())
 
         # load the specified tables to be created as data products
         all_tables = self._producer_automator.load_glue_tables(
@@ -209,40 +933,231 @@ class DataMeshProducer:
             table_name_regex=table_name_regex
         )
 
+        plan = None
+        partition_diffs = {}
+        mesh_tables = None
+        if diff_only is True:
+            plan, partition_diffs, mesh_tables = self._plan_data_products(
+                source_database_name=source_database_name,
+                data_mesh_database_name=data_mesh_database_name,
+                all_tables=all_tables,
+                create_public_metadata=create_public_metadata,
+                domain=domain,
+                data_product_name=data_product_name,
+                sync_mesh_catalog_schedule=sync_mesh_catalog_schedule,
+                expose_table_references_with_suffix=expose_table_references_with_suffix,
+                remove_missing_partitions=remove_missing_partitions,
+                max_workers=max_workers,
+                sync_table_definitions=sync_table_definitions
+            )
+
+        def _planned(action: str) -> bool:
+            return plan is None or action in plan.get('Actions')
+
         # get or create the target database exists in the mesh account
-        self._mesh_automator.get_or_create_database(
-            database_name=data_mesh_database_name,
-            database_desc="Database to contain objects from Source Database %s.%s" % (
-                self._data_producer_account_id, source_database_name)
-        )
-        self._logger.info("Validated Data Mesh Database %s" % data_mesh_database_name)
+        if _planned(PLAN_ACTION_CREATE_DATABASE):
+            self._get_mesh_automator().get_or_create_database(
+                database_name=data_mesh_database_name,
+                database_desc="Database to contain objects from Source Database %s.%s" % (
+                    self._data_producer_account_id, source_database_name)
+            )
+            self._logger.info("Validated Data Mesh Database %s" % data_mesh_database_name)
 
-        # set default permissions on db
-        self._mesh_automator.set_default_db_permissions(database_name=data_mesh_database_name)
+            # set default permissions on db
+            self._get_mesh_automator().set_default_db_permissions(database_name=data_mesh_database_name)
+
+        # the database and table grants of the whole run are collected, and sent in batches once every table is created
+        grants = self._get_mesh_automator().create_grant_accumulator(catalog_id=self._data_mesh_account_id,
+                                                                     max_workers=max(1, max_workers))
 
         # grant the producer permissions to create tables on this database
-        self._mesh_automator.lf_grant_permissions(
-            data_mesh_account_id=self._data_mesh_account_id,
-            principal=self._data_producer_account_id,
-            database_name=data_mesh_database_name,
-            permissions=['CREATE_TABLE', 'DESCRIBE'],
-            grantable_permissions=None
-        )
-        self._logger.info("Granted access on Database %s to Producer" % data_mesh_database_name)
+        database_grant_id = None
+        if _planned(PLAN_ACTION_GRANT_DATABASE):
+            database_grant_id = grants.add_grant(
+                principal=self._data_producer_account_id,
+                database_name=data_mesh_database_name,
+                permissions=['CREATE_TABLE', 'DESCRIBE'],
+                grantable_permissions=None
+            )
 
         # get or create a data mesh shared database in the producer account
-        self._producer_automator.get_or_create_database(
-            database_name=data_mesh_database_name,
-            database_desc="Database to contain objects objects shared with the Data Mesh Account",
+        if _planned(PLAN_ACTION_CREATE_PRODUCER_DATABASE):
+            self._producer_automator.get_or_create_database(
+                database_name=data_mesh_database_name,
+                database_desc="Database to contain objects objects shared with the Data Mesh Account",
+            )
+            self._logger.info("Validated Producer Account Database %s" % data_mesh_database_name)
+
+        # the tables already in the mesh, so that unchanged table definitions are not written again. In diff mode these
+        # were loaded by the plan
+        if mesh_tables is None:
+            mesh_tables = {t.get('Name'): t for t in self._get_mesh_automator().load_glue_tables(
+                catalog_id=self._data_mesh_account_id,
+                source_db_name=data_mesh_database_name,
+                table_name_regex=table_name_regex,
+                load_lf_tags=False,
+                allow_empty=True
+            )}
+
+        # in diff mode, only the tables with planned actions are published
+        table_plans = {}
+        publish_tables = all_tables
+        if plan is not None:
+            table_plans = {tp.get('Table'): tp for tp in plan.get('Tables')}
+            publish_tables = [t for t in all_tables if len(table_plans.get(t.get('Name')).get('Actions')) > 0]
+            self._logger.info(f"Plan requires changes to {len(publish_tables)} of {len(all_tables)} Tables")
+
+        publish_args = {
+            "source_database_name": source_database_name,
+            "data_mesh_database_name": data_mesh_database_name,
+            "data_mesh_glue_client": data_mesh_glue_client,
+            "data_mesh_lf_client": data_mesh_lf_client,
+            "create_public_metadata": create_public_metadata,
+            "domain": domain,
+            "data_product_name": data_product_name,
+            "sync_mesh_catalog_schedule": sync_mesh_catalog_schedule,
+            "sync_mesh_crawler_role_arn": sync_mesh_crawler_role_arn,
+            "expose_table_references_with_suffix": expose_table_references_with_suffix,
+            "incremental_partition_sync": incremental_partition_sync,
+            "remove_missing_partitions": remove_missing_partitions,
+            "sync_table_definitions": sync_table_definitions,
+            "grants": grants
+        }
+
+        # publish tables on a bounded worker pool, recording the outcome of each table rather than aborting the run.
+        # bucket policy entries are collected during the run, so that each bucket policy is written at most once
+        results = {}
+        created_tables = {}
+        publish_table_names = set(t.get('Name') for t in publish_tables)
+        for t in all_tables:
+            if t.get('Name') not in publish_table_names:
+                results[t.get('Name')] = {
+                    "Table": t.get('Name'),
+                    "Status": PUBLISH_STATUS_SUCCESS,
+                    "LinkTable": None
+                }
+
+        with self._producer_automator.bucket_policy_batch() as bucket_policies:
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                futures = {executor.submit(self._publish_table, table=t, table_plan=table_plans.get(t.get('Name')),
+                                           partition_diff=partition_diffs.get(t.get('Name')),
+                                           mesh_table=mesh_tables.get(t.get('Name')),
+                                           bucket_policies=bucket_policies,
+                                           **publish_args): t.get('Name') for t in publish_tables}
+
+                for future in as_completed(futures):
+                    table_name = futures[future]
+                    try:
+                        created_tables[table_name] = future.result()
+                        results[table_name] = {
+                            "Table": table_name,
+                            "Status": PUBLISH_STATUS_SUCCESS,
+                            "LinkTable": None
+                        }
+                    except Exception as e:
+                        self._logger.error(f"Failed to publish Table {table_name}: {e}")
+                        results[table_name] = {
+                            "Table": table_name,
+                            "Status": PUBLISH_STATUS_FAILED,
+                            "Error": str(e)
+                        }
+
+        bucket_failures = bucket_policies.get_failures()
+
+        # send every grant of the run, before the resource links which depend on the RAM shares they create
+        grant_outcomes = grants.flush()
+
+        database_grant_error = None
+        if database_grant_id is not None:
+            database_grant_error = grant_outcomes.get(database_grant_id).get('Error')
+            if database_grant_error is None:
+                self._logger.info("Granted access on Database %s to Producer" % data_mesh_database_name)
+
+        for table_name, (_, link_table_name, grant_ids, link_planned) in created_tables.items():
+            errors = [grant_outcomes.get(g).get('Error') for g in grant_ids if 'Error' in grant_outcomes.get(g)]
+            if database_grant_error is not None:
+                errors.insert(0, database_grant_error)
+
+            if len(errors) > 0:
+                results[table_name] = {
+                    "Table": table_name,
+                    "Status": PUBLISH_STATUS_FAILED,
+                    "Error": f"Exception while granting LakeFormation Permissions on "
+                             f"{data_mesh_database_name}.{table_name}: {'; '.join(errors)}"
+                }
+            elif link_planned or (len(grant_ids) > 0 and grant_outcomes.get(grant_ids[-1]).get('Granted') is True):
+                # only a new grant creates a RAM share to accept, unless the plan found the resource link to be missing
+                results[table_name]["LinkTable"] = link_table_name
+
+        # accept the RAM shares for newly shared tables and create their resource links
+        link_failures = self._create_resource_links(
+            data_mesh_database_name=data_mesh_database_name,
+            link_tables={r.get('Table'): r.get('LinkTable') for r in results.values() if
+                         r.get('Status') == PUBLISH_STATUS_SUCCESS and r.get('LinkTable') is not None},
+            max_workers=max_workers
         )
-        self._logger.info("Validated Producer Account Database %s" % data_mesh_database_name)
+        for table_name, error in link_failures.items():
+            results[table_name] = {
+                "Table": table_name,
+                "Status": PUBLISH_STATUS_FAILED,
+                "Error": error
+            }
+
+        # tables in a bucket whose policy could not be written are not accessible from the mesh
+        for t in all_tables:
+            table_bucket = t.get('StorageDescriptor').get('Location').split("/")[2]
+            if table_bucket in bucket_failures and results.get(t.get('Name')).get('Status') == PUBLISH_STATUS_SUCCESS:
+                results[t.get('Name')] = {
+                    "Table": t.get('Name'),
+                    "Status": PUBLISH_STATUS_FAILED,
+                    "Error": bucket_failures.get(table_bucket)
+                }
+
+        if plan is not None:
+            for t in all_tables:
+                results.get(t.get('Name'))['Actions'] = table_plans.get(t.get('Name')).get('Actions')
+
+        report = [results.get(t.get('Name')) for t in all_tables]
+        failed = len([r for r in report if r.get('Status') == PUBLISH_STATUS_FAILED])
+        self._logger.info(f"Published {len(report) - failed} of {len(report)} Tables to {data_mesh_database_name}")
+
+        return report
+
+    def _publish_table(self, table: dict, source_database_name: str, data_mesh_database_name: str,
+                       data_mesh_glue_client, data_mesh_lf_client, create_public_metadata: bool, domain: str,
+                       data_product_name: str, sync_mesh_catalog_schedule: str, sync_mesh_crawler_role_arn: str,
+                       expose_table_references_with_suffix: str, incremental_partition_sync: bool = False,
+                       remove_missing_partitions: bool = False, table_plan: dict = None,
+                       partition_diff: dict = None, mesh_table: dict = None,
+                       sync_table_definitions: bool = False, grants: GrantAccumulator = None,
+                       bucket_policies: BucketPolicyBatch = None):
+        '''
+        Publishes a single source table as a data product in the mesh: registers its location, creates the mesh table
+        and its partitions, propagates tags, and updates the bucket policy. Safe to run concurrently for different tables.
+        :param table:
+        :param source_database_name:
+        :param data_mesh_database_name:
+        :param table_plan: the plan for the table from _plan_data_products. Only the planned actions are run, or every
+        step if no plan is provided
+        :param partition_diff: the planned partition changes, which are applied without listing the partitions again
+        :param mesh_table: the existing mesh table, if there is one
+        :param sync_table_definitions: update the mesh table if the producer definition has changed
+        :param grants: the grant accumulator for the run, to which the table grants are added
+        :param bucket_policies: the bucket policy batch of the run, to which the bucket policy entry is added. The bucket
+        policy is written immediately if no batch is provided
+        :return:
+        '''
+        actions = table_plan.get('Actions') if table_plan is not None else None
 
-        for table in all_tables:
-            table_s3_path = table.get('StorageDescriptor').get('Location')
+        def _planned(action: str) -> bool:
+            return actions is None or action in actions
 
-            table_s3_arn = utils.convert_s3_path_to_arn(table_s3_path)
+        table_s3_path = table.get('StorageDescriptor').get('Location')
 
-            # create a data lake location for the s3 path
+        table_s3_arn = utils.convert_s3_path_to_arn(table_s3_path)
+
+        # create a data lake location for the s3 path
+        if _planned(PLAN_ACTION_REGISTER_LOCATION):
             try:
                 data_mesh_lf_client.register_resource(
                     ResourceArn=table_s3_arn,
@@ -251,14 +1166,11 @@ class DataMeshProducer:
             except data_mesh_lf_client.exceptions.AlreadyExistsException:
                 pass
 
-            # grant data lake location access
-            producer_central_role_arn = utils.get_role_arn(account_id=self._data_mesh_account_id,
-                                                           role_name=utils.get_central_role_name(
-                                                               account_id=self._data_producer_account_id,
-                                                               type=PRODUCER))
+        # grant data lake location access
+        if _planned(PLAN_ACTION_GRANT_LOCATION):
             data_mesh_lf_client.grant_permissions(
                 Principal={
-                    'DataLakePrincipalIdentifier': producer_central_role_arn
+                    'DataLakePrincipalIdentifier': self._get_producer_central_role_arn()
                 },
                 Resource={
                     'DataLocation': {'ResourceArn': table_s3_arn}
@@ -266,59 +1178,59 @@ class DataMeshProducer:
                 Permissions=['DATA_LOCATION_ACCESS']
             )
 
-            # create a mesh table for the local copy
-            created_table = self._create_mesh_table(
-                table_def=table,
-                data_mesh_glue_client=data_mesh_glue_client,
-                source_database_name=source_database_name,
-                data_mesh_database_name=data_mesh_database_name,
-                producer_account_id=self._data_producer_account_id,
-                data_mesh_account_id=self._data_mesh_account_id,
-                create_public_metadata=create_public_metadata,
-                expose_table_references_with_suffix=expose_table_references_with_suffix
-            )
+        # create a mesh table for the local copy
+        created_table = self._create_mesh_table(
+            table_def=table,
+            data_mesh_glue_client=data_mesh_glue_client,
+            source_database_name=source_database_name,
+            data_mesh_database_name=data_mesh_database_name,
+            producer_account_id=self._data_producer_account_id,
+            data_mesh_account_id=self._data_mesh_account_id,
+            create_public_metadata=create_public_metadata,
+            expose_table_references_with_suffix=expose_table_references_with_suffix,
+            incremental_partition_sync=incremental_partition_sync,
+            remove_missing_partitions=remove_missing_partitions,
+            actions=actions,
+            partition_diff=partition_diff,
+            mesh_table=mesh_table,
+            sync_table_definitions=sync_table_definitions,
+            grants=grants
+        )
 
-            # propagate lakeformation tags and attach to table
-            if 'Tags' in table:
-                for tag in table.get('Tags').items():
-                    self._mesh_automator.attach_tag(database=data_mesh_database_name, table=table.get('Name'), tag=tag)
-
-            # add the domain tag
-            if domain is not None:
-                self._mesh_automator.attach_tag(
-                    database=data_mesh_database_name,
-                    table=table.get('Name'),
-                    tag=(DOMAIN_TAG_KEY, {'TagValues': [domain], 'ValidValues': [domain]})
-                )
+        # propagate lakeformation tags, including the domain and data product tags, and attach to table
+        tags_to_attach = self._get_table_tags(table=table, domain=domain, data_product_name=data_product_name)
+        if table_plan is not None:
+            tags_to_attach = {k: v for k, v in tags_to_attach.items() if k in table_plan.get('TagsToAttach', {})}
 
-            # add the data product tag
-            if data_product_name is not None:
-                self._mesh_automator.attach_tag(
-                    database=data_mesh_database_name,
-                    table=table.get('Name'),
-                    tag=(DATA_PRODUCT_TAG_KEY, {'TagValues': [data_product_name], 'ValidValues': [data_product_name]})
-                )
+        for tag in tags_to_attach.items():
+            self._get_mesh_automator().attach_tag(database=data_mesh_database_name, table=table.get('Name'), tag=tag)
 
-            # add a bucket policy entry allowing the data mesh lakeformation service linked role to perform GetObject*
+        # add a bucket policy entry allowing the data mesh lakeformation service linked role to perform GetObject*
+        if _planned(PLAN_ACTION_UPDATE_BUCKET_POLICY):
             table_bucket = table_s3_path.split("/")[2]
-            self._producer_automator.add_bucket_policy_entry(
-                principal_account=self._data_mesh_account_id,
-                access_path=table_bucket
+            if bucket_policies is not None:
+                bucket_policies.add(principal_accounts=[self._data_mesh_account_id], access_path=table_bucket)
+            else:
+                self._producer_automator.add_bucket_policy_entry(
+                    principal_account=self._data_mesh_account_id,
+                    access_path=table_bucket
+                )
+
+        if sync_mesh_catalog_schedule is not None and _planned(PLAN_ACTION_CREATE_CRAWLER):
+            glue_crawler = self._producer_automator.create_crawler(
+                database_name=data_mesh_database_name,
+                table_name=table.get('Name'),
+                s3_location=table_s3_path,
+                crawler_role=sync_mesh_crawler_role_arn,
+                sync_schedule=sync_mesh_catalog_schedule
             )
 
-            if sync_mesh_catalog_schedule is not None:
-                glue_crawler = self._producer_automator.create_crawler(
-                    database_name=data_mesh_database_name,
-                    table_name=created_table,
-                    s3_location=table_s3_path,
-                    crawler_role=sync_mesh_crawler_role_arn,
-                    sync_schedule=sync_mesh_catalog_schedule
-                )
+        return created_table
 
     def get_data_product(self, database_name: str, table_name_regex: str):
         # generate a new glue client for the data mesh account
         data_mesh_glue_client = utils.generate_client('glue', region=self._current_region,
-                                                      credentials=self._data_mesh_credentials)
+                                                      credentials=self._get_data_mesh_credentials())
         # grab the tables that match the regex
         all_tables = self._load_glue_tables(
             glue_client=data_mesh_glue_client,
@@ -339,8 +1251,8 @@ class DataMeshProducer:
         with close_access_request()
         :return:
         '''
-        me = self._sts_client.get_caller_identity().get('Account')
-        return self._subscription_tracker.list_subscriptions(owner_id=me, request_status=STATUS_PENDING)
+        me = utils.get_caller_identity(session=self._session).get('Account')
+        return self._get_subscription_tracker().list_subscriptions(owner_id=me, request_status=STATUS_PENDING)
 
     def approve_access_request(self, request_id: str,
                                grant_permissions: list = None,
@@ -354,95 +1266,229 @@ class DataMeshProducer:
         :param decision_notes:
         :return:
         '''
-        # load the subscription
-        subscription = self._subscription_tracker.get_subscription(subscription_id=request_id)
-
-        # approver can override the requested grants
-        if grant_permissions is None:
-            set_permissions = subscription.get(REQUESTED_GRANTS)
-        else:
-            set_permissions = grant_permissions
-
-        # grant the approved permissions in lake formation
-        data_mesh_lf_client = utils.generate_client(service='lakeformation', region=self._current_region,
-                                                    credentials=self._data_mesh_credentials)
-        tables = subscription.get(TABLE_NAME)
-        ram_shares = {}
-
-        table_arns = []
-        for t in tables:
-            # resolve the original database name
+        report = self.approve_access_requests(request_ids=[request_id], grant_permissions=grant_permissions,
+                                              grantable_permissions=grantable_permissions,
+                                              decision_notes=decision_notes)
+
+        if report[0].get('Status') == APPROVAL_STATUS_FAILED:
+            raise Exception(report[0].get('Error'))
+
+    def approve_access_requests(self, request_ids: list,
+                                grant_permissions: list = None,
+                                grantable_permissions: list = None,
+                                decision_notes: str = None,
+                                max_workers: int = 4) -> list:
+        '''
+        API to approve a set of access requests together. Requests are grouped so that each table pattern is resolved
+        once, identical Lake Formation grants are made once, and each bucket policy and the catalog resource policy are
+        written once. A failure only fails the requests which depend on the failed step, and a per-request report of
+        success or failure is returned.
+        :param request_ids:
+        :param grant_permissions: permissions to grant for every request, overriding the requested grants
+        :param grantable_permissions:
+        :param decision_notes:
+        :param max_workers: number of concurrent calls per approval step
+        :return:
+        '''
+        use_request_ids = list(dict.fromkeys(request_ids))
+        subscriptions = self._get_subscription_tracker().get_subscriptions(subscription_ids=use_request_ids)
+        errors = {}
+
+        def _fail(request_id: str, error):
+            # keep the first error for each request
+            if request_id not in errors:
+                errors[request_id] = str(error)
+
+        def _active_requests() -> list:
+            return [r for r in use_request_ids if r not in errors]
+
+        def _run_grouped(tasks: dict, fn, step_name: str) -> dict:
+            # runs each task concurrently, failing every request which depends on a failed task
+            outcomes = {}
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                futures = {executor.submit(fn, key): key for key in tasks}
+
+                for future in as_completed(futures):
+                    key = futures[future]
+                    try:
+                        outcomes[key] = future.result()
+                    except Exception as e:
+                        self._logger.error(f"Failed to {step_name} for {key}: {e}")
+                        for request_id in tasks.get(key):
+                            _fail(request_id, e)
+
+            return outcomes
+
+        for request_id in use_request_ids:
+            if request_id not in subscriptions:
+                _fail(request_id, f"Subscription {request_id} does not exist")
+            elif subscriptions.get(request_id).get(TABLE_NAME) is None:
+                _fail(request_id, f"Subscription {request_id} does not contain any Tables")
+
+        # resolve the tables of each request, loading each database and table pattern only once
+        resolved_tables = {}
+        request_tables = {}
+        for request_id in _active_requests():
+            subscription = subscriptions.get(request_id)
             original_db = subscription.get(DATABASE_NAME).replace(f"-{self._data_producer_account_id}", "")
+            request_tables[request_id] = []
 
-            # get the catalog definition of this table including if its a regex subscription
-            all_tables = self._producer_automator.load_glue_tables(
-                catalog_id=self._data_producer_account_id,
-                source_db_name=original_db,
-                table_name_regex=t,
-                load_lf_tags=False
+            for t in subscription.get(TABLE_NAME):
+                try:
+                    if (original_db, t) not in resolved_tables:
+                        resolved_tables[(original_db, t)] = self._producer_automator.load_glue_tables(
+                            catalog_id=self._data_producer_account_id,
+                            source_db_name=original_db,
+                            table_name_regex=t,
+                            load_lf_tags=False
+                        )
+                except Exception as e:
+                    _fail(request_id, e)
+                    break
+
+                for resolved_table in resolved_tables.get((original_db, t)):
+                    # get the bucket of the data location for the table
+                    table_bucket = resolved_table.get('StorageDescriptor').get('Location').split("/")[2]
+                    request_tables[request_id].append((resolved_table.get('Name'), table_bucket))
+
+        def _principal(request_id: str) -> str:
+            return subscriptions.get(request_id).get(SUBSCRIBER_PRINCIPAL)
+
+        def _database(request_id: str) -> str:
+            return subscriptions.get(request_id).get(DATABASE_NAME)
+
+        # add a bucket policy entry allowing each consumer lakeformation service linked role to perform GetObject*
+        bucket_tasks = {}
+        for request_id in _active_requests():
+            for _, table_bucket in request_tables.get(request_id):
+                bucket_tasks.setdefault(table_bucket, []).append(request_id)
+
+        _run_grouped(bucket_tasks, lambda bucket: self._producer_automator.add_bucket_policy_entries(
+            principal_accounts=list(dict.fromkeys([_principal(r) for r in bucket_tasks.get(bucket)])),
+            access_path=bucket
+        ), "update Bucket Policy")
+
+        # grant describe on each database, and the validated permissions on each table, once per distinct grant
+        grant_tasks = {}
+        for request_id in _active_requests():
+            if grant_permissions is None:
+                set_permissions = subscriptions.get(request_id).get(REQUESTED_GRANTS)
+            else:
+                set_permissions = grant_permissions
+
+            grant_tasks.setdefault((_principal(request_id), _database(request_id), None, ('DESCRIBE',), None),
+                                   []).append(request_id)
+            for table_name, _ in request_tables.get(request_id):
+                grant = (_principal(request_id), _database(request_id), table_name, tuple(set_permissions),
+                         tuple(grantable_permissions) if grantable_permissions is not None else None)
+                grant_tasks.setdefault(grant, []).append(request_id)
+
+        # send the grants in concurrent batches, failing the requests which depend on a failed grant
+        grants = self._get_mesh_automator().create_grant_accumulator(catalog_id=self._data_mesh_account_id,
+                                                                     max_workers=max_workers)
+        grant_ids = {}
+        for grant, grant_request_ids in grant_tasks.items():
+            principal, database_name, table_name, permissions, grantable = grant
+            grant_id = grants.add_grant(
+                principal=principal,
+                database_name=database_name,
+                table_name=table_name,
+                permissions=list(permissions),
+                grantable_permissions=list(grantable) if grantable is not None else None
             )
+            grant_ids.setdefault(grant_id, []).extend(grant_request_ids)
+
+        for grant_id, outcome in grants.flush().items():
+            if 'Error' in outcome:
+                for request_id in grant_ids.get(grant_id):
+                    _fail(request_id, outcome.get('Error'))
+
+        # apply a glue catalog resource policy allowing each consumer to access objects by tag, in a single write
+        catalog_requests = _active_requests()
+        if len(catalog_requests) > 0:
+            changes = {}
+            for request_id in catalog_requests:
+                change = changes.setdefault((_principal(request_id), _database(request_id)), {
+                    'consumer_account_id': _principal(request_id),
+                    'database_name': _database(request_id),
+                    'tables': None
+                })
+                table_arns = subscriptions.get(request_id).get(TABLE_ARNS)
+                if table_arns is not None:
+                    change['tables'] = list(dict.fromkeys((change.get('tables') or []) + table_arns))
 
-            for resolved_table in all_tables:
-                table_name = resolved_table.get('Name')
-                # get the data location for the table
-                table_s3_path = resolved_table.get('StorageDescriptor').get('Location')
-
-                # add a bucket policy entry allowing the consumer lakeformation service linked role to perform GetObject*
-                table_bucket = table_s3_path.split("/")[2]
-                self._producer_automator.add_bucket_policy_entry(
-                    principal_account=subscription.get(SUBSCRIBER_PRINCIPAL),
-                    access_path=table_bucket
+            try:
+                self._get_mesh_automator().update_glue_catalog_resource_policy_entries(
+                    region=self._current_region,
+                    producer_account_id=self._data_mesh_account_id,
+                    changes=list(changes.values())
                 )
+            except Exception as e:
+                self._logger.error(f"Failed to update Catalog Resource Policy: {e}")
+                for request_id in catalog_requests:
+                    _fail(request_id, e)
 
-                # grant describe on the database
-                self._mesh_automator.lf_grant_permissions(
-                    data_mesh_account_id=self._data_mesh_account_id,
-                    principal=subscription.get(SUBSCRIBER_PRINCIPAL),
-                    database_name=subscription.get(DATABASE_NAME),
-                    permissions=['DESCRIBE'],
-                    grantable_permissions=None
-                )
+        # load the RAM shares created by the grants, once per principal and table
+        data_mesh_lf_client = utils.generate_client(service='lakeformation', region=self._current_region,
+                                                    credentials=self._get_data_mesh_credentials())
+        ram_tasks = {}
+        for request_id in _active_requests():
+            for table_name, _ in request_tables.get(request_id):
+                ram_tasks.setdefault((_principal(request_id), _database(request_id), table_name), []).append(
+                    request_id)
+
+        ram_share_results = _run_grouped(ram_tasks, lambda share: utils.load_ram_shares(
+            lf_client=data_mesh_lf_client,
+            data_mesh_account_id=self._data_mesh_account_id,
+            database_name=share[1], table_name=share[2],
+            target_principal=share[0]
+        ), "load RAM Shares")
+
+        # update each subscription to reflect the changes
+        report = {}
+        for request_id in _active_requests():
+            ram_shares = {}
+            table_arns = []
+            for table_name, _ in request_tables.get(request_id):
+                ram_shares.update(ram_share_results.get((_principal(request_id), _database(request_id), table_name)))
+                table_arns.append(utils.get_table_arn(region_name=self._current_region,
+                                                      catalog_id=self._data_mesh_account_id,
+                                                      database_name=_database(request_id),
+                                                      table_name=table_name))
 
-                # grant validated permissions to object
-                self._mesh_automator.lf_grant_permissions(
-                    data_mesh_account_id=self._data_mesh_account_id,
-                    principal=subscription.get(SUBSCRIBER_PRINCIPAL),
-                    database_name=subscription.get(DATABASE_NAME),
-                    table_name=table_name,
-                    permissions=set_permissions,
-                    grantable_permissions=grantable_permissions
+            try:
+                updated = self._get_subscription_tracker().update_status(
+                    subscription_id=request_id, status=STATUS_ACTIVE,
+                    permitted_grants=grant_permissions, notes=decision_notes, ram_shares=ram_shares,
+                    table_arns=table_arns
                 )
 
-                rs = utils.load_ram_shares(lf_client=data_mesh_lf_client,
-                                           data_mesh_account_id=self._data_mesh_account_id,
-                                           database_name=subscription.get(DATABASE_NAME), table_name=t,
-                                           target_principal=subscription.get(SUBSCRIBER_PRINCIPAL))
-                ram_shares.update(rs)
+                if updated is not True:
+                    raise Exception(f"Invalid State Transition for Subscription {request_id}")
 
-                # add the shared table arn to the list of ARNs
-                table_arns.append(utils.get_table_arn(region_name=self._current_region,
-                                                      catalog_id=self._data_mesh_account_id,
-                                                      database_name=subscription.get(DATABASE_NAME),
-                                                      table_name=table_name))
+                report[request_id] = {
+                    SUBSCRIPTION_ID: request_id,
+                    "Status": APPROVAL_STATUS_SUCCESS,
+                    TABLE_ARNS: table_arns,
+                    RAM_SHARES: ram_shares
+                }
+            except Exception as e:
+                _fail(request_id, e)
 
-                self._logger.info("Subscription RAM Shares")
-                self._logger.info(ram_shares)
+        for request_id, error in errors.items():
+            self._logger.error(f"Failed to approve Subscription {request_id}: {error}")
+            report[request_id] = {
+                SUBSCRIPTION_ID: request_id,
+                "Status": APPROVAL_STATUS_FAILED,
+                "Error": error
+            }
 
-            # apply a glue catalog resource policy allowing the consumer to access objects by tag
-            self.add_principal_to_glue_resource_policy(
-                database_name=subscription.get(DATABASE_NAME),
-                tables=subscription.get(TABLE_ARNS),
-                add_principal=subscription.get(SUBSCRIBER_PRINCIPAL)
-            )
+        self._logger.info(f"Approved {len(use_request_ids) - len(errors)} of {len(use_request_ids)} Subscriptions")
 
-        # update the subscription to reflect the changes
-        self._subscription_tracker.update_status(
-            subscription_id=request_id, status=STATUS_ACTIVE,
-            permitted_grants=grant_permissions, notes=decision_notes, ram_shares=ram_shares, table_arns=table_arns
-        )
+        return [report.get(r) for r in use_request_ids]
 
     def add_principal_to_glue_resource_policy(self, database_name: str, tables: list, add_principal: str):
-        self._mesh_automator.update_glue_catalog_resource_policy(
+        self._get_mesh_automator().update_glue_catalog_resource_policy(
             region=self._current_region,
             database_name=database_name,
             tables=tables,
@@ -458,7 +1504,7 @@ class DataMeshProducer:
         :param decision_notes:
         :return:
         '''
-        return self._subscription_tracker.update_status(
+        return self._get_subscription_tracker().update_status(
             subscription_id=request_id, status=STATUS_DENIED,
             notes=decision_notes
         )
@@ -471,13 +1517,13 @@ class DataMeshProducer:
         :param notes:
         :return:
         '''
-        return self._subscription_tracker.update_grants(
+        return self._get_subscription_tracker().update_grants(
             subscription_id=subscription_id, permitted_grants=grant_permissions,
             notes=notes
         )
 
     def get_subscription(self, request_id: str) -> dict:
-        return self._subscription_tracker.get_subscription(subscription_id=request_id)
+        return self._get_subscription_tracker().get_subscription(subscription_id=request_id)
 
     def delete_subscription(self, subscription_id: str, reason: str):
         '''
@@ -491,7 +1537,7 @@ class DataMeshProducer:
         if subscription is None:
             raise Exception("No Subscription Found")
         else:
-            lf_client = self._data_mesh_session.client('lakeformation')
+            lf_client = self._get_data_mesh_session().client('lakeformation')
 
             entries = []
             for t in subscription.get(TABLE_NAME):
@@ -547,4 +1593,4 @@ class DataMeshProducer:
                 Entries=entries
             )
 
-            return self._subscription_tracker.delete_subscription(subscription_id=subscription_id, reason=reason)
+            return self._get_subscription_tracker().delete_subscription(subscription_id=subscription_id, reason=reason)
@@ -1,6 +1,8 @@
 import sys
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 import boto3
 import botocore.exceptions
@@ -8,7 +10,13 @@ import shortuuid
 
 from data_mesh_util.lib.constants import *
 import json
+import copy
 import data_mesh_util.lib.utils as utils
+from data_mesh_util.lib.TtlCache import TtlCache
+from data_mesh_util.lib.GrantAccumulator import GrantAccumulator
+from data_mesh_util.lib.BucketPolicyBatch import BucketPolicyBatch
+from data_mesh_util.lib.RetryEngine import RetryEngine, get_default_retry_engine, is_transient_error
+from data_mesh_util.lib.DagExecutor import DagExecutor
 
 
 class ApiAutomator:
@@ -19,22 +27,52 @@ class ApiAutomator:
     # make sure we always log to standard out
     _logger.addHandler(logging.StreamHandler(sys.stdout))
     _clients = None
-
-    def __init__(self, target_account: str, session: boto3.session.Session, log_level: str = "INFO"):
+    _client_lock = None
+    _resource_locks = None
+    _resource_locks_guard = None
+    _lf_tag_cache = None
+    _retry_engine = None
+
+    def __init__(self, target_account: str, session: boto3.session.Session, log_level: str = "INFO",
+                 lf_tag_cache_ttl: int = 300, retry_engine: RetryEngine = None):
         self._target_account = target_account
         self._session = session
         self._logger.setLevel(log_level)
         self._clients = {}
+        self._client_lock = threading.Lock()
+        self._resource_locks = {}
+        self._resource_locks_guard = threading.Lock()
+        self._lf_tag_cache = TtlCache(ttl_seconds=lf_tag_cache_ttl, max_size=1024)
+        self._retry_engine = retry_engine if retry_engine is not None else get_default_retry_engine()
 
     def _get_client(self, client_name):
-        client = self._clients.get(client_name)
+        # clients come from the shared pool, so automators using the same credentials reuse warm clients
+        with self._client_lock:
+            client = self._clients.get(client_name)
 
-        if client is None:
-            client = self._session.client(client_name)
-            self._clients[client_name] = client
+            if client is None:
+                client = utils.generate_client(service=client_name, region=self._session.region_name,
+                                               credentials=self._session.get_credentials())
+                self._clients[client_name] = client
 
         return client
 
+    def _get_resource_lock(self, resource_key: str):
+        '''
+        Returns the lock used to serialize read-modify-write cycles against a single shared resource, such as a bucket
+        policy or the catalog resource policy, when the automator is used from multiple threads
+        :param resource_key:
+        :return:
+        '''
+        with self._resource_locks_guard:
+            lock = self._resource_locks.get(resource_key)
+
+            if lock is None:
+                lock = threading.RLock()
+                self._resource_locks[resource_key] = lock
+
+        return lock
+
     def _get_bucket_name(self, bucket_value):
         if 's3://' in bucket_value:
             return bucket_value.split('/')[2]
@@ -46,56 +84,120 @@ class ApiAutomator:
         Method to add a trust relationship to an AWS Account to a Role
         :return:
         '''
+        self.add_aws_trusts_to_role(
+            trust_role_arns=[utils.get_role_arn(account_id=account_id_to_trust, role_name=trust_role_name)],
+            update_role_name=update_role_name
+        )
+
+    def add_aws_trusts_to_role(self, trust_role_arns: list, update_role_name: str) -> bool:
+        '''
+        Adds trust relationships for a set of Role ARNs to a Role, with a single read and write of the trust policy.
+        Trust policy updates on the same Role are serialized, and the policy is only written if it changes
+        :param trust_role_arns:
+        :param update_role_name:
+        :return: True if the trust policy was updated
+        '''
         iam_client = self._get_client('iam')
 
-        # update the  trust policy to include the provided account ID
-        response = iam_client.get_role(RoleName=update_role_name)
+        with self._get_resource_lock(f"iam-trust/{update_role_name}"):
+            # update the trust policy to include the provided roles
+            response = iam_client.get_role(RoleName=update_role_name)
 
-        policy_doc = response.get('Role').get('AssumeRolePolicyDocument')
+            policy_doc = response.get('Role').get('AssumeRolePolicyDocument')
 
-        trust_role_name = utils.get_role_arn(account_id=account_id_to_trust, role_name=trust_role_name)
-        # add the account to the trust relationship
-        trusted_entities = policy_doc.get('Statement')[0].get('Principal').get('AWS')
-        if account_id_to_trust not in trusted_entities:
-            trusted_entities.append(trust_role_name)
-            policy_doc.get('Statement')[0].get('Principal')['AWS'] = trusted_entities
+            # add the roles to the trust relationship
+            principal = policy_doc.get('Statement')[0].get('Principal')
+            trusted_entities = principal.get('AWS')
+            if isinstance(trusted_entities, str):
+                trusted_entities = [trusted_entities]
 
-        print(policy_doc)
-        iam_client.update_assume_role_policy(RoleName=update_role_name, PolicyDocument=json.dumps(policy_doc))
+            to_add = [a for a in dict.fromkeys(trust_role_arns) if a not in trusted_entities]
+            if len(to_add) == 0:
+                self._logger.info(f"{update_role_name} already trusts {trust_role_arns}. No action required.")
+                return False
 
-        self._logger.info("Enabled Account %s to assume %s" % (account_id_to_trust, update_role_name))
+            principal['AWS'] = trusted_entities + to_add
+
+            self._logger.debug(policy_doc)
+            iam_client.update_assume_role_policy(RoleName=update_role_name, PolicyDocument=json.dumps(policy_doc))
+
+        self._logger.info(f"Enabled {to_add} to assume {update_role_name}")
+
+        return True
 
     def _validate_tag(self, tag_key: str, tag_body: dict) -> None:
+        with self._get_resource_lock(f"lf-tag/{tag_key}"):
+            self._validate_tag_unlocked(tag_key=tag_key, tag_body=tag_body)
+
+    def _get_lf_tag_cache_key(self, tag_key: str, catalog_id: str = None) -> tuple:
+        return catalog_id if catalog_id is not None else self._target_account, tag_key
+
+    def get_lf_tag_values(self, tag_key: str, catalog_id: str = None) -> list:
+        '''
+        Returns the valid values of an LF Tag, from the tag cache if it has been loaded recently
+        :param tag_key:
+        :param catalog_id:
+        :return:
+        '''
         lf_client = self._get_client('lakeformation')
 
-        # create the tag or validate it exists
-        try:
-            lf_client.create_lf_tag(
-                TagKey=tag_key,
-                TagValues=tag_body.get('ValidValues')
-            )
-        except lf_client.exceptions.AlreadyExistsException:
-            pass
-        except lf_client.exceptions.InvalidInputException as e:
-            if 'Tag key already exists' in str(e):
+        def _load():
+            args = {"TagKey": tag_key}
+            if catalog_id is not None:
+                args["CatalogId"] = catalog_id
+            return lf_client.get_lf_tag(**args).get('TagValues')
+
+        # return a copy so that callers can't modify the cached value
+        return list(self._lf_tag_cache.get_or_load(self._get_lf_tag_cache_key(tag_key, catalog_id), _load))
+
+    def _validate_tag_unlocked(self, tag_key: str, tag_body: dict, retry_stale: bool = True) -> None:
+        lf_client = self._get_client('lakeformation')
+        cache_key = self._get_lf_tag_cache_key(tag_key)
+
+        current_tag_values = self._lf_tag_cache.get(cache_key)
+        if current_tag_values is None:
+            # create the tag or validate it exists
+            try:
+                lf_client.create_lf_tag(
+                    TagKey=tag_key,
+                    TagValues=tag_body.get('ValidValues')
+                )
+            except lf_client.exceptions.AlreadyExistsException:
                 pass
-            else:
-                raise e
+            except lf_client.exceptions.InvalidInputException as e:
+                if 'Tag key already exists' in str(e):
+                    pass
+                else:
+                    raise e
+
+            current_tag_values = self.get_lf_tag_values(tag_key)
 
         # add all missing tag values to valid values (as they must have existed somewhere to be assigned)
-        current_tag_values = lf_client.get_lf_tag(
-            TagKey=tag_key
-        ).get('TagValues')
         missing_tag_values = []
         for value in tag_body.get('TagValues'):
             if value not in current_tag_values:
                 missing_tag_values.append(value)
 
         if len(missing_tag_values) > 0:
-            lf_client.update_lf_tag(
-                TagKey=tag_key,
-                TagValuesToAdd=missing_tag_values
-            )
+            try:
+                lf_client.update_lf_tag(
+                    TagKey=tag_key,
+                    TagValuesToAdd=missing_tag_values
+                )
+            except (lf_client.exceptions.InvalidInputException, lf_client.exceptions.EntityNotFoundException) as e:
+                # the cached definition is stale, such as when another process has added these values or deleted the
+                # tag, so reload it and try again once
+                self._lf_tag_cache.invalidate(cache_key)
+                if retry_stale is True:
+                    self._logger.debug(f"Reloading stale LF Tag {tag_key}: {e}")
+                    return self._validate_tag_unlocked(tag_key=tag_key, tag_body=tag_body, retry_stale=False)
+                raise e
+            except Exception as e:
+                # the cached definition may be stale, so reload it next time
+                self._lf_tag_cache.invalidate(cache_key)
+                raise e
+
+            self._lf_tag_cache.put(cache_key, current_tag_values + missing_tag_values)
 
     def attach_tag(self, database: str, table: str, tag: tuple):
         # create the tag or make sure it already exists
@@ -126,179 +228,216 @@ class ApiAutomator:
 
     def configure_iam(self, policy_name: str, policy_desc: str, policy_template: str, role_name: str, role_desc: str,
                       account_id: str, data_mesh_account_id: str, config: dict = None,
-                      additional_assuming_principals: dict = None, managed_policies_to_attach: list = None):
+                      additional_assuming_principals: dict = None, managed_policies_to_attach: list = None,
+                      max_workers: int = 4):
+        '''
+        Creates or updates the policy, user, group, role and assume role policy for a data mesh role. The steps run as
+        a dependency graph, so that independent steps such as policy creation and user and group creation run
+        concurrently
+        :return: tuple of role, user and group ARNs
+        '''
         iam_client = self._get_client('iam')
+        user_arn = "arn:aws:iam::%s:user%s%s" % (account_id, DATA_MESH_IAM_PATH, role_name)
+        group_name = f"{role_name}Group"
+        group_arn = "arn:aws:iam::%s:group%s%sGroup" % (account_id, DATA_MESH_IAM_PATH, role_name)
 
-        policy_arn = None
-        try:
-            # create an IAM Policy from the template
-            policy_doc = utils.generate_policy(policy_template, config)
+        def _create_policy(results: dict) -> str:
+            policy_arn = None
+            try:
+                # create an IAM Policy from the template
+                policy_doc = utils.generate_policy(policy_template, config)
 
-            response = iam_client.create_policy(
-                PolicyName=policy_name,
-                Path=DATA_MESH_IAM_PATH,
-                PolicyDocument=policy_doc,
-                Description=policy_desc,
-                Tags=DEFAULT_TAGS
-            )
-            policy_arn = response.get('Policy').get('Arn')
-            waiter = iam_client.get_waiter('policy_exists')
-            waiter.wait(PolicyArn=policy_arn)
-            self._logger.info(f"Policy {policy_name} created as {policy_arn}")
-        except iam_client.exceptions.EntityAlreadyExistsException:
-            policy_arn = utils.get_policy_arn(account_id, policy_name)
-            while True:
-                try:
-                    iam_client.create_policy_version(
-                        PolicyArn=policy_arn,
-                        PolicyDocument=policy_doc,
-                        SetAsDefault=True
-                    )
-                    self._logger.info(f"Policy {policy_name} version created as {policy_arn}")
-                    break
-                except iam_client.exceptions.LimitExceededException as le:
-                    if "versions" in str(le):
-                        versions = iam_client.list_policy_versions(
-                            PolicyArn=policy_arn,
-                            MaxItems=10
-                        )
+                response = iam_client.create_policy(
+                    PolicyName=policy_name,
+                    Path=DATA_MESH_IAM_PATH,
+                    PolicyDocument=policy_doc,
+                    Description=policy_desc,
+                    Tags=DEFAULT_TAGS
+                )
+                policy_arn = response.get('Policy').get('Arn')
+                waiter = iam_client.get_waiter('policy_exists')
+                waiter.wait(PolicyArn=policy_arn)
+                self._logger.info(f"Policy {policy_name} created as {policy_arn}")
+            except iam_client.exceptions.EntityAlreadyExistsException:
+                policy_arn = utils.get_policy_arn(account_id, policy_name)
 
-                        # delete the policy version at the last position
-                        last_index = len(versions.get('Versions')) - 1
-                        v = versions.get('Versions')[last_index].get('VersionId')
-                        iam_client.delete_policy_version(
+                def _create_policy_version():
+                    try:
+                        iam_client.create_policy_version(
                             PolicyArn=policy_arn,
-                            VersionId=v
+                            PolicyDocument=policy_doc,
+                            SetAsDefault=True
                         )
-                        self._logger.info(f"Deleted Policy Version {v}")
+                        self._logger.info(f"Policy {policy_name} version created as {policy_arn}")
+                    except iam_client.exceptions.LimitExceededException as le:
+                        if "versions" in str(le):
+                            versions = iam_client.list_policy_versions(
+                                PolicyArn=policy_arn,
+                                MaxItems=10
+                            )
+
+                            # delete the policy version at the last position
+                            last_index = len(versions.get('Versions')) - 1
+                            v = versions.get('Versions')[last_index].get('VersionId')
+                            iam_client.delete_policy_version(
+                                PolicyArn=policy_arn,
+                                VersionId=v
+                            )
+                            self._logger.info(f"Deleted Policy Version {v}")
+
+                        # after this we'll retry, and other limit errors are general throttling which we also retry
+                        raise le
+
+                self._retry_engine.call(
+                    "iam:CreatePolicyVersion", _create_policy_version,
+                    retry_on=lambda e: isinstance(e, iam_client.exceptions.LimitExceededException)
+                )
 
-                        # after this we'll retry immediately
-                    else:
-                        # this is a general throttling issue and we'll retry
-                        time.sleep(1)
+            return policy_arn
 
-        # create a non-root user who can assume the role
-        try:
-            response = iam_client.create_user(
-                Path=DATA_MESH_IAM_PATH,
-                UserName=role_name,
-                Tags=DEFAULT_TAGS
-            )
-            self._logger.info(f"Created new User {role_name}")
+        def _create_user(results: dict) -> str:
+            # create a non-root user who can assume the role
+            try:
+                iam_client.create_user(
+                    Path=DATA_MESH_IAM_PATH,
+                    UserName=role_name,
+                    Tags=DEFAULT_TAGS
+                )
+                self._logger.info(f"Created new User {role_name}")
 
-            waiter = iam_client.get_waiter('user_exists')
-            waiter.wait(UserName=role_name)
-        except iam_client.exceptions.EntityAlreadyExistsException:
-            self._logger.info(f"User {role_name} already exists. No action required.")
+                waiter = iam_client.get_waiter('user_exists')
+                waiter.wait(UserName=role_name)
+            except iam_client.exceptions.EntityAlreadyExistsException:
+                self._logger.info(f"User {role_name} already exists. No action required.")
 
-        user_arn = "arn:aws:iam::%s:user%s%s" % (account_id, DATA_MESH_IAM_PATH, role_name)
+            return user_arn
 
-        # create a group for the user
-        group_name = f"{role_name}Group"
-        try:
-            response = iam_client.create_group(
-                Path=DATA_MESH_IAM_PATH,
-                GroupName=group_name
-            )
-            self._logger.info(f"Created new Group {group_name}")
-        except iam_client.exceptions.EntityAlreadyExistsException:
-            self._logger.info(f"Group {group_name} already exists. No action required.")
+        def _create_group(results: dict) -> str:
+            # create a group for the user
+            try:
+                iam_client.create_group(
+                    Path=DATA_MESH_IAM_PATH,
+                    GroupName=group_name
+                )
+                self._logger.info(f"Created new Group {group_name}")
+            except iam_client.exceptions.EntityAlreadyExistsException:
+                self._logger.info(f"Group {group_name} already exists. No action required.")
 
-        group_arn = "arn:aws:iam::%s:group%s%sGroup" % (account_id, DATA_MESH_IAM_PATH, role_name)
+            return group_arn
 
-        # put the user into the group
-        try:
-            response = iam_client.add_user_to_group(
-                GroupName=group_name,
-                UserName=role_name
+        def _add_user_to_group(results: dict) -> None:
+            # put the user into the group
+            try:
+                iam_client.add_user_to_group(
+                    GroupName=group_name,
+                    UserName=role_name
+                )
+                self._logger.info(f"Added User {role_name} to Group {group_name}")
+            except iam_client.exceptions.EntityAlreadyExistsException:
+                self._logger.info(f"User {role_name} already in {group_name}. No action required.")
+
+        def _create_role(results: dict) -> str:
+            self._logger.debug("Waiting for User to be ready for inclusion in AssumeRolePolicy")
+
+            def _create():
+                try:
+                    # now create the IAM Role with a trust policy to the indicated principal and the root user
+                    aws_principals = [user_arn, ("arn:aws:iam::%s:root" % account_id)]
+                    iam_client.create_role(
+                        Path=DATA_MESH_IAM_PATH,
+                        RoleName=role_name,
+                        AssumeRolePolicyDocument=json.dumps(
+                            utils.create_assume_role_doc(aws_principals=aws_principals,
+                                                         additional_principals=additional_assuming_principals)),
+                        Description=role_desc,
+                        Tags=DEFAULT_TAGS
+                    )
+                    # wait for role active
+                    waiter = iam_client.get_waiter('role_exists')
+                    waiter.wait(RoleName=role_name)
+
+                    return utils.get_role_arn(account_id, role_name)
+                except iam_client.exceptions.EntityAlreadyExistsException:
+                    return iam_client.get_role(RoleName=role_name).get('Role').get('Arn')
+
+            # Invalid principal is raised when the new user hasn't yet propagated within IAM. Boto waiters don't catch
+            # it, so we retry until the trust policy is accepted
+            role_arn = self._retry_engine.call(
+                "iam:CreateRole", _create,
+                retry_on=lambda e: isinstance(e, iam_client.exceptions.MalformedPolicyDocumentException) and (
+                        "Invalid principal" in str(e))
             )
-            self._logger.info(f"Added User {role_name} to Group {group_name}")
-        except iam_client.exceptions.EntityAlreadyExistsException:
-            self._logger.info(f"User {role_name} already in {group_name}. No action required.")
+            self._logger.info(f"Validated Role {role_name} as {role_arn}")
 
-        role_arn = None
+            return role_arn
 
-        self._logger.debug("Waiting for User to be ready for inclusion in AssumeRolePolicy")
+        def _attach_role_policy(results: dict) -> None:
+            self._logger.debug("Waiting for Role to be ready for Policy Attach")
 
-        role_created = False
-        retries = 0
-        while role_created is False and retries < 5:
-            try:
-                # now create the IAM Role with a trust policy to the indicated principal and the root user
-                aws_principals = [user_arn, ("arn:aws:iam::%s:root" % account_id)]
-                iam_client.create_role(
-                    Path=DATA_MESH_IAM_PATH,
+            # attach the created policy to the role, retrying while the role propagates
+            self._retry_engine.call(
+                "iam:AttachRolePolicy",
+                lambda: iam_client.attach_role_policy(
                     RoleName=role_name,
-                    AssumeRolePolicyDocument=json.dumps(
-                        utils.create_assume_role_doc(aws_principals=aws_principals,
-                                                     additional_principals=additional_assuming_principals)),
-                    Description=role_desc,
-                    Tags=DEFAULT_TAGS
-                )
-                # wait for role active
-                waiter = iam_client.get_waiter('role_exists')
-                waiter.wait(RoleName=role_name)
-                role_created = True
+                    PolicyArn=results.get('policy')
+                ),
+                retry_on=lambda e: isinstance(e, iam_client.exceptions.MalformedPolicyDocumentException) and (
+                        "Invalid principal" in str(e))
+            )
+            self._logger.info(f"Attached Policy {results.get('policy')} to {role_name}")
+
+        def _attach_managed_policies(results: dict) -> None:
+            # attach the indicated managed policies
+            if managed_policies_to_attach:
+                for policy in managed_policies_to_attach:
+                    iam_client.attach_role_policy(
+                        RoleName=role_name,
+                        PolicyArn="arn:aws:iam::aws:policy/%s" % policy
+                    )
+                    self._logger.info(f"Attached managed policy {policy}")
+
+        def _create_assume_role_policy(results: dict) -> str:
+            # create an assume role policy
+            return self.create_assume_role_policy(
+                source_account_id=account_id,
+                policy_name=("Assume%s" % role_name),
+                role_arn=results.get('role')
+            )
 
-                role_arn = utils.get_role_arn(account_id, role_name)
-            except iam_client.exceptions.EntityAlreadyExistsException:
-                role_arn = iam_client.get_role(RoleName=role_name).get(
-                    'Role').get('Arn')
-                role_created = True
-            except iam_client.exceptions.MalformedPolicyDocumentException as mpde:
-                if "Invalid principal" in str(mpde):
-                    # this is raised when something within IAM hasn't yet propagated correctly. Boto waiters
-                    # don't seem to catch it, so we have to inject a manual sleep/retry
-                    time.sleep(2)
-                    retries += 1
-
-        self._logger.info(f"Validated Role {role_name} as {role_arn}")
-        self._logger.debug("Waiting for Role to be ready for Policy Attach")
-
-        # attach the created policy to the role
-        policy_attached = False
-        retries = 0
-        while policy_attached is False and retries < 5:
-            try:
-                iam_client.attach_role_policy(
-                    RoleName=role_name,
-                    PolicyArn=policy_arn
-                )
-                policy_attached = True
-                self._logger.info(f"Attached Policy {policy_arn} to {role_name}")
-            except iam_client.exceptions.MalformedPolicyDocumentException as mpde:
-                if "Invalid principal" in str(mpde):
-                    # this is raised when something within IAM hasn't yet propagated correctly.
-                    time.sleep(2)
-                    retries += 1
-
-        # attach the indicated managed policies
-        if managed_policies_to_attach:
-            for policy in managed_policies_to_attach:
-                iam_client.attach_role_policy(
+        def _attach_group_policy(results: dict) -> None:
+            # now let the group assume the role
+            iam_client.attach_group_policy(GroupName=group_name, PolicyArn=results.get('assume_role_policy'))
+            self._logger.info(f"Bound {results.get('assume_role_policy')} to Group {group_name}")
+
+        def _attach_read_only_assume_policy(results: dict) -> None:
+            # let the role assume the read only consumer policy. The read only role may be configured concurrently, so
+            # wait for its assume role policy to exist
+            self._retry_engine.call(
+                "iam:AttachRolePolicy:AssumeReadOnly",
+                lambda: iam_client.attach_role_policy(
                     RoleName=role_name,
-                    PolicyArn="arn:aws:iam::aws:policy/%s" % policy
-                )
-                self._logger.info(f"Attached managed policy {policy}")
-
-        # create an assume role policy
-        policy_arn = self.create_assume_role_policy(
-            source_account_id=account_id,
-            policy_name=("Assume%s" % role_name),
-            role_arn=role_arn
-        )
+                    PolicyArn=utils.get_policy_arn(data_mesh_account_id, f"Assume{DATA_MESH_READONLY_ROLENAME}")
+                ),
+                retry_on=lambda e: isinstance(e, iam_client.exceptions.NoSuchEntityException)
+            )
 
-        # now let the group assume the role
-        iam_client.attach_group_policy(GroupName=group_name, PolicyArn=policy_arn)
-        self._logger.info(f"Bound {policy_arn} to Group {group_name}")
+        dag = DagExecutor(max_workers=max_workers, log_level=self._logger.level)
+        dag.add_step('policy', _create_policy)
+        dag.add_step('user', _create_user)
+        dag.add_step('group', _create_group)
+        dag.add_step('membership', _add_user_to_group, depends_on=['user', 'group'])
+        dag.add_step('role', _create_role, depends_on=['user'])
+        dag.add_step('role_policy', _attach_role_policy, depends_on=['role', 'policy'])
+        dag.add_step('managed_policies', _attach_managed_policies, depends_on=['role'])
+        dag.add_step('assume_role_policy', _create_assume_role_policy, depends_on=['role'])
+        dag.add_step('group_policy', _attach_group_policy, depends_on=['group', 'assume_role_policy'])
 
-        # let the role assume the read only consumer policy
         if account_id == data_mesh_account_id and role_name != DATA_MESH_READONLY_ROLENAME:
-            iam_client.attach_role_policy(RoleName=role_name,
-                                          PolicyArn=utils.get_policy_arn(data_mesh_account_id,
-                                                                         f"Assume{DATA_MESH_READONLY_ROLENAME}"))
+            dag.add_step('read_only_policy', _attach_read_only_assume_policy, depends_on=['role'])
 
-        return role_arn, user_arn, group_arn
+        results = dag.run()
+
+        return results.get('role'), user_arn, group_arn
 
     def create_assume_role_policy(self, source_account_id: str, policy_name: str, role_arn: str):
         iam_client = self._get_client('iam')
@@ -333,51 +472,112 @@ class ApiAutomator:
             )
 
     def lf_grant_create_db(self, iam_role_arn: str):
-        # this call is subject to race conditions with IAM roles which haven't propagated to LF, so retry 5 times
-        tries = 0
-        completed = False
-        while completed is False and tries < 5:
-            try:
-                # grant this role the ability to create databases and tables
-                lf_client = self._get_client('lakeformation')
-                lf_client.grant_permissions(
-                    Principal={
-                        'DataLakePrincipalIdentifier': iam_role_arn
-                    },
-                    Resource={'Catalog': {}},
-                    Permissions=[
-                        'CREATE_DATABASE'
-                    ]
-                )
-                self._logger.info(f"Granted {iam_role_arn} CREATE_DATABASE privileges on Catalog")
-                completed = True
-            except lf_client.exceptions.InvalidInputException as iie:
-                if 'Invalid principal' in str(iie):
-                    tries += 1
-                    time.sleep(2)
-                else:
-                    raise iie
+        lf_client = self._get_client('lakeformation')
+
+        # this call is subject to race conditions with IAM roles which haven't propagated to LF, so retry until the
+        # principal is accepted
+        self._retry_engine.call(
+            "lakeformation:GrantPermissions:CREATE_DATABASE",
+            lambda: lf_client.grant_permissions(
+                Principal={
+                    'DataLakePrincipalIdentifier': iam_role_arn
+                },
+                Resource={'Catalog': {}},
+                Permissions=[
+                    'CREATE_DATABASE'
+                ]
+            ),
+            retry_on=lambda e: isinstance(e, lf_client.exceptions.InvalidInputException) and (
+                    'Invalid principal' in str(e))
+        )
+        self._logger.info(f"Granted {iam_role_arn} CREATE_DATABASE privileges on Catalog")
 
     def get_table_partitions(self, database_name: str, table_name: str) -> list:
         # load the partitions for the table if there are any
+        return list(self.iter_table_partitions(database_name=database_name, table_name=table_name))
+
+    def iter_table_partitions(self, database_name: str, table_name: str, total_segments: int = 4,
+                              max_queue_size: int = 1000, exclude_column_schema: bool = False):
+        '''
+        Generator which reads the partitions of a table using parallel Glue partition segments, yielding partitions as
+        they arrive rather than loading the whole partition list into memory
+        :param database_name:
+        :param table_name:
+        :param total_segments: number of segments to read in parallel, at most 10
+        :param max_queue_size: number of partitions which may be buffered ahead of the consumer
+        :param exclude_column_schema:
+        :return:
+        '''
         glue_client = self._get_client('glue')
-        all_partitions = []
-        partition_args = {
-            "DatabaseName": database_name,
-            "TableName": table_name,
-            "ExcludeColumnSchema": False
-        }
-        has_more_partitions = True
-        while has_more_partitions is True:
-            partitions = glue_client.get_partitions(**partition_args)
-            all_partitions.extend(partitions.get('Partitions'))
+        use_segments = min(max(1, total_segments), GLUE_MAX_PARTITION_SEGMENTS)
+
+        def _segment_reader(segment_number: int):
+            def _read():
+                partition_args = {
+                    "DatabaseName": database_name,
+                    "TableName": table_name,
+                    "ExcludeColumnSchema": exclude_column_schema,
+                    "Segment": {
+                        "SegmentNumber": segment_number,
+                        "TotalSegments": use_segments
+                    }
+                }
+                has_more_partitions = True
+                while has_more_partitions is True:
+                    partitions = glue_client.get_partitions(**partition_args)
+                    for p in partitions.get('Partitions'):
+                        yield p
+
+                    if 'NextToken' in partitions:
+                        partition_args['NextToken'] = partitions.get('NextToken')
+                    else:
+                        has_more_partitions = False
 
-            if 'NextToken' in partitions:
-                partition_args['NextToken'] = partitions.get('NextToken')
-            else:
-                has_more_partitions = False
+            return _read
+
+        return utils.merge_iterables_concurrently(
+            sources=[_segment_reader(i) for i in range(use_segments)],
+            max_queue_size=max_queue_size
+        )
+
+    def iter_partitions_by_values(self, database_name: str, table_name: str, partition_values):
+        '''
+        Generator which reads the full definitions of the partitions with the given values using BatchGetPartition, in
+        batches of up to 1000. Used after listing partitions without their column schema, so that only the partitions
+        which are needed are read in full
+        :param database_name:
+        :param table_name:
+        :param partition_values: list or iterable of partition value lists
+        :return:
+        '''
+        glue_client = self._get_client('glue')
+
+        for batch in utils.chunk(partition_values, GLUE_MAX_PARTITION_GET_BATCH_SIZE):
+            pending = {'Keys': [{'Values': list(v)} for v in batch]}
+            partitions = []
+
+            def _get_batch():
+                response = self._retry_engine.call(
+                    "glue:BatchGetPartition",
+                    lambda: glue_client.batch_get_partition(
+                        DatabaseName=database_name,
+                        TableName=table_name,
+                        PartitionsToGet=pending.get('Keys')
+                    ),
+                    retry_on=is_transient_error
+                )
+                partitions.extend(response.get('Partitions', []))
+
+                # keys are returned unprocessed when the request is throttled, and are requested again after backoff
+                pending['Keys'] = response.get('UnprocessedKeys', [])
+                return len(pending.get('Keys')) == 0
+
+            if not self._retry_engine.wait_until("glue:BatchGetPartition:UnprocessedKeys", _get_batch):
+                raise Exception(
+                    f"Unable to read {len(pending.get('Keys'))} Partitions of {database_name}.{table_name}: {pending.get('Keys')}")
 
-        return all_partitions
+            for p in partitions:
+                yield p
 
     def enable_crawler_role(self, crawler_role_arn: str, grant_to_role_name: str):
         if crawler_role_arn is None or grant_to_role_name is None:
@@ -412,30 +612,185 @@ class ApiAutomator:
 
         self._logger.info(f"Enabled {grant_to_role_name} to pass role {crawler_role_name} to Glue Crawlers")
 
-    def create_table_partition_metadata(self, database_name: str, table_name: str, partition_input_list: list):
+    def _create_partition_batch(self, database_name: str, table_name: str, partition_batch: list) -> tuple:
         glue_client = self._get_client('glue')
 
+        # a throttled or failed request creates none of the batch, so it is retried as a whole
+        response = self._retry_engine.call(
+            "glue:BatchCreatePartition",
+            lambda: glue_client.batch_create_partition(
+                DatabaseName=database_name,
+                TableName=table_name,
+                PartitionInputList=partition_batch
+            ),
+            retry_on=is_transient_error
+        )
+
+        # every partition in the batch was created unless it is reported back as an error
+        created = len(partition_batch)
+        skipped = 0
+        failed = []
+        for error in response.get('Errors', []):
+            created -= 1
+            error_detail = error.get('ErrorDetail', {})
+            if error_detail.get('ErrorCode') == 'AlreadyExistsException':
+                skipped += 1
+            else:
+                failed.append({
+                    'PartitionValues': error.get('PartitionValues'),
+                    'ErrorCode': error_detail.get('ErrorCode'),
+                    'ErrorMessage': error_detail.get('ErrorMessage')
+                })
+
+        return created, skipped, failed
+
+    def create_table_partition_metadata(self, database_name: str, table_name: str, partition_input_list,
+                                        max_workers: int = 4) -> dict:
+        '''
+        Creates partitions on a table using BatchCreatePartition, sending batches of up to 100 partitions from up to
+        max_workers concurrent workers. Partitions which already exist are skipped, and all other per-partition errors
+        are returned rather than raised.
+        :param database_name:
+        :param table_name:
+        :param partition_input_list: list or iterable of partitions, such as the output of iter_table_partitions
+        :param max_workers:
+        :return:
+        '''
+        partition_inputs = (utils.remove_dict_keys(input_dict=p, remove_keys=GLUE_PARTITION_READ_ONLY_KEYS) for p in
+                            partition_input_list)
+
         partitions_created = 0
-        for p in partition_input_list:
-            keys = [
-                'DatabaseName', 'TableName', 'CreationTime', 'LastAnalyzedTime', 'CatalogId'
-            ]
-            p = utils.remove_dict_keys(input_dict=p, remove_keys=keys)
+        partitions_skipped = 0
+        partitions_failed = []
+
+        def _collect(completed):
+            nonlocal partitions_created, partitions_skipped
+            for f in completed:
+                created, skipped, failed = f.result()
+                partitions_created += created
+                partitions_skipped += skipped
+                partitions_failed.extend(failed)
+
+        # partitions are consumed lazily, and only a bounded number of batches are in flight at once, so that
+        # partitions streamed from a reader are never fully materialized in memory
+        use_workers = max(1, max_workers)
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=use_workers) as executor:
+            for batch in utils.chunk(partition_inputs, GLUE_MAX_PARTITION_BATCH_SIZE):
+                if len(in_flight) >= use_workers * 2:
+                    completed, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    _collect(completed)
+
+                in_flight.add(executor.submit(self._create_partition_batch, database_name=database_name,
+                                              table_name=table_name, partition_batch=batch))
+
+            _collect(wait(in_flight).done)
+
+        self._logger.info(
+            f"Created {partitions_created} new Table Partitions on {database_name}.{table_name}, skipped {partitions_skipped} which already exist")
+
+        if len(partitions_failed) > 0:
+            self._logger.error(
+                f"Failed to create {len(partitions_failed)} Table Partitions on {database_name}.{table_name}")
+            self._logger.debug(partitions_failed)
+
+        return {
+            'Created': partitions_created,
+            'Skipped': partitions_skipped,
+            'Failed': partitions_failed
+        }
 
-            try:
-                glue_client.create_partition(
-                    DatabaseName=database_name,
-                    TableName=table_name,
-                    PartitionInput=p
-                )
-                partitions_created += 1
-            except glue_client.exceptions.AlreadyExistsException:
-                pass
+    def delete_table_partitions(self, database_name: str, table_name: str, partition_values: list) -> int:
+        '''
+        Deletes partitions from a table using BatchDeletePartition, in batches of up to 25 partitions
+        :param database_name:
+        :param table_name:
+        :param partition_values: list of partition value lists
+        :return:
+        '''
+        glue_client = self._get_client('glue')
+
+        partitions_deleted = 0
+        for batch in utils.chunk(partition_values, GLUE_MAX_PARTITION_DELETE_BATCH_SIZE):
+            response = glue_client.batch_delete_partition(
+                DatabaseName=database_name,
+                TableName=table_name,
+                PartitionsToDelete=[{'Values': list(v)} for v in batch]
+            )
+            partitions_deleted += len(batch) - len(response.get('Errors', []))
+
+        self._logger.info(f"Deleted {partitions_deleted} Table Partitions from {database_name}.{table_name}")
+
+        return partitions_deleted
+
+    def update_table_partitions(self, database_name: str, table_name: str, partitions: list) -> dict:
+        '''
+        Replaces the definitions of existing partitions using BatchUpdatePartition, in batches of up to 100 partitions.
+        Per-partition errors are returned rather than raised
+        :param database_name:
+        :param table_name:
+        :param partitions: list of partitions, such as the output of iter_table_partitions
+        :return:
+        '''
+        glue_client = self._get_client('glue')
+
+        partitions_updated = 0
+        partitions_failed = []
+        for batch in utils.chunk(partitions, GLUE_MAX_PARTITION_BATCH_SIZE):
+            response = glue_client.batch_update_partition(
+                DatabaseName=database_name,
+                TableName=table_name,
+                Entries=[{
+                    'PartitionValueList': p.get('Values'),
+                    'PartitionInput': utils.remove_dict_keys(input_dict=p, remove_keys=GLUE_PARTITION_READ_ONLY_KEYS)
+                } for p in batch]
+            )
 
-        self._logger.info(f"Create {partitions_created} new Table Partitions")
+            errors = response.get('Errors', [])
+            partitions_updated += len(batch) - len(errors)
+            for error in errors:
+                partitions_failed.append({
+                    'PartitionValues': error.get('PartitionValueList'),
+                    'ErrorCode': error.get('ErrorDetail', {}).get('ErrorCode'),
+                    'ErrorMessage': error.get('ErrorDetail', {}).get('ErrorMessage')
+                })
+
+        self._logger.info(f"Updated {partitions_updated} Table Partitions on {database_name}.{table_name}")
+
+        if len(partitions_failed) > 0:
+            self._logger.error(
+                f"Failed to update {len(partitions_failed)} Table Partitions on {database_name}.{table_name}")
+            self._logger.debug(partitions_failed)
+
+        return {
+            'Updated': partitions_updated,
+            'Failed': partitions_failed
+        }
+
+    def set_table_parameters(self, database_name: str, table_name: str, parameters: dict) -> None:
+        '''
+        Merges the provided parameters into the Parameters of an existing table
+        :param database_name:
+        :param table_name:
+        :param parameters:
+        :return:
+        '''
+        glue_client = self._get_client('glue')
+
+        table_input = utils.remove_dict_keys(input_dict=self.describe_table(database_name, table_name),
+                                             remove_keys=GLUE_TABLE_READ_ONLY_KEYS)
+        table_parameters = table_input.get('Parameters', {})
+        table_parameters.update(parameters)
+        table_input['Parameters'] = table_parameters
+
+        glue_client.update_table(
+            DatabaseName=database_name,
+            TableInput=table_input
+        )
 
     def load_glue_tables(self, catalog_id: str, source_db_name: str,
-                         table_name_regex: str, load_lf_tags: bool = True):
+                         table_name_regex: str, load_lf_tags: bool = True, max_workers: int = 8,
+                         allow_empty: bool = False):
         glue_client = self._get_client('glue')
         lf_client = self._get_client('lakeformation')
 
@@ -466,6 +821,8 @@ class ApiAutomator:
                     **get_tables_args
                 )
             except glue_client.exceptions.EntityNotFoundException:
+                if allow_empty is True:
+                    return []
                 _no_data()
 
             if 'NextToken' in get_table_response:
@@ -475,7 +832,8 @@ class ApiAutomator:
 
             # add the tables returned from this instance of the request
             if not get_table_response.get('TableList'):
-                _no_data()
+                if allow_empty is False and len(all_tables) == 0:
+                    _no_data()
             else:
                 all_tables.extend(get_table_response.get('TableList'))
 
@@ -483,7 +841,7 @@ class ApiAutomator:
 
         # now load all lakeformation tags for the supplied objects
         if load_lf_tags is True:
-            for t in all_tables:
+            def _load_table_tags(t: dict) -> None:
                 tags = lf_client.get_resource_lf_tags(
                     CatalogId=catalog_id,
                     Resource={
@@ -499,124 +857,172 @@ class ApiAutomator:
                 use_tags = {}
                 if tags.get(key) is not None and len(tags.get(key)) > 0:
                     for table_tag in tags.get(key):
-                        # get all the valid values for the tag in LF
-                        lf_tag = lf_client.get_lf_tag(TagKey=table_tag.get('TagKey'))
+                        # get all the valid values for the tag in LF. Tag definitions are shared across tables, so
+                        # these come from the tag cache after the first lookup
                         use_tags[table_tag.get('TagKey')] = {
                             'TagValues': table_tag.get('TagValues'),
-                            'ValidValues': lf_tag.get('TagValues')
+                            'ValidValues': self.get_lf_tag_values(tag_key=table_tag.get('TagKey'),
+                                                                  catalog_id=catalog_id)
                         }
                     t['Tags'] = use_tags
 
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                # consume the results so that any exception is raised here
+                list(executor.map(_load_table_tags, all_tables))
+
         return all_tables
 
     def update_glue_catalog_resource_policy(self, region: str, producer_account_id: str, consumer_account_id: str,
                                             database_name: str, tables: list):
+        self.update_glue_catalog_resource_policy_entries(
+            region=region, producer_account_id=producer_account_id,
+            changes=[{
+                'consumer_account_id': consumer_account_id,
+                'database_name': database_name,
+                'tables': tables
+            }]
+        )
+
+    def update_glue_catalog_resource_policy_entries(self, region: str, producer_account_id: str, changes: list):
+        '''
+        Applies a set of consumer access changes to the catalog resource policy with a single policy write
+        :param region:
+        :param producer_account_id:
+        :param changes: list of dicts with consumer_account_id, database_name and tables
+        :return:
+        '''
+        # the catalog resource policy is a single document, so concurrent updates from this automator are serialized
+        with self._get_resource_lock('glue-resource-policy'):
+            self._update_glue_catalog_resource_policy(region=region, producer_account_id=producer_account_id,
+                                                      changes=changes)
+
+    def _update_glue_catalog_resource_policy(self, region: str, producer_account_id: str, changes: list):
         glue_client = self._get_client('glue')
-        new_resource_policy = None
-        current_resource_policy = None
-        try:
-            current_resource_policy = glue_client.get_resource_policy()
-        except glue_client.exceptions.EntityNotFoundException:
-            pass
 
-        cf = {
-            'region': region,
-            'producer_account_id': producer_account_id,
-            'consumer_account_id': consumer_account_id,
-            "database_name": database_name,
-            'tables': tables
-        }
+        def _merge_and_put():
+            current_resource_policy = None
+            try:
+                current_resource_policy = glue_client.get_resource_policy()
+            except glue_client.exceptions.EntityNotFoundException:
+                pass
 
-        # add the table list and generate full policy
-        cf['table_list'] = tables
-        policy = json.loads(utils.generate_policy('lf_cross_account_tbac.pystache', config=cf))
+            if current_resource_policy is None:
+                new_resource_policy = {
+                    "Version": "2012-10-17",
+                    "Statement": []
+                }
+            else:
+                new_resource_policy = json.loads(current_resource_policy.get('PolicyInJson'))
 
-        policy_condition = None
-        if current_resource_policy is None:
-            new_resource_policy = {
-                "Version": "2012-10-17",
-                "Statement": [policy]
-            }
-            glue_client.put_resource_policy(
-                PolicyInJson=json.dumps(new_resource_policy),
-                PolicyExistsCondition='NOT_EXIST',
-                EnableHybrid='TRUE'
-            )
-            self._logger.info(
-                f"Created new Catalog Resource Policy on {producer_account_id} allowing Tag Based Access by {consumer_account_id}")
-        else:
-            new_resource_policy = json.loads(current_resource_policy.get('PolicyInJson'))
-            current_hash = current_resource_policy.get('PolicyHash')
-
-            update_statement, policy_index, did_modification = self._get_glue_resource_policy_statement_to_modify(
-                region=region,
-                policy=new_resource_policy, producer_account_id=producer_account_id,
-                consumer_account_id=consumer_account_id,
-                database_name=database_name, tables=tables
+            did_modification = self._apply_glue_resource_policy_changes(
+                region=region, policy=new_resource_policy, producer_account_id=producer_account_id, changes=changes
             )
 
-            # add the new statement
-            if update_statement is None:
-                new_resource_policy['Statement'].append(policy)
-                did_modification = True
-            elif update_statement is not None:
-                new_resource_policy['Statement'][policy_index] = update_statement
-
-            if did_modification is True:
-                glue_client.put_resource_policy(
-                    PolicyInJson=json.dumps(new_resource_policy),
-                    PolicyHashCondition=current_hash,
-                    PolicyExistsCondition='MUST_EXIST',
-                    EnableHybrid='TRUE'
-                )
-                self._logger.info(
-                    f"Updated Catalog Resource Policy on {producer_account_id} allowing Tag Based Access by {consumer_account_id}")
-
-    def _get_glue_resource_policy_statement_to_modify(self, region: str, policy: dict, producer_account_id: str,
-                                                      consumer_account_id: str,
-                                                      database_name: str, tables: list) -> tuple:
-        # go through the policy to find if there's a match on region, consumer principal, and database
-        target_statement_index = 0
-        statement_match = None
-        missing_tables = []
-        if tables is not None:
-            missing_tables = tables.copy()
+            try:
+                if current_resource_policy is None:
+                    glue_client.put_resource_policy(
+                        PolicyInJson=json.dumps(new_resource_policy),
+                        PolicyExistsCondition='NOT_EXIST',
+                        EnableHybrid='TRUE'
+                    )
+                    self._logger.info(f"Created new Catalog Resource Policy on {producer_account_id}")
+                elif did_modification is True:
+                    glue_client.put_resource_policy(
+                        PolicyInJson=json.dumps(new_resource_policy),
+                        PolicyHashCondition=current_resource_policy.get('PolicyHash'),
+                        PolicyExistsCondition='MUST_EXIST',
+                        EnableHybrid='TRUE'
+                    )
+                    self._logger.info(f"Updated Catalog Resource Policy on {producer_account_id}")
+            except glue_client.exceptions.ConditionCheckFailureException:
+                self._logger.info(f"Catalog Resource Policy on {producer_account_id} was modified concurrently, retrying")
+                raise
+
+        # writes are conditional on the policy hash, so if another writer changes the policy between our read and write,
+        # re-read the policy and re-apply the changes to it
+        self._retry_engine.call(
+            "glue:PutResourcePolicy", _merge_and_put,
+            retry_on=lambda e: isinstance(e, glue_client.exceptions.ConditionCheckFailureException)
+        )
 
+    def _index_glue_resource_policy(self, policy: dict) -> dict:
+        '''
+        Indexes the statements of a catalog resource policy by principal, region, catalog account and database, from
+        database resources in the format arn:aws:glue:<region>:<account-id>:database/<database-name>
+        :param policy:
+        :return:
+        '''
+        index = {}
         for i, statement in enumerate(policy.get('Statement')):
-            if statement is not None and 'AWS' in statement.get('Principal') and consumer_account_id in statement.get(
-                    'Principal').get('AWS'):
-                # go through the resources to get region and DB match
-                for j, resource in enumerate(statement.get('Resource')):
-                    # resources will be in format:
-                    #
-                    # "arn:aws:glue:<region>:<account-id>:table/*",
-                    # "arn:aws:glue:<region>:<account-id>:database/*",
-                    # "arn:aws:glue:<region>:<account-id>:catalog"
-                    if region in resource and producer_account_id in resource and (
-                            ':database' in resource and database_name in resource):
-                        # this statement is a match
-                        target_statement_index = i
-                        statement_match = statement
-                        break
+            if statement is None or 'AWS' not in statement.get('Principal', {}):
+                continue
+
+            principals = statement.get('Principal').get('AWS')
+            if isinstance(principals, str):
+                principals = [principals]
+
+            for resource in statement.get('Resource'):
+                arn_tokens = resource.split(":")
+                if len(arn_tokens) == 6 and arn_tokens[5].startswith('database/'):
+                    for principal in principals:
+                        index.setdefault((principal, arn_tokens[3], arn_tokens[4], arn_tokens[5][len('database/'):]),
+                                         i)
+
+        return index
+
+    def _apply_glue_resource_policy_changes(self, region: str, policy: dict, producer_account_id: str,
+                                            changes: list) -> bool:
+        '''
+        Applies a set of consumer access changes to a catalog resource policy document, returning whether the policy
+        was modified. Each change extends the matching statement for its principal and database, or adds a new one
+        :param region:
+        :param policy:
+        :param producer_account_id:
+        :param changes: list of dicts with consumer_account_id, database_name and tables
+        :return:
+        '''
+        index = self._index_glue_resource_policy(policy)
 
         did_modification = False
-        if statement_match is not None:
-            for k, resource in enumerate(statement_match.get('Resource')):
-                resource_name = resource.split("/")[-1]
-                try:
-                    resource_index = missing_tables.index(resource_name)
-                    del missing_tables[resource_index]
-                except ValueError:
-                    pass
+        for change in changes:
+            consumer_account_id = change.get('consumer_account_id')
+            database_name = change.get('database_name')
+            tables = change.get('tables')
+            statement_key = (consumer_account_id, region, producer_account_id, database_name)
+
+            statement_modified = False
+
+            policy_index = index.get(statement_key)
+            if policy_index is None:
+                cf = {
+                    'region': region,
+                    'producer_account_id': producer_account_id,
+                    'consumer_account_id': consumer_account_id,
+                    "database_name": database_name,
+                    'tables': tables
+                }
 
-            # add the tables that were missing
-            if len(missing_tables) > 0:
-                statement_match['Resource'].extend(missing_tables)
+                # add the table list and generate full policy
+                cf['table_list'] = tables
+                policy.get('Statement').append(
+                    utils.generate_policy_dict('lf_cross_account_tbac.pystache', config=cf))
+                index[statement_key] = len(policy.get('Statement')) - 1
+                statement_modified = True
+            elif tables is not None:
+                # add the tables that were missing
+                resources = policy.get('Statement')[policy_index].get('Resource')
+                missing_tables = [t for t in dict.fromkeys(tables) if t not in resources]
+
+                if len(missing_tables) > 0:
+                    resources.extend(missing_tables)
+                    statement_modified = True
+
+            if statement_modified is True:
                 did_modification = True
+                self._logger.info(
+                    f"Adding Tag Based Access by {consumer_account_id} to Catalog Resource Policy on {producer_account_id}")
 
-            return statement_match, target_statement_index, did_modification
-        else:
-            return None, None, None
+        return did_modification
 
     def assert_is_data_lake_admin(self, principal):
         lf_client = self._get_client('lakeformation')
@@ -713,6 +1119,85 @@ class ApiAutomator:
 
         return table.get('Table')
 
+    def list_registered_locations(self) -> set:
+        '''
+        Returns the ARNs of all S3 locations registered with Lake Formation
+        :return:
+        '''
+        lf_client = self._get_client('lakeformation')
+
+        locations = set()
+        args = {}
+        while True:
+            response = lf_client.list_resources(**args)
+            locations.update(r.get('ResourceArn') for r in response.get('ResourceInfoList', []))
+
+            if response.get('NextToken') is None:
+                return locations
+            args['NextToken'] = response.get('NextToken')
+
+    def list_principal_permissions(self, principal: str, resource_type: str, catalog_id: str = None) -> list:
+        '''
+        Returns all Lake Formation permissions held by a principal on resources of a type, such as TABLE, DATABASE or
+        DATA_LOCATION, with a single paginated listing
+        :param principal:
+        :param resource_type:
+        :param catalog_id:
+        :return:
+        '''
+        lf_client = self._get_client('lakeformation')
+
+        args = {
+            "Principal": {
+                'DataLakePrincipalIdentifier': principal
+            },
+            "ResourceType": resource_type
+        }
+        if catalog_id is not None:
+            args['CatalogId'] = catalog_id
+
+        permissions = []
+        while True:
+            response = lf_client.list_permissions(**args)
+            permissions.extend(response.get('PrincipalResourcePermissions', []))
+
+            if response.get('NextToken') is None:
+                return permissions
+            args['NextToken'] = response.get('NextToken')
+
+    def list_crawler_names(self) -> set:
+        glue_client = self._get_client('glue')
+
+        names = set()
+        args = {}
+        while True:
+            response = glue_client.list_crawlers(**args)
+            names.update(response.get('CrawlerNames', []))
+
+            if response.get('NextToken') is None:
+                return names
+            args['NextToken'] = response.get('NextToken')
+
+    def database_exists(self, database_name: str) -> bool:
+        glue_client = self._get_client('glue')
+
+        try:
+            glue_client.get_database(Name=database_name)
+            return True
+        except glue_client.exceptions.EntityNotFoundException:
+            return False
+
+    def create_grant_accumulator(self, catalog_id: str, max_workers: int = 4) -> GrantAccumulator:
+        '''
+        Returns a grant accumulator which sends Lake Formation grants on the catalog in batches
+        :param catalog_id:
+        :param max_workers: number of batches to send concurrently
+        :return:
+        '''
+        return GrantAccumulator(lf_client=self._get_client('lakeformation'), catalog_id=catalog_id,
+                                max_workers=max_workers, log_level=self._logger.level,
+                                retry_engine=self._retry_engine)
+
     def lf_grant_permissions(self, data_mesh_account_id: str, principal: str, database_name: str,
                              table_name: str = None,
                              permissions: list = ['ALL'],
@@ -895,35 +1380,62 @@ class ApiAutomator:
     def set_default_lf_permissions(self):
         # remove default IAM settings in lakeformation for the account, and setup the manager role and this caller as admins
         lf_client = self._get_client('lakeformation')
-        settings = lf_client.get_data_lake_settings().get('DataLakeSettings')
-        settings['CreateTableDefaultPermissions'] = []
-        lf_client.put_data_lake_settings(DataLakeSettings=settings)
+
+        with self._get_resource_lock("lf-data-lake-settings"):
+            settings = lf_client.get_data_lake_settings().get('DataLakeSettings')
+            settings['CreateTableDefaultPermissions'] = []
+            lf_client.put_data_lake_settings(DataLakeSettings=settings)
 
     def add_datalake_admin(self, principal: str):
+        self.add_datalake_admins(principals=[principal])
+
+    def add_datalake_admins(self, principals: list) -> list:
+        '''
+        Makes a set of principals Data Lake Admins with a single read and write of the Data Lake Settings. Principals which
+        are already admins are not added again, any duplicate admin entries are removed, and all other Data Lake Settings
+        are preserved. The settings are read back after the write to verify that every principal is an admin
+        :param principals:
+        :return: the principals which were added
+        '''
         lf_client = self._get_client('lakeformation')
 
-        admins = lf_client.get_data_lake_settings().get('DataLakeSettings').get("DataLakeAdmins")
+        with self._get_resource_lock("lf-data-lake-settings"):
+            settings = lf_client.get_data_lake_settings().get('DataLakeSettings')
 
-        admins.append({
-            'DataLakePrincipalIdentifier': principal
-        })
-        # Horrible retry logic required to avoid boto3 exception using a role as a principal too soon after it's been created
-        retries = 0
-        while True:
-            try:
-                lf_client.put_data_lake_settings(
-                    DataLakeSettings={
-                        'DataLakeAdmins': admins
-                    }
-                )
-            except lf_client.exceptions.InvalidInputException:
-                self._logger.info(f"Error setting DataLakeAdmins as {admins}. Backing off....")
-                retries += 1
-                if retries > 5:
+            current_admins = [a.get('DataLakePrincipalIdentifier') for a in settings.get('DataLakeAdmins', [])]
+            merged_admins = list(dict.fromkeys(current_admins))
+            to_add = [p for p in dict.fromkeys(principals) if p not in merged_admins]
+
+            if len(to_add) == 0 and len(merged_admins) == len(current_admins):
+                self._logger.info(f"{principals} are already Data Lake Admins. No action required.")
+                return []
+
+            merged_admins.extend(to_add)
+            settings['DataLakeAdmins'] = [{'DataLakePrincipalIdentifier': a} for a in merged_admins]
+
+            # retry required to avoid an exception using a role as a principal too soon after it's been created
+            def _put_admins():
+                try:
+                    lf_client.put_data_lake_settings(DataLakeSettings=settings)
+                except lf_client.exceptions.InvalidInputException:
+                    self._logger.info(f"Error setting DataLakeAdmins as {merged_admins}. Backing off....")
                     raise
-                time.sleep(3)
-                continue
-            break
+
+            self._retry_engine.call(
+                "lakeformation:PutDataLakeSettings", _put_admins,
+                retry_on=lambda e: isinstance(e, lf_client.exceptions.InvalidInputException)
+            )
+
+            # verify that the write took effect
+            updated_admins = [a.get('DataLakePrincipalIdentifier') for a in
+                              lf_client.get_data_lake_settings().get('DataLakeSettings').get('DataLakeAdmins', [])]
+            missing = [p for p in principals if p not in updated_admins]
+            if len(missing) > 0:
+                raise Exception(f"Principals {missing} are not Data Lake Admins after update")
+
+        self._logger.info(f"Added Data Lake Admins {to_add}")
+
+        return to_add
 
     def _get_s3_path_prefix(self, prefix: str) -> str:
         return prefix.replace(f"s3://{self._get_bucket_name(prefix)}", "")
@@ -935,11 +1447,11 @@ class ApiAutomator:
 
         # generate a new bucket policy from the template
         s3_path = self._get_s3_path_prefix(access_path)
-        base_policy = json.loads(utils.generate_policy(template_file='producer_bucket_policy.pystache', config={
+        base_policy = utils.generate_policy_dict(template_file='producer_bucket_policy.pystache', config={
             'account_id': principal_account,
             'access_path': s3_path,
             'sid': policy_sid
-        }))
+        })
 
         if bucket_policy is None:
             generated_policy = {
@@ -1001,42 +1513,176 @@ class ApiAutomator:
                 raise ce
 
     def add_bucket_policy_entry(self, principal_account: str, access_path: str):
-        s3_client = self._get_client('s3')
+        self.add_bucket_policy_entries(principal_accounts=[principal_account], access_path=access_path)
 
-        bucket_name = self._get_bucket_name(access_path)
+    def add_bucket_policy_entries(self, principal_accounts: list, access_path: str):
+        '''
+        Adds a set of principal accounts to the data mesh statement of a bucket policy with a single policy write
+        :param principal_accounts:
+        :param access_path:
+        :return:
+        '''
+        self._write_bucket_policy(principal_accounts=principal_accounts, access_path=access_path)
 
+    def bucket_policy_batch(self) -> BucketPolicyBatch:
+        '''
+        Returns a batch which collects the bucket policy entries added to it during an operation, and writes each bucket
+        policy at most once when the batch exits
+        :return:
+        '''
+        return BucketPolicyBatch(write_policy=self._write_bucket_policy, log_level=self._logger.level)
+
+    def _get_bucket_policy_change(self, s3_client, principal_accounts: list, access_path: str) -> tuple:
         # get the existing policy, if there is one
-        current_policy = self._get_current_bucket_policy(s3_client, bucket_name)
+        current_policy = self._get_current_bucket_policy(s3_client, self._get_bucket_name(access_path))
 
         bucket_policy = None
         if current_policy is not None:
             bucket_policy = json.loads(current_policy.get('Policy'))
 
-        # transform the existing or None policy into the desired target lakeformation policy
-        new_policy = self._transform_bucket_policy(
-            bucket_policy=bucket_policy, principal_account=principal_account,
-            access_path=access_path
-        )
+        # transform a copy of the existing or None policy into the desired target lakeformation policy
+        new_policy = copy.deepcopy(bucket_policy)
+        for principal_account in principal_accounts:
+            new_policy = self._transform_bucket_policy(
+                bucket_policy=new_policy, principal_account=principal_account,
+                access_path=access_path
+            )
+
+        return bucket_policy, new_policy
+
+    def bucket_policy_requires_update(self, principal_accounts: list, access_path: str) -> bool:
+        '''
+        Returns True if adding the principal accounts to the bucket policy would change it, without writing the policy
+        :param principal_accounts:
+        :param access_path:
+        :return:
+        '''
+        bucket_policy, new_policy = self._get_bucket_policy_change(self._get_client('s3'), principal_accounts,
+                                                                   access_path)
 
-        # put the policy back into the bucket store
-        s3_client.put_bucket_policy(Bucket=bucket_name, Policy=json.dumps(new_policy))
+        return bucket_policy is None or new_policy != bucket_policy
 
-    def accept_pending_lf_resource_shares(self, sender_account: str, filter_resource_arn: str = None):
+    def _write_bucket_policy(self, principal_accounts: list, access_path: str) -> bool:
+        s3_client = self._get_client('s3')
+
+        bucket_name = self._get_bucket_name(access_path)
+
+        # tables published in parallel often share a bucket, so the read-modify-write is serialized per bucket
+        with self._get_resource_lock(f"s3://{bucket_name}"):
+            bucket_policy, new_policy = self._get_bucket_policy_change(s3_client, principal_accounts, access_path)
+
+            if bucket_policy is not None and new_policy == bucket_policy:
+                self._logger.debug(f"Bucket Policy for {bucket_name} is unchanged")
+                return False
+
+            # put the policy back into the bucket store
+            s3_client.put_bucket_policy(Bucket=bucket_name, Policy=json.dumps(new_policy))
+
+            return True
+
+    def get_retry_stats(self) -> dict:
+        '''
+        Returns the calls, retries and seconds spent waiting for propagation, per call site
+        :return:
+        '''
+        return self._retry_engine.get_wait_stats()
+
+    def _list_pending_lf_resource_share_invitations(self, sender_account: str,
+                                                    filter_resource_arn: str = None) -> list:
         ram_client = self._get_client('ram')
 
-        get_response = ram_client.get_resource_share_invitations()
+        invitations = []
+        for page in ram_client.get_paginator('get_resource_share_invitations').paginate():
+            for r in page.get('resourceShareInvitations'):
+                # only accept pending lakeformation shares from the source account
+                if r.get('senderAccountId') == sender_account and 'LakeFormation' in r.get(
+                        'resourceShareName') and r.get('status') == 'PENDING':
+                    if filter_resource_arn is None or r.get('resourceShareArn') == filter_resource_arn:
+                        invitations.append(r)
 
-        accepted_share = False
-        for r in get_response.get('resourceShareInvitations'):
-            # only accept peding lakeformation shares from the source account
-            if r.get('senderAccountId') == sender_account and 'LakeFormation' in r.get('resourceShareName') and r.get(
-                    'status') == 'PENDING':
-                if filter_resource_arn is None or r.get('resourceShareArn') == filter_resource_arn:
-                    ram_client.accept_resource_share_invitation(
-                        resourceShareInvitationArn=r.get('resourceShareInvitationArn')
-                    )
-                    accepted_share = True
-                    self._logger.info(f"Accepted RAM Share {r.get('resourceShareInvitationArn')}")
+        return invitations
+
+    def accept_pending_lf_resource_shares(self, sender_account: str, filter_resource_arn: str = None,
+                                          max_workers: int = 4) -> bool:
+        ram_client = self._get_client('ram')
+
+        invitations = self._list_pending_lf_resource_share_invitations(sender_account=sender_account,
+                                                                       filter_resource_arn=filter_resource_arn)
+
+        def _accept(invitation: dict):
+            try:
+                ram_client.accept_resource_share_invitation(
+                    resourceShareInvitationArn=invitation.get('resourceShareInvitationArn')
+                )
+                self._logger.info(f"Accepted RAM Share {invitation.get('resourceShareInvitationArn')}")
+            except (ram_client.exceptions.ResourceShareInvitationAlreadyAcceptedException,
+                    ram_client.exceptions.ResourceShareInvitationAlreadyRejectedException):
+                # accepted by a concurrent caller
+                pass
 
-        if accepted_share is False:
+        if len(invitations) == 0:
             self._logger.info("No Pending RAM Shares to Accept")
+            return False
+
+        with ThreadPoolExecutor(max_workers=min(max(1, max_workers), len(invitations))) as executor:
+            list(executor.map(_accept, invitations))
+
+        return True
+
+    def accept_lf_resource_shares(self, sender_account: str, expected_tables: list = None,
+                                  expected_share_arns: list = None,
+                                  deadline_seconds: float = RAM_SHARE_READY_DEADLINE_SECONDS,
+                                  max_workers: int = 4) -> list:
+        '''
+        Accepts the pending Lake Formation resource shares from an account, polling with backoff until every expected
+        table is visible and every expected resource share is active. Intended to run once after a set of grants,
+        rather than once per grant. Returns the expected tables and share ARNs which were not ready by the deadline
+        :param sender_account:
+        :param expected_tables: list of (database name, table name) tuples shared from the sender's catalog
+        :param expected_share_arns:
+        :param deadline_seconds:
+        :param max_workers: number of concurrent acceptance and visibility checks
+        :return:
+        '''
+        glue_client = self._get_client('glue')
+        ram_client = self._get_client('ram')
+        remaining_tables = list(dict.fromkeys(expected_tables if expected_tables is not None else []))
+        remaining_shares = list(dict.fromkeys(expected_share_arns if expected_share_arns is not None else []))
+
+        def _table_visible(table: tuple) -> bool:
+            try:
+                glue_client.get_table(CatalogId=sender_account, DatabaseName=table[0], Name=table[1])
+                return True
+            except (glue_client.exceptions.EntityNotFoundException, glue_client.exceptions.AccessDeniedException):
+                return False
+
+        def _active_shares() -> set:
+            active = set()
+            for share_batch in utils.chunk(remaining_shares, 100):
+                for page in ram_client.get_paginator('get_resource_shares').paginate(
+                        resourceOwner='OTHER-ACCOUNTS', resourceShareArns=share_batch):
+                    active.update([r.get('resourceShareArn') for r in page.get('resourceShares') if
+                                   r.get('status') == 'ACTIVE'])
+            return active
+
+        def _ready() -> bool:
+            nonlocal remaining_tables, remaining_shares
+            self.accept_pending_lf_resource_shares(sender_account=sender_account, max_workers=max_workers)
+
+            if len(remaining_tables) > 0:
+                with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                    visible = list(executor.map(_table_visible, remaining_tables))
+                remaining_tables = [t for t, v in zip(remaining_tables, visible) if v is False]
+
+            if len(remaining_shares) > 0:
+                active = _active_shares()
+                remaining_shares = [r for r in remaining_shares if r not in active]
+
+            return len(remaining_tables) == 0 and len(remaining_shares) == 0
+
+        if self._retry_engine.wait_until("ram:AcceptResourceShares", _ready,
+                                         deadline_seconds=deadline_seconds) is False:
+            self._logger.warning(
+                f"RAM Shares from {sender_account} not ready after {deadline_seconds}s: {remaining_tables + remaining_shares}")
+
+        return remaining_tables + remaining_shares
@@ -0,0 +1,78 @@
+import sys
+import logging
+import threading
+
+
+class BucketPolicyBatch:
+    '''
+    Collects the bucket policy entries added during an operation, so that all the principals added to a bucket are
+    merged into one policy write when the batch is flushed. Created by ApiAutomator.bucket_policy_batch, and used as a
+    context manager which flushes on exit
+    '''
+    _write_policy = None
+    _entries = None
+    _failures = None
+    _lock = None
+    _logger = logging.getLogger("BucketPolicyBatch")
+    # make sure we always log to standard out
+    _logger.addHandler(logging.StreamHandler(sys.stdout))
+
+    def __init__(self, write_policy, log_level: str = "INFO"):
+        '''
+        :param write_policy: callable taking principal_accounts and access_path, which writes a bucket policy
+        :param log_level:
+        '''
+        self._write_policy = write_policy
+        self._entries = {}
+        self._failures = {}
+        self._lock = threading.Lock()
+        self._logger.setLevel(log_level)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+        return False
+
+    def add(self, principal_accounts: list, access_path: str) -> None:
+        '''
+        Records principal accounts to be added to the data mesh statement of a bucket policy when the batch is flushed
+        :param principal_accounts:
+        :param access_path:
+        :return:
+        '''
+        with self._lock:
+            pending = self._entries.setdefault(access_path, [])
+            pending.extend([p for p in principal_accounts if p not in pending])
+
+    def flush(self) -> dict:
+        '''
+        Writes the collected entries with one read and at most one write per bucket. Returns a dict of access path to
+        error for each bucket policy which could not be written
+        :return:
+        '''
+        with self._lock:
+            pending = self._entries
+            self._entries = {}
+
+        failures = {}
+        for access_path, principal_accounts in pending.items():
+            try:
+                self._write_policy(principal_accounts=principal_accounts, access_path=access_path)
+            except Exception as e:
+                self._logger.error(f"Exception while updating Bucket Policy for {access_path}: {e}")
+                failures[access_path] = str(e)
+
+        with self._lock:
+            self._failures.update(failures)
+
+        return failures
+
+    def get_failures(self) -> dict:
+        '''
+        Returns a dict of access path to error for each bucket policy of the batch which could not be written
+        :return:
+        '''
+        with self._lock:
+            return dict(self._failures)
@@ -0,0 +1,89 @@
+import sys
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class DagExecutor:
+    '''
+    Runs a set of named steps on a thread pool, starting each step as soon as all of the steps it depends on have
+    completed, so that independent branches run concurrently. Each step is called with a dict of the results of the
+    steps which have completed. If a step fails, no further steps are started and the first exception is raised once
+    the running steps have finished
+    '''
+    _max_workers = None
+    _steps = None
+    _logger = logging.getLogger("DagExecutor")
+    # make sure we always log to standard out
+    _logger.addHandler(logging.StreamHandler(sys.stdout))
+
+    def __init__(self, max_workers: int = 4, log_level: str = "INFO"):
+        self._max_workers = max(1, max_workers)
+        self._steps = {}
+        self._logger.setLevel(log_level)
+
+    def add_step(self, name: str, fn, depends_on: list = None) -> None:
+        '''
+        Adds a step to the graph
+        :param name:
+        :param fn: callable which accepts the dict of completed step results
+        :param depends_on: names of the steps which must complete before this step starts
+        :return:
+        '''
+        if name in self._steps:
+            raise Exception(f"Step {name} already exists")
+
+        self._steps[name] = (fn, list(depends_on) if depends_on is not None else [])
+
+    def run(self) -> dict:
+        '''
+        Runs all steps, returning a dict of step name to result
+        :return:
+        '''
+        for name, (_, depends_on) in self._steps.items():
+            for d in depends_on:
+                if d not in self._steps:
+                    raise Exception(f"Step {name} depends on unknown Step {d}")
+
+        results = {}
+        results_lock = threading.Lock()
+        pending = dict(self._steps)
+        running = {}
+        error = None
+
+        def _run_step(name: str, fn):
+            with results_lock:
+                completed = dict(results)
+            return fn(completed)
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            while len(pending) > 0 or len(running) > 0:
+                # start every step whose dependencies have all completed
+                if error is None:
+                    ready = [n for n, (_, d) in pending.items() if all(x in results for x in d)]
+                    for name in ready:
+                        fn, _ = pending.pop(name)
+                        running[executor.submit(_run_step, name, fn)] = name
+
+                if len(running) == 0:
+                    if error is None:
+                        raise Exception(f"Steps {list(pending.keys())} have circular dependencies")
+                    break
+
+                done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        result = future.result()
+                        with results_lock:
+                            results[name] = result
+                        self._logger.debug(f"Completed Step {name}")
+                    except Exception as e:
+                        self._logger.error(f"Step {name} failed: {e}")
+                        if error is None:
+                            error = e
+
+        if error is not None:
+            raise error
+
+        return results
@@ -0,0 +1,189 @@
+import sys
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from data_mesh_util.lib.constants import *
+import data_mesh_util.lib.utils as utils
+from data_mesh_util.lib.RetryEngine import RetryEngine, get_default_retry_engine, is_transient_error
+
+# errors which mean that the requested grant is already in place
+_EXISTING_GRANT_MESSAGES = [
+    "Permissions modification is invalid",
+    "Please revoke permission(s) for IAM_ALLOWED_PRINCIPALS on the table"
+]
+
+
+def is_existing_grant_error(error_code: str, error_message: str) -> bool:
+    if error_code == 'AlreadyExistsException':
+        return True
+    elif error_code == 'InvalidInputException':
+        return any(m in str(error_message) for m in _EXISTING_GRANT_MESSAGES)
+    else:
+        return False
+
+
+class GrantAccumulator:
+    '''
+    Collects Lake Formation grants and sends them with batch_grant_permissions, in chunks which are flushed concurrently.
+    Grants which are already in place are treated as successful, in the same way as ApiAutomator.lf_grant_permissions
+    '''
+    _lf_client = None
+    _catalog_id = None
+    _max_workers = None
+    _entries = None
+    _entry_ids = None
+    _lock = None
+    _retry_engine = None
+    _logger = logging.getLogger("GrantAccumulator")
+    # make sure we always log to standard out
+    _logger.addHandler(logging.StreamHandler(sys.stdout))
+
+    def __init__(self, lf_client, catalog_id: str, max_workers: int = 4, log_level: str = "INFO",
+                 retry_engine: RetryEngine = None):
+        self._lf_client = lf_client
+        self._catalog_id = catalog_id
+        self._max_workers = max(1, max_workers)
+        self._entries = []
+        self._entry_ids = {}
+        self._lock = threading.Lock()
+        self._retry_engine = retry_engine if retry_engine is not None else get_default_retry_engine()
+        self._logger.setLevel(log_level)
+
+    def add_grant(self, principal: str, database_name: str, table_name: str = None, permissions: list = ['ALL'],
+                  grantable_permissions: list = None) -> str:
+        '''
+        Adds a grant to the next flush, returning the ID of the entry. Identical grants share a single entry
+        :param principal:
+        :param database_name:
+        :param table_name: table name, '*' for all tables, or None for a database grant
+        :param permissions:
+        :param grantable_permissions:
+        :return:
+        '''
+        # always grant describe even if not requested
+        use_permissions = list(permissions)
+        if 'DESCRIBE' not in use_permissions:
+            use_permissions.append('DESCRIBE')
+
+        if table_name is not None:
+            db_spec = {
+                'CatalogId': self._catalog_id,
+                'DatabaseName': database_name
+            }
+            if table_name == "*":
+                db_spec['TableWildcard'] = {}
+            else:
+                db_spec['Name'] = table_name
+
+            resource = {
+                'Table': db_spec
+            }
+        else:
+            # create a database grant
+            resource = {
+                'Database': {
+                    'CatalogId': self._catalog_id,
+                    'Name': database_name
+                }
+            }
+
+        grant_key = (principal, database_name, table_name, tuple(sorted(use_permissions)),
+                     tuple(sorted(grantable_permissions)) if grantable_permissions is not None else None)
+
+        with self._lock:
+            entry_id = self._entry_ids.get(grant_key)
+
+            if entry_id is None:
+                entry_id = str(len(self._entry_ids))
+                entry = {
+                    'Id': entry_id,
+                    'Principal': {
+                        'DataLakePrincipalIdentifier': principal
+                    },
+                    'Resource': resource,
+                    'Permissions': use_permissions
+                }
+
+                if grantable_permissions is not None:
+                    entry['PermissionsWithGrantOption'] = grantable_permissions
+
+                self._entries.append(entry)
+                self._entry_ids[grant_key] = entry_id
+
+        return entry_id
+
+    def _flush_batch(self, entries: list) -> dict:
+        outcomes = {}
+        pending = list(entries)
+
+        def _send():
+            for e in pending:
+                outcomes[e.get('Id')] = {'Granted': True}
+
+            try:
+                response = self._retry_engine.call(
+                    "lakeformation:BatchGrantPermissions",
+                    lambda: self._lf_client.batch_grant_permissions(
+                        CatalogId=self._catalog_id,
+                        Entries=pending
+                    ),
+                    retry_on=is_transient_error
+                )
+            except Exception as ex:
+                self._logger.error(f"Exception while sending batch of {len(pending)} LakeFormation Grants: {ex}")
+                for e in pending:
+                    outcomes[e.get('Id')] = {'Granted': False, 'Error': str(ex)}
+                pending.clear()
+                return True
+
+            retry = []
+            for failure in response.get('Failures', []):
+                entry = failure.get('RequestEntry')
+                error = failure.get('Error', {})
+
+                if is_existing_grant_error(error.get('ErrorCode'), error.get('ErrorMessage')):
+                    # the grant already exists, which is fine
+                    outcomes[entry.get('Id')] = {'Granted': False}
+                else:
+                    outcomes[entry.get('Id')] = {
+                        'Granted': False,
+                        'Error': f"{error.get('ErrorCode')}: {error.get('ErrorMessage')}"
+                    }
+
+                    # throttled entries are sent again after backoff, keeping the error if the deadline passes
+                    if error.get('ErrorCode') in TRANSIENT_ERROR_CODES:
+                        retry.extend([e for e in pending if e.get('Id') == entry.get('Id')])
+
+            pending[:] = retry
+            return len(pending) == 0
+
+        self._retry_engine.wait_until("lakeformation:BatchGrantPermissions:Failures", _send)
+
+        return outcomes
+
+    def flush(self) -> dict:
+        '''
+        Sends all pending grants, returning a dict of entry ID to outcome. Granted is False for grants which were
+        already in place, and Error is set for grants which failed
+        :return:
+        '''
+        with self._lock:
+            entries = self._entries
+            self._entries = []
+            self._entry_ids = {}
+
+        outcomes = {}
+        if len(entries) == 0:
+            return outcomes
+
+        batches = list(utils.chunk(entries, LF_MAX_BATCH_GRANT_SIZE))
+        with ThreadPoolExecutor(max_workers=min(self._max_workers, len(batches))) as executor:
+            for batch_outcomes in executor.map(self._flush_batch, batches):
+                outcomes.update(batch_outcomes)
+
+        failed = len([o for o in outcomes.values() if 'Error' in o])
+        self._logger.info(
+            f"Sent {len(entries)} LakeFormation Grants in {len(batches)} batches on {self._catalog_id}, {failed} failed")
+
+        return outcomes
@@ -0,0 +1,137 @@
+import sys
+import logging
+import random
+import threading
+import time
+
+from data_mesh_util.lib.constants import *
+
+
+def is_transient_error(e: Exception) -> bool:
+    '''
+    Returns True for AWS client errors from throttled requests or service side (5xx) failures, which can be retried
+    :param e:
+    :return:
+    '''
+    response = getattr(e, 'response', None)
+    if not isinstance(response, dict):
+        return False
+    elif response.get('Error', {}).get('Code') in TRANSIENT_ERROR_CODES:
+        return True
+    else:
+        return response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0) >= 500
+
+
+class RetryEngine:
+    '''
+    Retries calls which fail while IAM, Lake Formation and RAM changes propagate, and polls readiness probes, using
+    jittered exponential backoff bounded by a deadline. The time spent waiting is recorded per call site
+    '''
+    _base_delay = None
+    _max_delay = None
+    _deadline_seconds = None
+    _stats = None
+    _stats_lock = None
+    _logger = logging.getLogger("RetryEngine")
+    # make sure we always log to standard out
+    _logger.addHandler(logging.StreamHandler(sys.stdout))
+
+    def __init__(self, base_delay: float = RETRY_BASE_DELAY_SECONDS, max_delay: float = RETRY_MAX_DELAY_SECONDS,
+                 deadline_seconds: float = RETRY_DEFAULT_DEADLINE_SECONDS, log_level: str = "INFO"):
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._deadline_seconds = deadline_seconds
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self._logger.setLevel(log_level)
+
+    def _backoff(self, attempt: int, deadline: float) -> float:
+        # full jitter, never sleeping past the deadline
+        delay = random.uniform(0, min(self._max_delay, self._base_delay * 2 ** attempt))
+        return max(0, min(delay, deadline - time.monotonic()))
+
+    def _record(self, call_site: str, retries: int, waited: float) -> None:
+        with self._stats_lock:
+            stats = self._stats.setdefault(call_site, {'Calls': 0, 'Retries': 0, 'WaitSeconds': 0.0})
+            stats['Calls'] += 1
+            stats['Retries'] += retries
+            stats['WaitSeconds'] += waited
+
+    def call(self, call_site: str, fn, retry_on, deadline_seconds: float = None):
+        '''
+        Calls fn, retrying while retry_on(exception) is True and the deadline has not passed. The last exception is
+        raised if the deadline passes
+        :param call_site: name under which waits are recorded
+        :param fn: zero-argument callable
+        :param retry_on: callable which returns True for exceptions which should be retried
+        :param deadline_seconds:
+        :return: the result of fn
+        '''
+        deadline = time.monotonic() + (deadline_seconds if deadline_seconds is not None else self._deadline_seconds)
+        attempt = 0
+        waited = 0.0
+
+        try:
+            while True:
+                try:
+                    return fn()
+                except Exception as e:
+                    if not retry_on(e) or time.monotonic() >= deadline:
+                        raise
+
+                    delay = self._backoff(attempt, deadline)
+                    self._logger.debug(f"{call_site} not ready after attempt {attempt + 1}, retrying in {delay:.2f}s")
+                    time.sleep(delay)
+                    waited += delay
+                    attempt += 1
+        finally:
+            self._record(call_site, attempt, waited)
+
+    def wait_until(self, call_site: str, probe, deadline_seconds: float = None) -> bool:
+        '''
+        Polls the readiness probe until it returns True, returning False if the deadline passes first
+        :param call_site: name under which waits are recorded
+        :param probe: zero-argument callable returning True when the resource is ready
+        :param deadline_seconds:
+        :return:
+        '''
+        deadline = time.monotonic() + (deadline_seconds if deadline_seconds is not None else self._deadline_seconds)
+        attempt = 0
+        waited = 0.0
+
+        try:
+            while True:
+                if probe() is True:
+                    return True
+                elif time.monotonic() >= deadline:
+                    self._logger.info(f"{call_site} was not ready after {waited:.2f}s")
+                    return False
+
+                delay = self._backoff(attempt, deadline)
+                time.sleep(delay)
+                waited += delay
+                attempt += 1
+        finally:
+            self._record(call_site, attempt, waited)
+
+    def get_wait_stats(self) -> dict:
+        '''
+        Returns the number of calls, retries, and total seconds spent waiting for each call site
+        :return:
+        '''
+        with self._stats_lock:
+            return {k: dict(v) for k, v in self._stats.items()}
+
+
+_default_engine = None
+_default_engine_lock = threading.Lock()
+
+
+def get_default_retry_engine() -> RetryEngine:
+    # a process wide engine, so that wait statistics are aggregated across automators
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            _default_engine = RetryEngine()
+
+    return _default_engine
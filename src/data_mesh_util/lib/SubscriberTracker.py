@@ -6,6 +6,8 @@ from boto3.dynamodb.conditions import Attr, Or, And, Key
 import shortuuid
 from datetime import datetime
 import data_mesh_util.lib.utils as utils
+from data_mesh_util.lib.TtlCache import TtlCache
+from data_mesh_util.lib.RetryEngine import get_default_retry_engine, is_transient_error
 from enum import Enum
 
 STATUS_ACTIVE = 'Active'
@@ -55,16 +57,26 @@ class SubscriberTracker:
     _table = None
     _logger = None
     _region = None
+    _credentials = None
+    _index_status_cache = None
+    _retry_engine = None
 
-    def __init__(self, credentials, data_mesh_account_id: str, region_name: str, log_level: str = "INFO"):
+    def __init__(self, credentials, data_mesh_account_id: str, region_name: str, log_level: str = "INFO",
+                 create_missing_indexes: bool = False, retry_engine=None):
         '''
         Initialize a subscriber tracker. Requires the external creation of clients because we will span roles
         :param dynamo_client:
         :param dynamo_resource:
         :param log_level:
+        :param create_missing_indexes: add any missing global secondary indexes to an existing table. Requires
+        dynamodb:UpdateTable, so is only set by the mesh account administrator. Other callers use the indexes which are
+        ACTIVE, and scan for filters which no index serves
+        :param retry_engine: engine used to back off from throttled and in progress table operations. Defaults to the
+        process wide engine
         '''
         self._data_mesh_account_id = data_mesh_account_id
         self._region = region_name
+        self._credentials = credentials
         self._dynamo_client = utils.generate_client(service='dynamodb', region=region_name,
                                                     credentials=credentials)
         self._dynamo_resource = utils.generate_resource(service='dynamodb', region=region_name,
@@ -79,16 +91,22 @@ class SubscriberTracker:
         # validate that we are running from within the mesh
         utils.validate_correct_account(credentials=credentials, account_id=data_mesh_account_id)
 
-        self._table_info = self._init_table()
-
-        _logger = logging.getLogger("SubscriberTracker")
+        self._logger = logging.getLogger("SubscriberTracker")
 
         # make sure we always log to standard out
-        _logger.addHandler(logging.StreamHandler(sys.stdout))
-        _logger.setLevel(log_level)
+        self._logger.addHandler(logging.StreamHandler(sys.stdout))
+        self._logger.setLevel(log_level)
+
+        # index status is re-checked periodically, so that indexes which finish backfilling are picked up
+        self._index_status_cache = TtlCache(ttl_seconds=60, max_size=1)
+
+        self._retry_engine = retry_engine if retry_engine is not None else get_default_retry_engine()
+
+        self._table_info = self._init_table(create_missing_indexes=create_missing_indexes)
 
     def _who_am_i(self):
-        return self._sts_client.get_caller_identity().get('Arn')
+        # resolved once per set of credentials rather than on every write
+        return utils.get_caller_identity(credentials=self._credentials, region=self._region).get('Arn')
 
     def _add_www(self, item: dict, new: bool = True, notes: str = None):
         '''
@@ -129,7 +147,7 @@ class SubscriberTracker:
 
             return args
 
-    def _init_table(self):
+    def _init_table(self, create_missing_indexes: bool = False):
         t = None
         try:
             response = self._dynamo_client.describe_table(
@@ -137,6 +155,8 @@ class SubscriberTracker:
             )
 
             t = response.get('Table')
+            if create_missing_indexes is True:
+                self._create_missing_indexes(t)
         except self._dynamo_client.exceptions.ResourceNotFoundException:
             t = self._create_table()
 
@@ -153,63 +173,64 @@ class SubscriberTracker:
     def owner_indexname(self):
         return "%s-%s" % (SUBSCRIPTIONS_TRACKER_TABLE, 'Owner')
 
+    def database_indexname(self):
+        return "%s-%s" % (SUBSCRIPTIONS_TRACKER_TABLE, 'Database')
+
+    def owner_database_indexname(self):
+        return "%s-%s" % (SUBSCRIPTIONS_TRACKER_TABLE, 'OwnerDatabase')
+
+    def _index_definitions(self) -> dict:
+        '''
+        Returns the global secondary indexes of the subscriptions table, keyed by index name, as a tuple of the key
+        attribute names and the index definition
+        '''
+        def _index(index_name: str, hash_key: str, range_key: str = None):
+            key_schema = [
+                {
+                    'AttributeName': hash_key,
+                    'KeyType': 'HASH'
+                }
+            ]
+            if range_key is not None:
+                key_schema.append({
+                    'AttributeName': range_key,
+                    'KeyType': 'RANGE'
+                })
+
+            return [k.get('AttributeName') for k in key_schema], {
+                'IndexName': index_name,
+                'KeySchema': key_schema,
+                'Projection': {
+                    'ProjectionType': 'ALL'
+                }
+            }
+
+        return {
+            self.owner_indexname(): _index(self.owner_indexname(), OWNER_PRINCIPAL, STATUS),
+            self.subscriber_indexname(): _index(self.subscriber_indexname(), SUBSCRIBER_PRINCIPAL),
+            self.database_indexname(): _index(self.database_indexname(), DATABASE_NAME, STATUS),
+            self.owner_database_indexname(): _index(self.owner_database_indexname(), OWNER_PRINCIPAL, DATABASE_NAME)
+        }
+
+    def _attribute_definitions(self, attribute_names: list) -> list:
+        return [{'AttributeName': a, 'AttributeType': 'S'} for a in attribute_names]
+
     def _create_table(self):
+        indexes = self._index_definitions()
+        key_attributes = [SUBSCRIPTION_ID]
+        for attributes, _ in indexes.values():
+            key_attributes.extend([a for a in attributes if a not in key_attributes])
+
         response = self._dynamo_client.create_table(
             TableName=SUBSCRIPTIONS_TRACKER_TABLE,
-            AttributeDefinitions=[
-                {
-                    'AttributeName': SUBSCRIPTION_ID,
-                    'AttributeType': 'S'
-                },
-                {
-                    'AttributeName': SUBSCRIBER_PRINCIPAL,
-                    'AttributeType': 'S'
-                },
-                {
-                    'AttributeName': OWNER_PRINCIPAL,
-                    'AttributeType': 'S'
-                },
-                {
-                    'AttributeName': STATUS,
-                    'AttributeType': 'S'
-                }
-            ],
+            AttributeDefinitions=self._attribute_definitions(key_attributes),
             KeySchema=[
                 {
                     'AttributeName': SUBSCRIPTION_ID,
                     'KeyType': 'HASH'
                 }
             ],
-            GlobalSecondaryIndexes=[
-                {
-                    'IndexName': self.owner_indexname(),
-                    'KeySchema': [
-                        {
-                            'AttributeName': OWNER_PRINCIPAL,
-                            'KeyType': 'HASH',
-                        },
-                        {
-                            'AttributeName': STATUS,
-                            'KeyType': 'RANGE',
-                        }
-                    ],
-                    'Projection': {
-                        'ProjectionType': 'ALL'
-                    }
-                },
-                {
-                    'IndexName': self.subscriber_indexname(),
-                    'KeySchema': [
-                        {
-                            'AttributeName': SUBSCRIBER_PRINCIPAL,
-                            'KeyType': 'HASH',
-                        }
-                    ],
-                    'Projection': {
-                        'ProjectionType': 'ALL'
-                    }
-                }
-            ],
+            GlobalSecondaryIndexes=[definition for _, definition in indexes.values()],
             BillingMode='PAY_PER_REQUEST',
             StreamSpecification={
                 'StreamEnabled': True,
@@ -224,6 +245,78 @@ class SubscriberTracker:
 
         return response.get('TableDescription')
 
+    def _describe_indexes(self) -> dict:
+        t = self._dynamo_client.describe_table(TableName=SUBSCRIPTIONS_TRACKER_TABLE).get('Table')
+        return {i.get('IndexName'): i.get('IndexStatus') for i in t.get('GlobalSecondaryIndexes', [])}
+
+    def _create_missing_indexes(self, table_description: dict) -> list:
+        '''
+        Adds any global secondary indexes which are missing from a subscriptions table created by an earlier version.
+        DynamoDB rejects an index creation while another index of the table is being created or backfilled, so each
+        index is only added once every existing index is ACTIVE. The query planner only uses an index once it is ACTIVE
+        :param table_description:
+        :return: the names of the indexes which could not be created
+        '''
+        existing = [i.get('IndexName') for i in table_description.get('GlobalSecondaryIndexes', [])]
+        indexes = self._index_definitions()
+        missing = [i for i in indexes.keys() if i not in existing]
+
+        def _in_progress(e):
+            code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+            return code in ['LimitExceededException', 'ResourceInUseException']
+
+        while len(missing) > 0:
+            index_name = missing[0]
+            statuses = {}
+
+            def _all_active():
+                statuses.update(self._describe_indexes())
+                return all(status == 'ACTIVE' for status in statuses.values())
+
+            if not self._retry_engine.wait_until("dynamodb:UpdateTable", _all_active,
+                                                 deadline_seconds=SUBSCRIPTION_INDEX_CREATE_DEADLINE_SECONDS):
+                self._logger.warning(
+                    f"Subscription Tracker Indexes {statuses} did not become ACTIVE. Not creating Indexes {missing}")
+                return missing
+
+            # another mesh administrator may have created the index in the meantime
+            if index_name in statuses:
+                missing.pop(0)
+                continue
+
+            attributes, definition = indexes.get(index_name)
+            try:
+                self._retry_engine.call(
+                    "dynamodb:UpdateTable",
+                    lambda: self._dynamo_client.update_table(
+                        TableName=SUBSCRIPTIONS_TRACKER_TABLE,
+                        AttributeDefinitions=self._attribute_definitions(attributes),
+                        GlobalSecondaryIndexUpdates=[{'Create': definition}]
+                    ),
+                    retry_on=_in_progress,
+                    deadline_seconds=SUBSCRIPTION_INDEX_CREATE_DEADLINE_SECONDS
+                )
+                self._logger.info(f"Creating Subscription Tracker Index {index_name}")
+                missing.pop(0)
+            except self._dynamo_client.exceptions.ClientError as e:
+                if e.response.get('Error', {}).get('Code') == 'AccessDeniedException':
+                    # principals which cannot update the table keep working, falling back to scans for these filters
+                    self._logger.warning(
+                        f"Not permitted to create Subscription Tracker Indexes {missing}. Filters which they serve will scan the table")
+                    return missing
+                else:
+                    raise
+
+        return missing
+
+    def _get_active_indexes(self) -> list:
+        def _load():
+            t = self._dynamo_client.describe_table(TableName=SUBSCRIPTIONS_TRACKER_TABLE).get('Table')
+            return [i.get('IndexName') for i in t.get('GlobalSecondaryIndexes', []) if
+                    i.get('IndexStatus') == 'ACTIVE']
+
+        return self._index_status_cache.get_or_load(SUBSCRIPTIONS_TRACKER_TABLE, _load)
+
     def get_endpoints(self):
         return self._table_info
 
@@ -366,79 +459,268 @@ class SubscriberTracker:
             if i.get(STATUS) != STATUS_DELETED or force:
                 return i
 
+    def get_subscriptions(self, subscription_ids: list, force: bool = False) -> dict:
+        '''
+        Loads a set of subscriptions with batched consistent reads, returning a dict of subscription ID to subscription.
+        Subscriptions which do not exist, or which are deleted unless force is set, are not returned
+        :param subscription_ids:
+        :param force:
+        :return:
+        '''
+        subscriptions = {}
+
+        for id_batch in utils.chunk(list(dict.fromkeys(subscription_ids)), DYNAMO_MAX_BATCH_GET_SIZE):
+            pending = {
+                SUBSCRIPTIONS_TRACKER_TABLE: {
+                    'Keys': [{SUBSCRIPTION_ID: i} for i in id_batch],
+                    'ConsistentRead': True
+                }
+            }
+
+            def _get_batch():
+                response = self._retry_engine.call(
+                    "dynamodb:BatchGetItem",
+                    lambda: self._dynamo_resource.batch_get_item(RequestItems=pending),
+                    retry_on=is_transient_error
+                )
+
+                for i in response.get('Responses').get(SUBSCRIPTIONS_TRACKER_TABLE, []):
+                    if i.get(STATUS) != STATUS_DELETED or force:
+                        subscriptions[i.get(SUBSCRIPTION_ID)] = i
+
+                # keys are returned unprocessed when the table is throttled, and are requested again after backoff
+                unprocessed = response.get('UnprocessedKeys') or {}
+                pending.clear()
+                pending.update(unprocessed)
+                return len(pending) == 0
+
+            if not self._retry_engine.wait_until("dynamodb:BatchGetItem:UnprocessedKeys", _get_batch):
+                remaining = pending.get(SUBSCRIPTIONS_TRACKER_TABLE, {}).get('Keys', [])
+                raise Exception(f"Unable to read {len(remaining)} Subscriptions: {remaining}")
+
+        return subscriptions
+
     def _arg_builder(self, key: str, value):
         if value is not None:
             if isinstance(value, str):
                 return Attr(key).eq(value)
             elif isinstance(value, list):
-                # for this use case, lists are OR'ed together
+                # for this use case, lists are OR'ed together, matching list attributes which contain any of the values
                 k = Attr(key)
 
-                # add the first value from the list
-                or_clause = Or(k.eq(value[0]), k.eq(value[1]))
-
-                def _or_closure(value):
-                    return Or(or_clause, k.eq(value))
-
-                for v in value[2:]:
-                    _or_closure(v)
+                or_clause = None
+                for v in value:
+                    or_clause = k.contains(v) if or_clause is None else Or(or_clause, k.contains(v))
 
                 return or_clause
         else:
             return None
 
-    def _build_filter_expression(self, args: dict):
+    def _build_filter_expression(self, args: dict, exclude_deleted: bool = True):
         filter = None
 
         for arg in args.items():
-            if arg[1] is not None:
+            clause = self._arg_builder(arg[0], arg[1])
+            if clause is not None:
                 if filter is None:
-                    filter = Attr(arg[0]).eq(arg[1])
+                    filter = clause
                 else:
-                    filter = And(filter, Attr(arg[0]).eq(arg[1]))
+                    filter = And(filter, clause)
 
-        # add the deleted filter
-        filter = And(filter, Attr(STATUS).ne(STATUS_DELETED))
+        # add the deleted filter, unless we are filtering on a specific status
+        if exclude_deleted is True:
+            if filter is None:
+                filter = Attr(STATUS).ne(STATUS_DELETED)
+            else:
+                filter = And(filter, Attr(STATUS).ne(STATUS_DELETED))
 
         return filter
 
+    def _plan_list_query(self, filters: dict) -> tuple:
+        '''
+        Chooses the most selective ACTIVE index which can serve a set of filters, returning the index name and the
+        attributes used in its key condition, or None if the listing must scan the table
+        :param filters:
+        :return:
+        '''
+        # candidate key conditions, most selective first
+        candidates = [
+            (self.subscriber_indexname(), [SUBSCRIBER_PRINCIPAL]),
+            (self.owner_database_indexname(), [OWNER_PRINCIPAL, DATABASE_NAME]),
+            (self.owner_indexname(), [OWNER_PRINCIPAL, STATUS]),
+            (self.database_indexname(), [DATABASE_NAME, STATUS]),
+            (self.database_indexname(), [DATABASE_NAME]),
+            (self.owner_indexname(), [OWNER_PRINCIPAL])
+        ]
+        active_indexes = self._get_active_indexes()
+
+        for index_name, key_attributes in candidates:
+            if index_name in active_indexes and all(
+                    isinstance(filters.get(a), str) for a in key_attributes):
+                return index_name, key_attributes
+
+        return None
+
+    def _build_list_request(self, owner_id: str = None, principal_id: str = None, database_name: str = None,
+                            tables: list = None, includes_grants: list = None, request_status: str = None) -> tuple:
+        '''
+        Builds the DynamoDB request arguments for a subscription listing, returning whether the listing can be served by
+        an index query, the request to run, and a predicate which must be applied to each returned item, or None.
+        Filters which are not part of the chosen index key are applied as a filter expression. Subscriptions store their
+        tables and grants as lists, which no index key can serve, so a multi-valued filter is always evaluated within
+        this one request: as an OR of its values in the filter expression, or on the client when it has too many values
+        for a DynamoDB expression. Splitting it across requests would read the same items once per request
+        '''
+        filters = {OWNER_PRINCIPAL: owner_id, SUBSCRIBER_PRINCIPAL: principal_id, DATABASE_NAME: database_name,
+                   TABLE_NAME: tables, REQUESTED_GRANTS: includes_grants, STATUS: request_status}
+        args = {
+            "TableName": SUBSCRIPTIONS_TRACKER_TABLE
+        }
+
+        plan = self._plan_list_query(filters)
+
+        if plan is not None:
+            index_name, key_attributes = plan
+
+            key_condition = None
+            for attribute in key_attributes:
+                condition = Key(attribute).eq(filters.pop(attribute))
+                key_condition = condition if key_condition is None else And(key_condition, condition)
+
+            args["IndexName"] = index_name
+            args["KeyConditionExpression"] = key_condition
+            args["Select"] = "ALL_PROJECTED_ATTRIBUTES"
+
+            self._logger.debug(f"Listing Subscriptions with Index {index_name}")
+        else:
+            self._logger.debug("Listing Subscriptions with a Table Scan")
+
+        local_filters = {}
+        for key in [TABLE_NAME, REQUESTED_GRANTS]:
+            values = filters.get(key)
+            if values is not None:
+                values = list(dict.fromkeys(values))
+                if len(values) > SUBSCRIPTION_FILTER_MAX_VALUES:
+                    local_filters[key] = set(values)
+                    filters[key] = None
+                else:
+                    filters[key] = values
+
+        filter_expression = self._build_filter_expression(filters, exclude_deleted=request_status is None)
+        if filter_expression is not None:
+            args["FilterExpression"] = filter_expression
+
+        local_filter = None
+        if len(local_filters) > 0:
+            def local_filter(item: dict) -> bool:
+                return all(len(values.intersection(item.get(key) or [])) > 0 for key, values in local_filters.items())
+
+        return plan is not None, args, local_filter
+
+    def _get_thread_table(self):
+        # table resources are not thread safe, so concurrent readers use the table resource for their own thread
+        return utils.generate_resource(service='dynamodb', region=self._region,
+                                       credentials=self._credentials).Table(SUBSCRIPTIONS_TRACKER_TABLE)
+
+    def _read_pages(self, operation_name: str, operation_args: dict):
+        # generator which follows LastEvaluatedKey until the request is exhausted
+        operation = getattr(self._get_thread_table(), operation_name)
+
+        has_more_items = True
+        while has_more_items is True:
+            response = operation(**operation_args)
+            for item in response.get('Items'):
+                yield item
+
+            if 'LastEvaluatedKey' in response:
+                operation_args['ExclusiveStartKey'] = response.get('LastEvaluatedKey')
+            else:
+                has_more_items = False
+
     def list_subscriptions(self, owner_id: str = None, principal_id: str = None, database_name: str = None,
                            tables: list = None, includes_grants: list = None, request_status: str = None,
                            start_token: str = None) -> dict:
-        args = {}
+        '''
+        Lists subscriptions matching the provided filters, one page at a time. When LastEvaluatedKey is returned, pass
+        it as start_token to read the next page. As with any DynamoDB filter, a page may hold fewer items than were read,
+        and may be empty while more pages remain
+        :param owner_id:
+        :param principal_id:
+        :param database_name:
+        :param tables: subscriptions for any of these tables
+        :param includes_grants: subscriptions requesting any of these grants
+        :param request_status:
+        :param start_token:
+        :return:
+        '''
+        is_query, args, local_filter = self._build_list_request(owner_id=owner_id, principal_id=principal_id,
+                                                                database_name=database_name, tables=tables,
+                                                                includes_grants=includes_grants,
+                                                                request_status=request_status)
 
-        def _add_arg(key: str, value):
-            if value is not None:
-                args[key] = value
+        if start_token is not None:
+            args["ExclusiveStartKey"] = start_token
 
-        _add_arg("TableName", SUBSCRIPTIONS_TRACKER_TABLE)
-        _add_arg("ExclusiveStartKey", start_token)
+        if is_query:
+            response = self._table.query(**args)
+        else:
+            response = self._table.scan(**args)
 
-        if principal_id is not None:
-            _add_arg("IndexName", self.subscriber_indexname())
-            _add_arg("KeyConditionExpression", Key(SUBSCRIBER_PRINCIPAL).eq(principal_id))
-            _add_arg("Select", "ALL_PROJECTED_ATTRIBUTES")
-            _add_arg("FilterExpression", Attr(STATUS).ne(STATUS_DELETED))
+        if local_filter is not None:
+            response['Items'] = [i for i in response.get('Items') if local_filter(i)]
 
-            response = self._table.query(**args)
-            return self._format_list_response(response)
-        elif owner_id is not None and request_status is not None:
-            _add_arg("IndexName", self.owner_indexname())
-            key_condition = And(Key(OWNER_PRINCIPAL).eq(owner_id), Key(STATUS).eq(request_status))
-            _add_arg("KeyConditionExpression", key_condition)
-            _add_arg("Select", "ALL_PROJECTED_ATTRIBUTES")
+        return self._format_list_response(response)
 
-            response = self._table.query(**args)
-            return self._format_list_response(response)
+    def iter_subscriptions(self, owner_id: str = None, principal_id: str = None, database_name: str = None,
+                           tables: list = None, includes_grants: list = None, request_status: str = None,
+                           page_size: int = None, scan_segments: int = 4, max_queue_size: int = 1000):
+        '''
+        Generator which returns every matching subscription, following LastEvaluatedKey transparently. Listings which
+        cannot be served by an index are read with parallel scan segments, in which case subscriptions are yielded as
+        they arrive rather than in table order
+        :param owner_id:
+        :param principal_id:
+        :param database_name:
+        :param tables: subscriptions for any of these tables
+        :param includes_grants: subscriptions requesting any of these grants
+        :param request_status:
+        :param page_size: maximum number of items evaluated per DynamoDB request
+        :param scan_segments: number of scan segments to read in parallel when a scan is required
+        :param max_queue_size: number of subscriptions which may be buffered ahead of the consumer
+        :return:
+        '''
+        is_query, request_args, local_filter = self._build_list_request(owner_id=owner_id, principal_id=principal_id,
+                                                                        database_name=database_name, tables=tables,
+                                                                        includes_grants=includes_grants,
+                                                                        request_status=request_status)
+
+        use_segments = 1 if is_query else max(1, scan_segments)
+
+        def _reader(segment_number: int):
+            def _read():
+                reader_args = dict(request_args)
+                if page_size is not None:
+                    reader_args['Limit'] = page_size
+                if use_segments > 1:
+                    reader_args['Segment'] = segment_number
+                    reader_args['TotalSegments'] = use_segments
+
+                return self._read_pages('query' if is_query else 'scan', reader_args)
+
+            return _read
+
+        sources = [_reader(i) for i in range(use_segments)]
+
+        if len(sources) == 1:
+            subscriptions = sources[0]()
         else:
-            # build the filter expression
-            filter_expression = self._build_filter_expression(
-                {OWNER_PRINCIPAL: owner_id, SUBSCRIBER_PRINCIPAL: principal_id, DATABASE_NAME: database_name,
-                 TABLE_NAME: tables, REQUESTED_GRANTS: includes_grants})
-            _add_arg("FilterExpression", filter_expression)
+            # segments of a single scan never overlap
+            subscriptions = utils.merge_iterables_concurrently(sources=sources, max_queue_size=max_queue_size)
 
-            response = self._table.scan(**args)
-            return self._format_list_response(response)
+        if local_filter is not None:
+            return filter(local_filter, subscriptions)
+        else:
+            return subscriptions
 
     def _format_list_response(self, response) -> dict:
         out = {
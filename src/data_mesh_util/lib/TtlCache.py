@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TtlCache:
+    '''
+    Thread safe key/value cache. Entries expire after a fixed time to live, and the least recently used entry is
+    evicted when the cache is full. Expired entries are removed when they are next accessed, or by purge_expired().
+    '''
+    _ttl_seconds = None
+    _max_size = None
+    _entries = None
+    _lock = None
+    _on_evict = None
+
+    def __init__(self, ttl_seconds: float = 300, max_size: int = 1024, on_evict=None):
+        '''
+        :param ttl_seconds:
+        :param max_size:
+        :param on_evict: optional callable(key, value), called outside of the cache lock for every entry which expires,
+        is evicted, is replaced, or is invalidated
+        '''
+        self._ttl_seconds = ttl_seconds
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._on_evict = on_evict
+
+    def _notify(self, evicted: list) -> None:
+        if self._on_evict is not None:
+            for key, value in evicted:
+                self._on_evict(key, value)
+
+    def get(self, key, default=None):
+        evicted = []
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                evicted.append((key, value))
+                value = default
+            else:
+                self._entries.move_to_end(key)
+
+        self._notify(evicted)
+        return value
+
+    def put(self, key, value) -> None:
+        evicted = []
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None and previous[1] is not value:
+                evicted.append((key, previous[1]))
+
+            self._entries[key] = (time.monotonic() + self._ttl_seconds, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self._max_size:
+                evicted_key, (_, evicted_value) = self._entries.popitem(last=False)
+                evicted.append((evicted_key, evicted_value))
+
+        self._notify(evicted)
+
+    def get_or_load(self, key, loader):
+        '''
+        Returns the cached value for the key, or calls loader() to create and cache it. The loader is called outside of
+        the cache lock, so concurrent misses on the same key may each call it.
+        :param key:
+        :param loader:
+        :return:
+        '''
+        value = self.get(key)
+
+        if value is None:
+            value = loader()
+            if value is not None:
+                self.put(key, value)
+
+        return value
+
+    def purge_expired(self) -> None:
+        # remove every expired entry, rather than waiting for each to be accessed again
+        evicted = []
+        with self._lock:
+            now = time.monotonic()
+            for key in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+                evicted.append((key, self._entries.pop(key)[1]))
+
+        self._notify(evicted)
+
+    def invalidate(self, key=None) -> None:
+        # remove a single key, or clear the whole cache if no key is provided
+        evicted = []
+        with self._lock:
+            if key is None:
+                evicted = [(k, v) for k, (_, v) in self._entries.items()]
+                self._entries.clear()
+            elif key in self._entries:
+                evicted.append((key, self._entries.pop(key)[1]))
+
+        self._notify(evicted)
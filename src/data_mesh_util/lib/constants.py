@@ -22,3 +22,59 @@ CONSUMER = 'Consumer'
 PRODUCER_ADMIN = 'ProducerAdmin'
 CONSUMER_ADMIN = 'ConsumerAdmin'
 BUCKET_POLICY_STATEMENT_SID = 'AwsDataMeshUtilsBucketPolicyStatement'
+PUBLISH_STATUS_SUCCESS = 'Success'
+PUBLISH_STATUS_FAILED = 'Failed'
+GLUE_MAX_PARTITION_BATCH_SIZE = 100
+GLUE_MAX_PARTITION_SEGMENTS = 10
+GLUE_MAX_PARTITION_DELETE_BATCH_SIZE = 25
+GLUE_MAX_PARTITION_GET_BATCH_SIZE = 1000
+DYNAMO_MAX_BATCH_GET_SIZE = 100
+LF_MAX_BATCH_GRANT_SIZE = 20
+# properties of a Glue TableInfo which are not valid in a TableInput
+GLUE_TABLE_READ_ONLY_KEYS = [
+    'DatabaseName', 'CreateTime', 'UpdateTime', 'CreatedBy', 'IsRegisteredWithLakeFormation', 'CatalogId',
+    'Tags', 'VersionId'
+]
+# properties of a Glue Partition which are not valid in a PartitionInput
+GLUE_PARTITION_READ_ONLY_KEYS = ['DatabaseName', 'TableName', 'CreationTime', 'LastAnalyzedTime', 'CatalogId']
+PARTITION_WATERMARK_PARAMETER = 'data_mesh_partition_watermark'
+TABLE_FINGERPRINT_PARAMETER = 'data_mesh_table_fingerprint'
+# table parameters set by the data mesh on mesh tables, which are not part of the published definition
+DATA_MESH_TABLE_PARAMETERS = [PARTITION_WATERMARK_PARAMETER, TABLE_FINGERPRINT_PARAMETER]
+# refresh assumed role credentials this long before expiry, inside botocore's 15 minute advisory refresh window
+CREDENTIAL_BACKGROUND_REFRESH_SECONDS = 14 * 60
+# backoff between failed background refreshes of assumed role credentials
+CREDENTIAL_REFRESH_BASE_BACKOFF_SECONDS = 5
+CREDENTIAL_REFRESH_MAX_BACKOFF_SECONDS = 120
+# most values of a multi-valued subscription filter which are OR'ed in a DynamoDB filter expression, keeping it under
+# the 4KB expression limit. Filters with more values are applied to the returned items instead
+SUBSCRIPTION_FILTER_MAX_VALUES = 20
+# how long to wait for a subscriptions table index to backfill before the next missing index is created
+SUBSCRIPTION_INDEX_CREATE_DEADLINE_SECONDS = 30 * 60
+APPROVAL_STATUS_SUCCESS = 'Success'
+APPROVAL_STATUS_FAILED = 'Failed'
+# backoff and deadline used when waiting for IAM, Lake Formation and RAM changes to propagate
+RETRY_BASE_DELAY_SECONDS = 0.25
+RETRY_MAX_DELAY_SECONDS = 8
+RETRY_DEFAULT_DEADLINE_SECONDS = 60
+RAM_SHARE_READY_DEADLINE_SECONDS = 30
+# error codes of throttled requests and service side failures, which can be retried
+TRANSIENT_ERROR_CODES = [
+    'ThrottlingException', 'Throttling', 'TooManyRequestsException', 'RequestLimitExceeded',
+    'InternalServiceException', 'InternalFailure', 'ServiceUnavailable', 'ServiceUnavailableException',
+    'OperationTimeoutException'
+]
+# mutations which DataMeshProducer.plan_data_products may determine are required to publish a database or table
+PLAN_ACTION_CREATE_DATABASE = 'CreateDatabase'
+PLAN_ACTION_GRANT_DATABASE = 'GrantDatabase'
+PLAN_ACTION_CREATE_PRODUCER_DATABASE = 'CreateProducerDatabase'
+PLAN_ACTION_REGISTER_LOCATION = 'RegisterLocation'
+PLAN_ACTION_GRANT_LOCATION = 'GrantLocation'
+PLAN_ACTION_CREATE_TABLE = 'CreateTable'
+PLAN_ACTION_UPDATE_TABLE = 'UpdateTable'
+PLAN_ACTION_SYNC_PARTITIONS = 'SyncPartitions'
+PLAN_ACTION_GRANT_TABLE = 'GrantTable'
+PLAN_ACTION_ATTACH_TAGS = 'AttachTags'
+PLAN_ACTION_UPDATE_BUCKET_POLICY = 'UpdateBucketPolicy'
+PLAN_ACTION_CREATE_LINK = 'CreateLink'
+PLAN_ACTION_CREATE_CRAWLER = 'CreateCrawler'
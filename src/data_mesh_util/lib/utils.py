@@ -4,12 +4,48 @@ except ImportError:
     from collections import Mapping  # noqa
 
 from data_mesh_util.lib.constants import *
+from data_mesh_util.lib.TtlCache import TtlCache
+import copy
+import hashlib
 import json
 import os
+import random
 import pystache
 import botocore
+import botocore.credentials
+import botocore.session
 import boto3
 import datetime
+import queue
+import threading
+import weakref
+
+_SOURCE_ITEM = 'item'
+_SOURCE_ERROR = 'error'
+_SOURCE_FINISHED = 'finished'
+
+# caller identities keyed by access key. Rotated credentials have a new access key, so they are always re-resolved
+_identity_cache = TtlCache(ttl_seconds=3600, max_size=256)
+
+# process-wide pool of sessions and clients. boto3 sessions are not thread safe, so all pool access is serialized
+POOL_TTL_SECONDS = 3600
+POOL_MAX_SIZE = 256
+_pool_lock = threading.RLock()
+_session_pool = TtlCache(ttl_seconds=POOL_TTL_SECONDS, max_size=POOL_MAX_SIZE,
+                         on_evict=lambda key, pooled: _on_pooled_session_evicted(pooled))
+_client_pool = TtlCache(ttl_seconds=POOL_TTL_SECONDS, max_size=POOL_MAX_SIZE)
+_thread_resources = threading.local()
+
+# background refresh state of auto refreshing credentials, held weakly so that it never keeps the credentials alive
+_refresh_lock = threading.Lock()
+_refresh_states = weakref.WeakKeyDictionary()
+
+# policy templates are parsed once per process, and rendered policies are cached on the template and config
+POLICY_RENDER_CACHE_SIZE = 512
+_template_lock = threading.Lock()
+_parsed_templates = {}
+_rendered_policy_cache = TtlCache(ttl_seconds=POOL_TTL_SECONDS, max_size=POLICY_RENDER_CACHE_SIZE)
+_policy_dict_cache = TtlCache(ttl_seconds=POOL_TTL_SECONDS, max_size=POLICY_RENDER_CACHE_SIZE)
 
 
 def make_iam_session_name(current_account):
@@ -29,9 +65,50 @@ def get_central_role_name(account_id: str, type: str) -> str:
         return f"{DATA_MESH_ADMIN_CONSUMER_ROLENAME}-{account_id}"
 
 
+def _get_access_key(credentials) -> str:
+    if credentials is None:
+        return None
+    elif isinstance(credentials, Mapping):
+        return credentials.get('AccessKeyId')
+    else:
+        # botocore Credentials, where refreshable credentials must be frozen to read a consistent access key
+        return credentials.get_frozen_credentials().access_key
+
+
+def get_caller_identity(credentials=None, region: str = None, session=None) -> dict:
+    '''
+    Returns the sts:GetCallerIdentity response for a set of credentials or a session, calling STS only the first time
+    each access key is seen. If neither is provided, the default credential chain is used.
+    :param credentials:
+    :param region:
+    :param session:
+    :return:
+    '''
+    if session is None and credentials is None:
+        session = boto3.session.Session(region_name=region)
+
+    if session is not None:
+        credentials = session.get_credentials()
+
+    access_key = _get_access_key(credentials)
+
+    def _load():
+        if session is not None:
+            sts_client = session.client('sts')
+        else:
+            sts_client = generate_client(service='sts', region=region, credentials=credentials)
+
+        identity = sts_client.get_caller_identity()
+        return {k: identity.get(k) for k in ['UserId', 'Account', 'Arn']}
+
+    if access_key is None:
+        return _load()
+    else:
+        return dict(_identity_cache.get_or_load(access_key, _load))
+
+
 def validate_correct_account(credentials, account_id: str, should_match: bool = True):
-    caller_account = generate_client(service='sts', region=None, credentials=credentials).get_caller_identity().get(
-        'Account')
+    caller_account = get_caller_identity(credentials=credentials).get('Account')
     if should_match is False and caller_account == account_id:
         raise Exception(
             f"Function should not run within the Data Mesh Account ({account_id}) ")
@@ -44,13 +121,51 @@ def convert_s3_path_to_arn(s3_path: str) -> str:
     return f"arn:aws:s3:::{s3_path.replace('s3://', '')}"
 
 
-def generate_policy(template_file: str, config: dict):
-    with open("%s/%s" % (os.path.join(os.path.dirname(__file__), "../resource"), template_file)) as t:
-        template = t.read()
+def _get_parsed_template(template_file: str):
+    with _template_lock:
+        parsed = _parsed_templates.get(template_file)
+
+        if parsed is None:
+            with open("%s/%s" % (os.path.join(os.path.dirname(__file__), "../resource"), template_file)) as t:
+                parsed = pystache.parse(t.read())
+            _parsed_templates[template_file] = parsed
+
+    return parsed
 
-    rendered = pystache.Renderer().render(template, config)
 
-    return rendered
+def _get_render_cache_key(template_file: str, config: dict) -> tuple:
+    return template_file, json.dumps(config, sort_keys=True, default=str)
+
+
+def generate_policy(template_file: str, config: dict):
+    '''
+    Renders a policy template with the provided config. Templates are loaded and parsed on first use, and rendered
+    policies are cached on the template and config
+    :param template_file:
+    :param config:
+    :return: the rendered policy string
+    '''
+    return _rendered_policy_cache.get_or_load(
+        _get_render_cache_key(template_file, config),
+        lambda: pystache.Renderer().render(_get_parsed_template(template_file), config)
+    )
+
+
+def generate_policy_dict(template_file: str, config: dict) -> dict:
+    '''
+    Renders a JSON policy template with the provided config and returns it as a dict. The parsed policy is cached, so
+    repeated calls with the same config neither render nor parse the policy again. A copy is returned, so the caller
+    may modify it
+    :param template_file:
+    :param config:
+    :return:
+    '''
+    policy = _policy_dict_cache.get_or_load(
+        _get_render_cache_key(template_file, config),
+        lambda: json.loads(generate_policy(template_file, config))
+    )
+
+    return copy.deepcopy(policy)
 
 
 def remove_dict_keys(input_dict: dict, remove_keys: list) -> dict:
@@ -68,6 +183,96 @@ def remove_dict_keys(input_dict: dict, remove_keys: list) -> dict:
     return out
 
 
+def generate_table_fingerprint(table_input: dict) -> str:
+    '''
+    Returns a stable hash of a Glue TableInput, covering its schema, location, parameters and partition keys. Parameters
+    which the data mesh sets on mesh tables are excluded, so a mesh table and its source produce the same fingerprint
+    :param table_input:
+    :return:
+    '''
+    use_input = dict(table_input)
+    use_input['Parameters'] = remove_dict_keys(input_dict=table_input.get('Parameters', {}),
+                                               remove_keys=DATA_MESH_TABLE_PARAMETERS)
+
+    return hashlib.sha256(json.dumps(use_input, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def generate_partition_fingerprint(partition: dict) -> str:
+    '''
+    Returns a stable hash of the definition of a Glue Partition, such as its storage descriptor and parameters, excluding
+    the properties which differ between a partition and its copy in the mesh
+    :param partition:
+    :return:
+    '''
+    return generate_table_fingerprint(
+        remove_dict_keys(input_dict=partition, remove_keys=GLUE_PARTITION_READ_ONLY_KEYS + ['LastAccessTime']))
+
+
+def chunk(items, chunk_size: int):
+    # yields successive lists of at most chunk_size elements from any iterable, without materializing it
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == chunk_size:
+            yield batch
+            batch = []
+
+    if len(batch) > 0:
+        yield batch
+
+
+def merge_iterables_concurrently(sources: list, max_queue_size: int = 1000):
+    '''
+    Drains each of the provided iterable factories on its own thread, and yields their items as they arrive through
+    a bounded queue, so that producers block rather than buffering when the consumer falls behind. An exception raised
+    by any source is re-raised to the consumer.
+    :param sources: list of zero-argument callables that each return an iterable
+    :param max_queue_size:
+    :return:
+    '''
+    if sources is None or len(sources) == 0:
+        return
+
+    buffer = queue.Queue(maxsize=max_queue_size)
+    stopped = threading.Event()
+
+    def _put(message: tuple) -> bool:
+        # keep checking for an abandoned consumer so that reader threads can never block forever on a full queue
+        while not stopped.is_set():
+            try:
+                buffer.put(message, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _drain(source):
+        try:
+            for item in source():
+                if not _put((_SOURCE_ITEM, item)):
+                    return
+        except Exception as e:
+            _put((_SOURCE_ERROR, e))
+        finally:
+            _put((_SOURCE_FINISHED, None))
+
+    for source in sources:
+        threading.Thread(target=_drain, args=(source,), daemon=True).start()
+
+    running = len(sources)
+    try:
+        while running > 0:
+            message_type, payload = buffer.get()
+            if message_type == _SOURCE_FINISHED:
+                running -= 1
+            elif message_type == _SOURCE_ERROR:
+                raise payload
+            else:
+                yield payload
+    finally:
+        stopped.set()
+
+
 def get_table_arn(region_name: str, catalog_id: str, database_name: str, table_name: str):
     # format is arn:aws:glue:region:account-id:table/database name/table name
     return f"arn:aws:glue:{region_name}:{catalog_id}:table/{database_name}/{table_name}"
@@ -132,14 +337,54 @@ def get_datamesh_consumer_role_arn(source_account_id: str, data_mesh_account_id:
 
 
 def assume_iam_role(role_name: str, region_name: str, target_account: str = None,
-                    use_credentials=None) -> (boto3.session.Session, dict):
+                    use_credentials=None, auto_refresh: bool = False) -> (boto3.session.Session, dict):
+    '''
+    Assumes a role, returning a session for the role and its credentials. With auto_refresh, the credentials are
+    botocore RefreshableCredentials, so sessions and clients created from them never need to be rebuilt. While a
+    session for them is in the process-wide pool, the role is re-assumed in the background before they expire.
+    :param role_name:
+    :param region_name:
+    :param target_account:
+    :param use_credentials:
+    :param auto_refresh:
+    :return:
+    '''
     _sts_client = generate_client('sts', region_name, use_credentials)
-    _current_identity = _sts_client.get_caller_identity()
+    _current_identity = get_caller_identity(credentials=use_credentials, region=region_name)
     set_account = target_account if target_account is not None else _current_identity.get('Account')
 
     if _current_identity.get('Arn') == get_role_arn(account_id=set_account,
                                                     role_name=role_name):
-        return boto3.session.Session(region_name=region_name)
+        return boto3.session.Session(region_name=region_name), use_credentials
+    elif auto_refresh is True:
+        role_arn = get_role_arn(set_account, role_name)
+        session_name = make_iam_session_name(_current_identity)
+        refresh_state = {'expiry': None, 'failures': 0, 'pooled': 0, 'generation': 0, 'timer': None}
+
+        def _refresh() -> dict:
+            # the parent credentials may themselves be refreshable, so always go through the pooled client
+            _creds = generate_client('sts', region_name, use_credentials).assume_role(
+                RoleArn=role_arn,
+                RoleSessionName=session_name
+            ).get('Credentials')
+            refresh_state['expiry'] = _creds.get('Expiration')
+
+            return {
+                'access_key': _creds.get('AccessKeyId'),
+                'secret_key': _creds.get('SecretAccessKey'),
+                'token': _creds.get('SessionToken'),
+                'expiry_time': _creds.get('Expiration').isoformat()
+            }
+
+        credentials = botocore.credentials.RefreshableCredentials.create_from_metadata(
+            metadata=_refresh(),
+            refresh_using=_refresh,
+            method='sts-assume-role'
+        )
+        with _refresh_lock:
+            _refresh_states[credentials] = refresh_state
+
+        return create_session(credentials=credentials, region=region_name), credentials
     else:
         _creds = _sts_client.assume_role(
             RoleArn=get_role_arn(set_account, role_name),
@@ -149,16 +394,122 @@ def assume_iam_role(role_name: str, region_name: str, target_account: str = None
         return create_session(credentials=_creds.get('Credentials'), region=region_name), _creds.get('Credentials')
 
 
+def _start_credential_refresh(credentials) -> None:
+    # must be called holding _pool_lock, when a session for the credentials is added to the pool
+    with _refresh_lock:
+        state = _refresh_states.get(credentials)
+        if state is None:
+            return
+
+        state['pooled'] += 1
+        if state['pooled'] == 1:
+            state['generation'] += 1
+            state['failures'] = 0
+            _schedule_credential_refresh(weakref.ref(credentials), state, state['generation'])
+
+
+def _on_pooled_session_evicted(pooled: tuple) -> None:
+    # stops the background refresh once no pooled session uses the credentials. Later callers refresh on demand
+    _, credentials = pooled
+    if not isinstance(credentials, botocore.credentials.RefreshableCredentials):
+        return
+
+    with _refresh_lock:
+        state = _refresh_states.get(credentials)
+        if state is None:
+            return
+
+        state['pooled'] -= 1
+        if state['pooled'] == 0:
+            _cancel_credential_refresh(state)
+
+
+def _cancel_credential_refresh(state: dict) -> None:
+    # must be called holding _refresh_lock. A timer which has already fired sees the new generation and stops
+    state['generation'] += 1
+    if state.get('timer') is not None:
+        state['timer'].cancel()
+        state['timer'] = None
+
+
+def _schedule_credential_refresh(credentials_ref, state: dict, generation: int) -> None:
+    '''
+    Refreshes credentials on a daemon timer once they enter botocore's advisory refresh window, but before its
+    mandatory window, so the refresh happens off the calling threads. The timer runs while a session for the
+    credentials is pooled. A failed refresh is retried with exponential backoff until the credentials expire, after
+    which botocore refreshes them on their next use. Must be called holding _refresh_lock
+    :param credentials_ref: weak reference to RefreshableCredentials
+    :param state: refresh state of the credentials, holding the expiry returned by sts:AssumeRole
+    :param generation: the timer stops if the state moves to a new generation
+    :return:
+    '''
+    seconds_remaining = (state['expiry'] - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+
+    if state['failures'] == 0:
+        delay = max(0, seconds_remaining - CREDENTIAL_BACKGROUND_REFRESH_SECONDS)
+    elif seconds_remaining <= 0:
+        state['timer'] = None
+        return
+    else:
+        # full jitter, never waiting past the expiry
+        backoff = min(CREDENTIAL_REFRESH_MAX_BACKOFF_SECONDS,
+                      CREDENTIAL_REFRESH_BASE_BACKOFF_SECONDS * 2 ** (state['failures'] - 1))
+        delay = min(random.uniform(0, backoff), seconds_remaining)
+
+    timer = threading.Timer(delay, _refresh_credentials_in_background, args=(credentials_ref, state, generation))
+    timer.daemon = True
+    state['timer'] = timer
+    timer.start()
+
+
+def _refresh_credentials_in_background(credentials_ref, state: dict, generation: int) -> None:
+    # drop pooled sessions which have expired without being accessed again, which stops this refresh if it was the last
+    with _pool_lock:
+        _session_pool.purge_expired()
+        _client_pool.purge_expired()
+
+    credentials = credentials_ref()
+    if credentials is None:
+        return
+
+    with _refresh_lock:
+        if state['generation'] != generation:
+            return
+
+    try:
+        # inside the advisory window, reading the credentials triggers the refresh
+        credentials.get_frozen_credentials()
+    except Exception:
+        # inside the mandatory window botocore raises the refresh error, which is handled below as a failed refresh
+        pass
+    del credentials
+
+    with _refresh_lock:
+        if state['generation'] != generation:
+            return
+
+        # botocore keeps the current credentials when a refresh fails in the advisory window, so the expiry shows
+        # whether the refresh happened
+        seconds_remaining = (state['expiry'] - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+        if seconds_remaining > CREDENTIAL_BACKGROUND_REFRESH_SECONDS:
+            state['failures'] = 0
+        else:
+            state['failures'] += 1
+
+        _schedule_credential_refresh(credentials_ref, state, generation)
+
+
 def _validate_credentials(credentials) -> dict:
     out = {}
     if isinstance(credentials, Mapping):
         out = credentials
     else:
         if credentials is not None:
-            # treat as a Boto3 Credentials object
-            out = {'AccessKeyId': credentials.access_key, "SecretAccessKey": credentials.secret_key}
-            if credentials.token is not None:
-                out['SessionToken'] = credentials.token
+            # treat as a Boto3 Credentials object, freezing it so refreshable credentials give a consistent set of keys
+            frozen = credentials.get_frozen_credentials()
+            out = {'AccessKeyId': frozen.access_key, "SecretAccessKey": frozen.secret_key}
+            if frozen.token is not None:
+                out['SessionToken'] = frozen.token
         else:
             # load from the environment
             out = {'AccessKeyId': os.getenv('AWS_ACCESS_KEY'), "SecretAccessKey": os.getenv('AWS_SECRET_ACCESS_KEY')}
@@ -223,8 +574,30 @@ def load_ram_shares(lf_client, data_mesh_account_id: str, database_name: str, ta
     return ram_shares
 
 
+class _RefreshableCredentialProvider(botocore.credentials.CredentialProvider):
+    '''
+    Credential provider which resolves to an existing refreshable credentials object, so that sessions created from it
+    refresh along with the object rather than resolving credentials from the environment
+    '''
+    METHOD = 'data-mesh-refreshable'
+
+    def __init__(self, credentials: botocore.credentials.RefreshableCredentials):
+        super().__init__()
+        self._refreshable_credentials = credentials
+
+    def load(self):
+        return self._refreshable_credentials
+
+
 def create_session(credentials=None, region=None):
-    if credentials is not None:
+    if isinstance(credentials, botocore.credentials.RefreshableCredentials):
+        # keep the credentials object itself, so that the session refreshes along with it
+        botocore_session = botocore.session.Session()
+        botocore_session.register_component('credential_provider', botocore.credentials.CredentialResolver(
+            providers=[_RefreshableCredentialProvider(credentials)]))
+        return boto3.session.Session(botocore_session=botocore_session,
+                                     region_name=region if region is not None else os.getenv('AWS_REGION'))
+    elif credentials is not None:
         use_creds = _validate_credentials(credentials)
         args = {
             "aws_access_key_id": use_creds.get('AccessKeyId'),
@@ -243,20 +616,95 @@ def create_session(credentials=None, region=None):
         return botocore.session.get_session()
 
 
-def generate_client(service: str, region: str, credentials):
-    session = create_session(credentials=credentials, region=region)
+def _get_credentials_key(credentials) -> tuple:
+    if credentials is None:
+        return 'default',
+    elif isinstance(credentials, botocore.credentials.RefreshableCredentials):
+        # refreshable credentials change their keys over time, so they are pooled by object rather than by value
+        return 'refreshable', id(credentials)
+    else:
+        use_creds = _validate_credentials(credentials)
+        return 'static', use_creds.get('AccessKeyId'), use_creds.get('SecretAccessKey'), use_creds.get('SessionToken')
+
+
+# the client Config options which identify a pooled client. Configs which differ only in other options share a client
+_CONFIG_KEY_ATTRIBUTES = ['region_name', 'signature_version', 'user_agent_extra', 'connect_timeout', 'read_timeout',
+                          'max_pool_connections', 'retries', 'proxies', 's3', 'parameter_validation', 'tcp_keepalive']
+
+
+def _get_config_key(config) -> tuple:
+    if config is None:
+        return None
+    else:
+        return tuple((a, json.dumps(getattr(config, a, None), sort_keys=True, default=str))
+                     for a in _CONFIG_KEY_ATTRIBUTES)
+
+
+def _get_pooled_session(credentials, region: str) -> boto3.session.Session:
+    # must be called holding _pool_lock
+    session_key = (_get_credentials_key(credentials), region)
+    pooled = _session_pool.get(session_key)
+
+    if pooled is None:
+        if credentials is None:
+            session = boto3.session.Session(region_name=region)
+        else:
+            session = create_session(credentials=credentials, region=region)
+
+        # the pool entry holds a reference to the credentials so that their id can't be reused while pooled
+        pooled = (session, credentials)
+        _session_pool.put(session_key, pooled)
+
+        if isinstance(credentials, botocore.credentials.RefreshableCredentials):
+            _start_credential_refresh(credentials)
 
-    return session.client(service)
+    return pooled[0]
+
+
+def generate_client(service: str, region: str, credentials, config=None):
+    '''
+    Returns a client for the service from the process-wide pool, creating it on first use. Clients are shared by all
+    callers using the same credentials, region and client config, which reuses their loaded service models and HTTP
+    connection pools.
+    :param service:
+    :param region:
+    :param credentials:
+    :param config: botocore.config.Config to create the client with
+    :return:
+    '''
+    use_region = region if region is not None else os.getenv('AWS_REGION')
+    client_key = (_get_credentials_key(credentials), use_region, service, _get_config_key(config))
+
+    with _pool_lock:
+        client = _client_pool.get(client_key)
+
+        if client is None:
+            session = _get_pooled_session(credentials=credentials, region=use_region)
+            client = session.client(service, config=config)
+            _client_pool.put(client_key, client)
+
+    return client
 
 
 def generate_resource(service: str, region: str, credentials):
-    use_creds = _validate_credentials(credentials)
-    args = {
-        "service_name": service,
-        "region_name": region,
-        "aws_access_key_id": use_creds.get('AccessKeyId'),
-        "aws_secret_access_key": use_creds.get('SecretAccessKey')
-    }
-    if 'SessionToken' in use_creds:
-        args['aws_session_token'] = use_creds.get('SessionToken')
-    return boto3.resource(**args)
+    '''
+    Returns a resource for the service. Resources are not thread safe, so unlike clients they are pooled per thread.
+    :param service:
+    :param region:
+    :param credentials:
+    :return:
+    '''
+    use_region = region if region is not None else os.getenv('AWS_REGION')
+    resource_key = (_get_credentials_key(credentials), use_region, service)
+
+    if not hasattr(_thread_resources, 'pool'):
+        _thread_resources.pool = TtlCache(ttl_seconds=POOL_TTL_SECONDS, max_size=POOL_MAX_SIZE)
+
+    resource = _thread_resources.pool.get(resource_key)
+    if resource is None:
+        with _pool_lock:
+            session = _get_pooled_session(credentials=credentials, region=use_region)
+            resource = session.resource(service)
+        _thread_resources.pool.put(resource_key, resource)
+
+    return resource
@@ -0,0 +1,52 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from data_mesh_util.lib.DagExecutor import DagExecutor
+
+
+class DagExecutorTests(unittest.TestCase):
+    def test_dependencies(self):
+        dag = DagExecutor(max_workers=4)
+        dag.add_step('policy', lambda r: 'policy-arn')
+        dag.add_step('user', lambda r: 'user-arn')
+        dag.add_step('role', lambda r: f"role-for-{r.get('user')}", depends_on=['user'])
+        dag.add_step('attach', lambda r: (r.get('role'), r.get('policy')), depends_on=['role', 'policy'])
+
+        results = dag.run()
+        self.assertEqual(('role-for-user-arn', 'policy-arn'), results.get('attach'))
+
+    def test_independent_steps_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+        dag = DagExecutor(max_workers=2)
+
+        # each step can only pass the barrier if the other is running at the same time
+        dag.add_step('a', lambda r: barrier.wait())
+        dag.add_step('b', lambda r: barrier.wait())
+        self.assertEqual(2, len(dag.run()))
+
+    def test_failure_stops_dependents(self):
+        started = []
+
+        def _fail(r):
+            raise ValueError("boom")
+
+        dag = DagExecutor()
+        dag.add_step('a', _fail)
+        dag.add_step('b', lambda r: started.append('b'), depends_on=['a'])
+
+        with self.assertRaises(ValueError):
+            dag.run()
+        self.assertEqual([], started)
+
+    def test_circular_dependencies(self):
+        dag = DagExecutor()
+        dag.add_step('a', lambda r: time.sleep(0), depends_on=['b'])
+        dag.add_step('b', lambda r: None, depends_on=['a'])
+
+        with self.assertRaises(Exception):
+            dag.run()
@@ -0,0 +1,34 @@
+import unittest
+import sys
+import os
+import json
+
+import pystache
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+import data_mesh_util.lib.utils as utils
+
+_CONFIG = {
+    'region': 'us-east-1',
+    'producer_account_id': '111111111111',
+    'consumer_account_id': '222222222222',
+    'database_name': 'db',
+    'tables': ['a', 'b'],
+    'table_list': ['a', 'b']
+}
+
+
+class PolicyTemplateTests(unittest.TestCase):
+    def test_matches_direct_render(self):
+        with open(os.path.join(os.path.dirname(__file__), "../src/data_mesh_util/resource/lf_cross_account_tbac.pystache")) as t:
+            expected = pystache.Renderer().render(t.read(), _CONFIG)
+
+        self.assertEqual(expected, utils.generate_policy('lf_cross_account_tbac.pystache', _CONFIG))
+        self.assertEqual(json.loads(expected), utils.generate_policy_dict('lf_cross_account_tbac.pystache', _CONFIG))
+
+    def test_policy_dict_is_a_copy(self):
+        policy = utils.generate_policy_dict('lf_cross_account_tbac.pystache', _CONFIG)
+        policy['Modified'] = True
+
+        self.assertNotIn('Modified', utils.generate_policy_dict('lf_cross_account_tbac.pystache', _CONFIG))
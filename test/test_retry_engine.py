@@ -0,0 +1,50 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from data_mesh_util.lib.RetryEngine import RetryEngine, is_transient_error
+
+
+class RetryEngineTests(unittest.TestCase):
+    def test_retry_until_success(self):
+        engine = RetryEngine(base_delay=0.001, max_delay=0.01, deadline_seconds=5)
+        attempts = []
+
+        def _call():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ValueError("Invalid principal")
+            return "ok"
+
+        self.assertEqual("ok", engine.call("test:Call", _call, retry_on=lambda e: isinstance(e, ValueError)))
+        self.assertEqual(3, len(attempts))
+        self.assertEqual(2, engine.get_wait_stats().get("test:Call").get("Retries"))
+
+    def test_non_retryable_error(self):
+        engine = RetryEngine(base_delay=0.001, max_delay=0.01, deadline_seconds=5)
+
+        def _call():
+            raise KeyError("boom")
+
+        with self.assertRaises(KeyError):
+            engine.call("test:Call", _call, retry_on=lambda e: isinstance(e, ValueError))
+
+    def test_wait_until_deadline(self):
+        engine = RetryEngine(base_delay=0.001, max_delay=0.01, deadline_seconds=0.05)
+
+        self.assertFalse(engine.wait_until("test:Probe", lambda: False))
+        self.assertTrue(engine.wait_until("test:Ready", lambda: True))
+        self.assertEqual(0, engine.get_wait_stats().get("test:Ready").get("Retries"))
+
+    def test_transient_errors(self):
+        class _ClientError(Exception):
+            def __init__(self, code: str, status: int):
+                self.response = {'Error': {'Code': code}, 'ResponseMetadata': {'HTTPStatusCode': status}}
+
+        self.assertTrue(is_transient_error(_ClientError('ThrottlingException', 400)))
+        self.assertTrue(is_transient_error(_ClientError('InternalServiceException', 500)))
+        self.assertTrue(is_transient_error(_ClientError('Unknown', 503)))
+        self.assertFalse(is_transient_error(_ClientError('AlreadyExistsException', 400)))
+        self.assertFalse(is_transient_error(ValueError("boom")))
@@ -0,0 +1,110 @@
+import unittest
+import sys
+import os
+import logging
+from unittest import mock
+
+import boto3
+from botocore.exceptions import ClientError
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from data_mesh_util.lib.SubscriberTracker import SubscriberTracker
+from data_mesh_util.lib.RetryEngine import RetryEngine
+
+
+def _table(statuses: dict) -> dict:
+    return {'Table': {
+        'GlobalSecondaryIndexes': [{'IndexName': name, 'IndexStatus': status} for name, status in statuses.items()]
+    }}
+
+
+class SubscriberTrackerIndexTests(unittest.TestCase):
+    def _tracker(self, dynamo_client):
+        tracker = SubscriberTracker.__new__(SubscriberTracker)
+        tracker._dynamo_client = dynamo_client
+        tracker._retry_engine = RetryEngine(base_delay=0.001, max_delay=0.01, deadline_seconds=5)
+        tracker._logger = logging.getLogger("SubscriberTrackerIndexTests")
+        return tracker
+
+    def _client(self):
+        client = mock.MagicMock()
+        client.exceptions = boto3.client('dynamodb', region_name='us-east-1').exceptions
+        return client
+
+    def test_waits_for_creating_index(self):
+        client = self._client()
+        tracker = self._tracker(client)
+        owner = tracker.owner_indexname()
+        subscriber = tracker.subscriber_indexname()
+        database = tracker.database_indexname()
+        owner_database = tracker.owner_database_indexname()
+
+        statuses = {owner: 'ACTIVE', subscriber: 'ACTIVE'}
+        events = []
+
+        def _describe_table(**kwargs):
+            events.append(('describe', dict(statuses)))
+            response = _table(statuses)
+            # a new index finishes backfilling after it has been described once as CREATING
+            for name, status in statuses.items():
+                if status == 'CREATING':
+                    statuses[name] = 'ACTIVE'
+            return response
+
+        def _update_table(**kwargs):
+            name = kwargs['GlobalSecondaryIndexUpdates'][0]['Create']['IndexName']
+            self.assertTrue(all(s == 'ACTIVE' for s in statuses.values()))
+            events.append(('update', name))
+            statuses[name] = 'CREATING'
+
+        client.describe_table.side_effect = _describe_table
+        client.update_table.side_effect = _update_table
+
+        not_created = tracker._create_missing_indexes(_table({owner: 'ACTIVE', subscriber: 'ACTIVE'}).get('Table'))
+
+        self.assertEqual([], not_created)
+        self.assertEqual([database, owner_database], [e[1] for e in events if e[0] == 'update'])
+        # the second index is only requested once the first reports ACTIVE
+        self.assertIn(('describe', {owner: 'ACTIVE', subscriber: 'ACTIVE', database: 'CREATING'}), events)
+        second = events.index(('update', owner_database))
+        self.assertEqual('ACTIVE', events[second - 1][1].get(database))
+
+    def test_retries_limit_exceeded(self):
+        client = self._client()
+        tracker = self._tracker(client)
+        owner = tracker.owner_indexname()
+        subscriber = tracker.subscriber_indexname()
+        database = tracker.database_indexname()
+
+        client.describe_table.return_value = _table({owner: 'ACTIVE', subscriber: 'ACTIVE', database: 'ACTIVE'})
+        client.update_table.side_effect = [
+            ClientError({'Error': {'Code': 'LimitExceededException', 'Message': 'Subscriber limit exceeded'}},
+                        'UpdateTable'),
+            {}
+        ]
+
+        not_created = tracker._create_missing_indexes(
+            _table({owner: 'ACTIVE', subscriber: 'ACTIVE', database: 'ACTIVE'}).get('Table'))
+
+        self.assertEqual([], not_created)
+        self.assertEqual(2, client.update_table.call_count)
+
+    def test_access_denied_reports_indexes(self):
+        client = self._client()
+        tracker = self._tracker(client)
+        owner = tracker.owner_indexname()
+        subscriber = tracker.subscriber_indexname()
+
+        client.describe_table.return_value = _table({owner: 'ACTIVE', subscriber: 'ACTIVE'})
+        client.update_table.side_effect = ClientError(
+            {'Error': {'Code': 'AccessDeniedException', 'Message': 'not authorized'}}, 'UpdateTable')
+
+        not_created = tracker._create_missing_indexes(_table({owner: 'ACTIVE', subscriber: 'ACTIVE'}).get('Table'))
+
+        self.assertEqual([tracker.database_indexname(), tracker.owner_database_indexname()], not_created)
+        self.assertEqual(1, client.update_table.call_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
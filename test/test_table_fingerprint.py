@@ -0,0 +1,57 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+import data_mesh_util.lib.utils as utils
+from data_mesh_util.lib.constants import *
+
+
+def _table(location: str = 's3://bucket/table', parameters: dict = None) -> dict:
+    return {
+        'Name': 'table',
+        'StorageDescriptor': {
+            'Columns': [{'Name': 'id', 'Type': 'int'}],
+            'Location': location
+        },
+        'PartitionKeys': [{'Name': 'dt', 'Type': 'string'}],
+        'Parameters': {'classification': 'parquet'} if parameters is None else parameters
+    }
+
+
+class TableFingerprintTests(unittest.TestCase):
+    def test_stable(self):
+        self.assertEqual(utils.generate_table_fingerprint(_table()), utils.generate_table_fingerprint(_table()))
+
+    def test_definition_change(self):
+        self.assertNotEqual(utils.generate_table_fingerprint(_table()),
+                            utils.generate_table_fingerprint(_table(location='s3://bucket/moved')))
+
+    def test_ignores_data_mesh_parameters(self):
+        mesh_table = _table(parameters={
+            'classification': 'parquet',
+            PARTITION_WATERMARK_PARAMETER: '2022-01-01T00:00:00',
+            TABLE_FINGERPRINT_PARAMETER: 'abc'
+        })
+
+        self.assertEqual(utils.generate_table_fingerprint(_table()), utils.generate_table_fingerprint(mesh_table))
+
+    def test_partition_copy_matches_source(self):
+        source_partition = {
+            'Values': ['2022-01-01'],
+            'DatabaseName': 'source',
+            'TableName': 'table',
+            'CatalogId': '111111111111',
+            'CreationTime': '2022-01-01T00:00:00',
+            'StorageDescriptor': {'Location': 's3://bucket/table/dt=2022-01-01'}
+        }
+        mesh_partition = dict(source_partition, DatabaseName='mesh', CatalogId='222222222222',
+                              CreationTime='2022-01-02T00:00:00')
+
+        self.assertEqual(utils.generate_partition_fingerprint(source_partition),
+                         utils.generate_partition_fingerprint(mesh_partition))
+
+        moved_partition = dict(mesh_partition, StorageDescriptor={'Location': 's3://bucket/moved/dt=2022-01-01'})
+        self.assertNotEqual(utils.generate_partition_fingerprint(source_partition),
+                            utils.generate_partition_fingerprint(moved_partition))
@@ -0,0 +1,64 @@
+import unittest
+import sys
+import os
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+
+from data_mesh_util.lib.TtlCache import TtlCache
+
+
+class TtlCacheTests(unittest.TestCase):
+    def test_expiry(self):
+        cache = TtlCache(ttl_seconds=0.05)
+        cache.put('Domain', ['a'])
+        self.assertEqual(['a'], cache.get('Domain'))
+
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('Domain'))
+
+    def test_lru_eviction(self):
+        cache = TtlCache(max_size=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+
+        # touch a so that b is the least recently used entry
+        cache.get('a')
+        cache.put('c', 3)
+
+        self.assertEqual(1, cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(3, cache.get('c'))
+
+    def test_get_or_load(self):
+        cache = TtlCache()
+        loads = []
+
+        def _loader():
+            loads.append(1)
+            return ['a', 'b']
+
+        self.assertEqual(['a', 'b'], cache.get_or_load('Domain', _loader))
+        self.assertEqual(['a', 'b'], cache.get_or_load('Domain', _loader))
+        self.assertEqual(1, len(loads))
+
+        cache.invalidate('Domain')
+        cache.get_or_load('Domain', _loader)
+        self.assertEqual(2, len(loads))
+
+    def test_on_evict(self):
+        evicted = []
+        cache = TtlCache(ttl_seconds=0.05, max_size=2, on_evict=lambda k, v: evicted.append(k))
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.put('c', 3)
+        self.assertEqual(['a'], evicted)
+
+        cache.invalidate('b')
+        self.assertEqual(['a', 'b'], evicted)
+
+        # expired entries are reported by purge_expired without being accessed
+        time.sleep(0.1)
+        cache.purge_expired()
+        self.assertEqual(['a', 'b', 'c'], evicted)
+        self.assertIsNone(cache.get('c'))